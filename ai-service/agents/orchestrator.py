@@ -413,8 +413,14 @@ async def reset_orchestrator() -> CompiledStateGraph:
 
     Call this after applying LLM config overrides so the new model is used.
     """
+    from services.litellm_router import invalidate_router_cache
+    from services.llm import clear_chat_model_cache
+
     global _orchestrator
     _orchestrator = None
+    # Start from a fresh model and Router too, dropping cooldowns from the old config
+    clear_chat_model_cache()
+    invalidate_router_cache()
     logger.info("Orchestrator cache cleared — rebuilding with current settings")
     return await get_orchestrator()
 
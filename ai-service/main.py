@@ -117,11 +117,18 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     except Exception as e:
         logger.error("Orchestrator init failed: %s", e)
 
+    # Sweeps SSE stream sessions whose client never connected or went away
+    agent.start_stream_janitor()
+
     yield
 
     # --- Shutdown: Close all connections ---
     logger.info("Shutting down %s", SERVICE_NAME)
 
+    try:
+        await agent.stop_stream_janitor()
+    except Exception:
+        pass
     try:
         from agents.orchestrator import close_checkpointer
         await close_checkpointer()
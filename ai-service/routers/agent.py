@@ -7,17 +7,21 @@ import io
 import json
 import logging
 import re
+import time
 import zipfile
+from collections import Counter
 from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, get_args
 from uuid import uuid4
 
+import orjson
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import StreamingResponse
 from langchain_core.messages import AIMessage, HumanMessage
+from sse_starlette import EventSourceResponse
 
-from config import get_settings
+from config import get_effective_settings, get_settings
 from models.schemas import (
     AgentStreamEvent,
     ApproveRequest,
@@ -27,6 +31,7 @@ from models.schemas import (
     InvokeResponse,
     RecoveryAction,
     RetryRequest,
+    StreamEventType,
 )
 from services.supervisor_guardrails import (
     build_failure_recovery_message as _build_failure_recovery_message,
@@ -106,7 +111,7 @@ def _coerce_tool_result_payload(output: Any) -> dict[str, Any] | None:
         return None
 
     try:
-        parsed = json.loads(text)
+        parsed = orjson.loads(text)
     except Exception:
         return None
 
@@ -625,11 +630,139 @@ def _extract_yaml_from_text(text: str) -> str | None:
 DISCOVERY_TRIGGER = "__START_DISCOVERY__"
 RERUN_DISCOVERY_TRIGGER = "__RERUN_DISCOVERY__"
 
+# Per-run stream constants used by _run_agent
+_DEDUP_CHECK_LEN = 80  # Chars buffered per LLM run before the duplicate-run check
+# Phase tracking: detect subagent transitions
+_SUBAGENT_PHASE_MAP: dict[str, str] = {
+    "discovery-agent": "discovery",
+    "transformation-agent": "prepare",  # between discovery and requirements
+    "modeling-agent": "generation",  # internal — maps to generation phase
+    "model-builder": "requirements",  # default; refined by tool detection
+    "publishing-agent": "publishing",
+    "explorer-agent": "explorer",
+}
+# Backend artifact types that are named differently in the frontend
+_FRONTEND_ARTIFACT_TYPE_MAP: dict[str, str] = {"quality_report": "data_quality"}
+_MODELING_TOOL_ARTIFACT_MAP: dict[str, str] = {
+    "save_data_catalog": "data_catalog",
+    "save_business_glossary": "business_glossary",
+    "save_metrics_definitions": "metrics",
+    "save_validation_rules": "validation_rules",
+    "save_openlineage_artifact": "lineage",
+}
+_DD_MARKERS: tuple[str, ...] = (
+    "[1] System Architecture",
+    "[2] Business Context",
+    "---BEGIN DATA DESCRIPTION---",
+    "[6] Data Map",
+)
+_CITATION_CHECK_PHASES: frozenset[str] = frozenset({"explorer", ""})
+
 router = APIRouter(prefix="/agent", tags=["Agent"])
 
+
+@dataclass
+class _StreamSession:
+    """In-memory state for one agent turn's SSE stream."""
+
+    # Bounded so a slow or absent consumer applies backpressure to the producer
+    # instead of letting queued frames grow without limit.
+    queue: asyncio.Queue[dict | bytes | None] = field(
+        default_factory=lambda: asyncio.Queue(maxsize=_settings.agent_stream_queue_maxsize)
+    )
+    # Control-plane events (interrupt, approval echo) bypass the bounded data
+    # queue and its backlog; the SSE loop delivers them first.
+    control: asyncio.Queue[dict | None] = field(default_factory=asyncio.Queue)
+    # Set when the SSE consumer disconnects; producers stop queueing events.
+    client_gone: asyncio.Event = field(default_factory=asyncio.Event)
+    # Whether an SSE consumer ever picked this session up
+    attached: bool = False
+    created: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+    # Strong reference to the producer task (asyncio only keeps weak refs).
+    run_task: asyncio.Task[None] | None = None
+
+
 # In-memory store for active streaming sessions.
-# Maps session_id -> asyncio.Queue of SSE events.
-_active_streams: dict[str, asyncio.Queue[dict | None]] = {}
+# Maps session_id -> _StreamSession (queue + disconnect signal + producer task).
+_active_streams: dict[str, _StreamSession] = {}
+_STREAM_JANITOR_INTERVAL_SEC = 15.0
+# A session no SSE consumer has attached to within this window is released so
+# its producer, once the bounded queue fills, finishes the turn instead of
+# blocking until the full session TTL.
+_STREAM_ATTACH_GRACE_SEC = 60.0
+_stream_janitor_task: asyncio.Task[None] | None = None
+
+
+def _release_stream_session(session: _StreamSession) -> None:
+    """Stop delivery for *session* and unblock any producer waiting on its queue.
+
+    Producers check ``client_gone`` and drop further events; draining the
+    bounded queue wakes a producer already blocked in ``put()``.
+    """
+    session.client_gone.set()
+    queue = session.queue
+    while not queue.empty():
+        queue.get_nowait()
+
+
+async def _sweep_stale_stream_sessions() -> None:
+    """Drop sessions whose stream is no longer being read.
+
+    A session normally leaves ``_active_streams`` when its SSE consumer ends.
+    Sessions never attached within ``_STREAM_ATTACH_GRACE_SEC``, or not read
+    for ``session_ttl_seconds``, are released so their queued events and any
+    producer blocked on the full queue do not linger.
+    """
+    while True:
+        await asyncio.sleep(_STREAM_JANITOR_INTERVAL_SEC)
+        now = time.monotonic()
+        cutoff = now - _settings.session_ttl_seconds
+        attach_cutoff = now - _STREAM_ATTACH_GRACE_SEC
+        stale = [
+            sid
+            for sid, sess in _active_streams.items()
+            if sess.last_seen < cutoff or (not sess.attached and sess.created < attach_cutoff)
+        ]
+        for sid in stale:
+            _release_stream_session(_active_streams.pop(sid))
+        if stale:
+            logger.info("Swept %d stale stream session(s)", len(stale))
+
+
+def start_stream_janitor() -> None:
+    """Start the background sweep of stale stream sessions (app startup)."""
+    global _stream_janitor_task
+    if _stream_janitor_task is None or _stream_janitor_task.done():
+        _stream_janitor_task = asyncio.create_task(_sweep_stale_stream_sessions())
+
+
+async def stop_stream_janitor() -> None:
+    """Cancel the stream session sweep (app shutdown)."""
+    global _stream_janitor_task
+    task, _stream_janitor_task = _stream_janitor_task, None
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def _open_stream_session(session_id: str) -> _StreamSession:
+    """Register a fresh stream session for *session_id*.
+
+    A session still registered under the same id is released first, and its
+    consumer (if any) is ended, so a producer parked on its queue is not left
+    behind where the janitor can no longer see it.
+    """
+    previous = _active_streams.get(session_id)
+    if previous is not None:
+        _release_stream_session(previous)
+        previous.control.put_nowait(None)
+    session = _StreamSession()
+    _active_streams[session_id] = session
+    return session
 
 
 def _infer_model_builder_phase_from_task_description(description: str) -> str | None:
@@ -1391,27 +1524,41 @@ def _is_non_fatal_publish_tool_error(
     return False
 
 
+_INTERNAL_LEAK_PATTERNS: tuple[str, ...] = (
+    "task()",
+    "`task`",
+    "subagent",
+    "auto-chain",
+    "pause =",
+    "rule 6",
+    "rule 10",
+    "tool call",
+    "i will call the task",
+    "i need to make sure i don't forget",
+    "system prompt says",
+    "[internal",
+    "orchestration events",
+    "execution status from orchestration",
+    "chain-of-thought",
+)
+# Chars of already-checked text a new match can overlap (longest pattern - 1)
+_INTERNAL_LEAK_OVERLAP = max(len(p) for p in _INTERNAL_LEAK_PATTERNS) - 1
+
+
 def _is_internal_reasoning_leak(text: str) -> bool:
     """Detect obvious internal-orchestration leakage in assistant output."""
     lower = text.lower()
-    leak_patterns = (
-        "task()",
-        "`task`",
-        "subagent",
-        "auto-chain",
-        "pause =",
-        "rule 6",
-        "rule 10",
-        "tool call",
-        "i will call the task",
-        "i need to make sure i don't forget",
-        "system prompt says",
-        "[internal",
-        "orchestration events",
-        "execution status from orchestration",
-        "chain-of-thought",
-    )
-    return any(p in lower for p in leak_patterns)
+    return any(p in lower for p in _INTERNAL_LEAK_PATTERNS)
+
+
+def _appended_text_leaks(text: str, appended_len: int) -> bool:
+    """Check for a leak ending in the last *appended_len* chars of *text*.
+
+    Everything before that suffix already passed the check, so a new match
+    must end inside it; only the suffix plus enough preceding chars for a
+    straddling match are scanned.
+    """
+    return _is_internal_reasoning_leak(text[-(appended_len + _INTERNAL_LEAK_OVERLAP) :])
 
 
 def _sanitize_assistant_text(text: str) -> str:
@@ -1983,7 +2130,15 @@ async def _persist_artifact_context_snapshot(
 
 
 async def _get_workflow_snapshot(data_product_id: str) -> dict[str, Any]:
-    """Load workflow state used by supervisor guards and context contract."""
+    """Load workflow state used by supervisor guards and context contract.
+
+    All reads run on a single pooled connection. The data_products row,
+    quality/document existence flags and document counts come back from one
+    statement (the counts only scan when the product has documents), which also carries the publish-gate markers
+    (``publish_gate_phase``, ``already_published``) and the
+    ``_get_data_product_info`` payload (``data_product_info``) so callers do
+    not re-read the same row.
+    """
     snapshot: dict[str, Any] = {
         "current_phase": "discovery",
         "data_tier": None,
@@ -1995,158 +2150,133 @@ async def _get_workflow_snapshot(data_product_id: str) -> dict[str, Any]:
         "brd_exists": False,
         "semantic_view_exists": False,
         "validation_status": None,
+        "publish_gate_phase": None,
+        "already_published": False,
     }
     try:
-        from services.postgres import get_pool as _gp, query as _q
+        from services.postgres import get_pool as _gp
         from config import get_effective_settings
 
         _settings = get_effective_settings()
         _pool = await _gp(_settings.database_url)
 
-        dp_rows = await _q(
-            _pool,
-            """SELECT
-                   name,
-                   state->>'current_phase' AS current_phase,
-                   state->>'data_tier' AS data_tier,
-                   state->'working_layer' AS working_layer,
-                   product_type,
-                   published_agent_fqn
-               FROM data_products
-               WHERE id = $1::uuid""",
-            data_product_id,
-        )
-        if dp_rows:
-            row = dp_rows[0]
-            snapshot["current_phase"] = row.get("current_phase") or "discovery"
-            snapshot["data_tier"] = row.get("data_tier")
-            snapshot["product_type"] = row.get("product_type") or "structured"
-            dp_name = row.get("name") or ""
-            snapshot["data_product_name"] = dp_name
-            if dp_name:
-                from tools.naming import sanitize_dp_name
-                sanitized = sanitize_dp_name(dp_name)
-                snapshot["target_schema_marts"] = f"EKAIX.{sanitized}_MARTS"
-                snapshot["target_schema_docs"] = f"EKAIX.{sanitized}_DOCS"
-            working_layer = row.get("working_layer")
-            if isinstance(working_layer, str):
-                try:
-                    working_layer = json.loads(working_layer)
-                except Exception:
-                    working_layer = None
-            snapshot["transformation_done"] = (
-                isinstance(working_layer, dict) and len(working_layer) > 0
+        async with _pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """SELECT
+                       dp.name,
+                       dp.description,
+                       dp.database_reference,
+                       dp.schemas,
+                       dp.tables,
+                       dp.status,
+                       dp.state->>'current_phase' AS current_phase,
+                       dp.state->>'data_tier' AS data_tier,
+                       dp.state->'working_layer' AS working_layer,
+                       (LOWER(COALESCE(dp.state->>'published', 'false')) IN ('true', 't', '1', 'yes')) AS state_published,
+                       dp.product_type,
+                       dp.published_agent_fqn,
+                       EXISTS (SELECT 1 FROM data_quality_checks q WHERE q.data_product_id = dp.id) AS quality_exists,
+                       docs.has_documents,
+                       CASE WHEN docs.has_documents THEN
+                           (SELECT count(*) FROM doc_chunks c WHERE c.data_product_id = dp.id)
+                       END AS chunk_count,
+                       CASE WHEN docs.has_documents THEN
+                           (SELECT count(*) FROM doc_facts f WHERE f.data_product_id = dp.id)
+                       END AS fact_count
+                   FROM data_products dp
+                   CROSS JOIN LATERAL (
+                       SELECT EXISTS (
+                           SELECT 1 FROM uploaded_documents d WHERE d.data_product_id = dp.id
+                       ) AS has_documents
+                   ) docs
+                   WHERE dp.id = $1::uuid""",
+                data_product_id,
             )
-            agent_fqn = row.get("published_agent_fqn")
-            if agent_fqn and isinstance(agent_fqn, str):
-                snapshot["published_agent_fqn"] = agent_fqn
-
-        dd_rows = await _q(
-            _pool,
-            """SELECT description_json, version
-               FROM data_descriptions
-               WHERE data_product_id = $1::uuid
-               ORDER BY version DESC LIMIT 1""",
-            data_product_id,
-        )
-        snapshot["data_description_exists"] = bool(dd_rows)
-        if dd_rows:
-            snapshot["data_description_content"] = dd_rows[0].get("description_json")
-            snapshot["data_description_version"] = dd_rows[0].get("version")
-
-        quality_rows = await _q(
-            _pool,
-            "SELECT 1 FROM data_quality_checks WHERE data_product_id = $1::uuid LIMIT 1",
-            data_product_id,
-        )
-        snapshot["quality_report_exists"] = bool(quality_rows)
-
-        brd_rows = await _q(
-            _pool,
-            """SELECT brd_json, version
-               FROM business_requirements
-               WHERE data_product_id = $1::uuid
-               ORDER BY version DESC LIMIT 1""",
-            data_product_id,
-        )
-        snapshot["brd_exists"] = bool(brd_rows)
-        if brd_rows:
-            snapshot["brd_content"] = brd_rows[0].get("brd_json")
-            snapshot["brd_version"] = brd_rows[0].get("version")
+            if row:
+                row = dict(row)
+                snapshot["current_phase"] = row.get("current_phase") or "discovery"
+                snapshot["data_tier"] = row.get("data_tier")
+                snapshot["product_type"] = row.get("product_type") or "structured"
+                dp_name = row.get("name") or ""
+                snapshot["data_product_name"] = dp_name
+                if dp_name:
+                    from tools.naming import sanitize_dp_name
+                    sanitized = sanitize_dp_name(dp_name)
+                    snapshot["target_schema_marts"] = f"EKAIX.{sanitized}_MARTS"
+                    snapshot["target_schema_docs"] = f"EKAIX.{sanitized}_DOCS"
+                working_layer = row.get("working_layer")
+                if isinstance(working_layer, str):
+                    try:
+                        working_layer = json.loads(working_layer)
+                    except Exception:
+                        working_layer = None
+                snapshot["transformation_done"] = (
+                    isinstance(working_layer, dict) and len(working_layer) > 0
+                )
+                agent_fqn = row.get("published_agent_fqn")
+                if agent_fqn and isinstance(agent_fqn, str):
+                    snapshot["published_agent_fqn"] = agent_fqn
+
+                # Publish gate: explicit publish markers only. `published_at` is
+                # historical and may remain set after a re-run starts a new lifecycle.
+                gate_phase = row.get("current_phase")
+                snapshot["publish_gate_phase"] = gate_phase if isinstance(gate_phase, str) else None
+                snapshot["already_published"] = (
+                    bool(row.get("state_published")) or row.get("status") == "published"
+                )
+                snapshot["data_product_info"] = _data_product_info_from_row(row)
 
-        doc_rows = await _q(
-            _pool,
-            "SELECT 1 FROM uploaded_documents WHERE data_product_id = $1::uuid LIMIT 1",
-            data_product_id,
-        )
-        snapshot["has_documents"] = bool(doc_rows)
+                snapshot["quality_report_exists"] = bool(row.get("quality_exists"))
+                snapshot["has_documents"] = bool(row.get("has_documents"))
+                if snapshot["has_documents"]:
+                    snapshot["doc_chunks_count"] = row.get("chunk_count", 0)
+                    snapshot["doc_facts_count"] = row.get("fact_count", 0)
+            else:
+                snapshot["data_product_info"] = None
 
-        if snapshot["has_documents"]:
-            count_rows = await _q(
-                _pool,
-                """SELECT
-                     (SELECT count(*) FROM doc_chunks WHERE data_product_id = $1::uuid) AS chunk_count,
-                     (SELECT count(*) FROM doc_facts  WHERE data_product_id = $1::uuid) AS fact_count
-                """,
+            dd_row = await conn.fetchrow(
+                """SELECT description_json, version
+                   FROM data_descriptions
+                   WHERE data_product_id = $1::uuid
+                   ORDER BY version DESC LIMIT 1""",
                 data_product_id,
             )
-            if count_rows:
-                snapshot["doc_chunks_count"] = count_rows[0].get("chunk_count", 0)
-                snapshot["doc_facts_count"] = count_rows[0].get("fact_count", 0)
-
-        sv_rows = await _q(
-            _pool,
-            """SELECT yaml_content, validation_status, version
-               FROM semantic_views
-               WHERE data_product_id = $1::uuid
-               ORDER BY version DESC
-               LIMIT 1""",
-            data_product_id,
-        )
-        snapshot["semantic_view_exists"] = bool(sv_rows)
-        if sv_rows:
-            snapshot["validation_status"] = sv_rows[0].get("validation_status")
-            snapshot["semantic_view_content"] = sv_rows[0].get("yaml_content")
-            snapshot["semantic_view_version"] = sv_rows[0].get("version")
+            snapshot["data_description_exists"] = dd_row is not None
+            if dd_row is not None:
+                snapshot["data_description_content"] = dd_row["description_json"]
+                snapshot["data_description_version"] = dd_row["version"]
+
+            brd_row = await conn.fetchrow(
+                """SELECT brd_json, version
+                   FROM business_requirements
+                   WHERE data_product_id = $1::uuid
+                   ORDER BY version DESC LIMIT 1""",
+                data_product_id,
+            )
+            snapshot["brd_exists"] = brd_row is not None
+            if brd_row is not None:
+                snapshot["brd_content"] = brd_row["brd_json"]
+                snapshot["brd_version"] = brd_row["version"]
+
+            sv_row = await conn.fetchrow(
+                """SELECT yaml_content, validation_status, version
+                   FROM semantic_views
+                   WHERE data_product_id = $1::uuid
+                   ORDER BY version DESC
+                   LIMIT 1""",
+                data_product_id,
+            )
+            snapshot["semantic_view_exists"] = sv_row is not None
+            if sv_row is not None:
+                snapshot["validation_status"] = sv_row["validation_status"]
+                snapshot["semantic_view_content"] = sv_row["yaml_content"]
+                snapshot["semantic_view_version"] = sv_row["version"]
     except Exception as e:
         logger.warning("Failed to load workflow snapshot for %s: %s", data_product_id, e)
 
     return snapshot
 
 
-async def _get_publish_gate_context(data_product_id: str) -> tuple[str | None, bool]:
-    """Return (current_phase, already_published) for publish gating."""
-    try:
-        from services.postgres import get_pool as _gp, query as _q
-        from config import get_effective_settings
-
-        _settings = get_effective_settings()
-        _pool = await _gp(_settings.database_url)
-        rows = await _q(
-            _pool,
-            """SELECT
-                   status,
-                   state->>'current_phase' AS current_phase,
-                   (LOWER(COALESCE(state->>'published', 'false')) IN ('true', 't', '1', 'yes')) AS state_published,
-                   published_at
-               FROM data_products
-               WHERE id = $1::uuid""",
-            data_product_id,
-        )
-        if not rows:
-            return None, False
-
-        row = rows[0]
-        phase = row.get("current_phase")
-        # Use explicit publish markers only. `published_at` is historical and may
-        # remain set after a re-run starts a new lifecycle.
-        already_published = bool(row.get("state_published")) or row.get("status") == "published"
-        return phase if isinstance(phase, str) else None, already_published
-    except Exception as e:
-        logger.warning("Publish gate context lookup failed for %s: %s", data_product_id, e)
-        return None, False
-
-
 @router.post("/message")
 async def send_message(request: InvokeRequest) -> InvokeResponse:
     """Accept a user message and begin asynchronous agent processing.
@@ -2164,18 +2294,18 @@ async def send_message(request: InvokeRequest) -> InvokeResponse:
         request.message[:100],
     )
 
-    # Create a queue for this session's SSE events
-    queue: asyncio.Queue[dict | None] = asyncio.Queue()
-    _active_streams[session_id] = queue
+    # Create a stream session for this turn's SSE events
+    session = _open_stream_session(session_id)
 
     # Launch the agent invocation in the background
-    asyncio.create_task(
+    session.run_task = asyncio.create_task(
         _run_agent(
             session_id,
             request.message,
             str(request.data_product_id),
-            queue,
+            session.queue,
             file_contents=request.file_contents,
+            client_gone=session.client_gone,
         )
     )
 
@@ -2193,20 +2323,19 @@ async def _get_data_product_info(data_product_id: str) -> dict | None:
     or None if not found.
     """
     from services.postgres import get_pool, query
-    from config import get_settings
 
-    settings = get_settings()
-    pool = await get_pool(settings.database_url)
+    pool = await get_pool(_settings.database_url)
     rows = await query(
         pool,
         """SELECT name, description, product_type, database_reference, schemas, tables
            FROM data_products WHERE id = $1""",
         data_product_id,
     )
-    if not rows:
-        return None
+    return _data_product_info_from_row(rows[0]) if rows else None
+
 
-    r = rows[0]
+def _data_product_info_from_row(r: Any) -> dict:
+    """Shape a data_products row into the dict returned by ``_get_data_product_info``."""
     return {
         "name": r["name"],
         "description": r["description"] or "No description provided",
@@ -2217,40 +2346,61 @@ async def _get_data_product_info(data_product_id: str) -> dict | None:
     }
 
 
+_SIMPLIFIED_TYPE_MAP: dict[str, str] = {
+    **dict.fromkeys(
+        (
+            "NUMBER",
+            "FLOAT",
+            "DECIMAL",
+            "INTEGER",
+            "INT",
+            "BIGINT",
+            "SMALLINT",
+            "TINYINT",
+            "DOUBLE",
+            "REAL",
+            "NUMERIC",
+        ),
+        "numeric",
+    ),
+    **dict.fromkeys(
+        ("VARCHAR", "TEXT", "STRING", "CHAR", "NCHAR", "NVARCHAR", "CLOB", "NCLOB"), "text"
+    ),
+    **dict.fromkeys(
+        (
+            "TIMESTAMP_NTZ",
+            "TIMESTAMP_LTZ",
+            "TIMESTAMP_TZ",
+            "TIMESTAMP",
+            "DATE",
+            "DATETIME",
+            "TIME",
+        ),
+        "date/time",
+    ),
+    "BOOLEAN": "boolean",
+    **dict.fromkeys(("VARIANT", "OBJECT", "ARRAY"), "structured"),
+}
+# Default (is_likely_pk, distinct_count, null_pct) for unprofiled columns
+_NO_COLUMN_PROFILE: tuple[bool, int | None, float | None] = (False, None, None)
+# Name suffixes/keywords used by _suggest_field_role and the discovery summary
+_IDENTIFIER_SUFFIXES: tuple[str, ...] = ("_id", "_key")
+_ID_COLUMN_SUFFIXES: tuple[str, ...] = ("_id", "_code", "_key")
+_CODE_LIKE_KEYWORDS: tuple[str, ...] = ("code", "zip", "postal", "phone")
+_DESCRIPTIVE_KEYWORDS: tuple[str, ...] = (
+    "description",
+    "comment",
+    "note",
+    "text",
+    "body",
+    "message",
+    "remark",
+)
+
+
 def _simplify_type(data_type: str) -> str:
     """Simplify Snowflake data type to business-friendly category."""
-    dt = data_type.upper().strip()
-    if dt in (
-        "NUMBER",
-        "FLOAT",
-        "DECIMAL",
-        "INTEGER",
-        "INT",
-        "BIGINT",
-        "SMALLINT",
-        "TINYINT",
-        "DOUBLE",
-        "REAL",
-        "NUMERIC",
-    ):
-        return "numeric"
-    if dt in ("VARCHAR", "TEXT", "STRING", "CHAR", "NCHAR", "NVARCHAR", "CLOB", "NCLOB"):
-        return "text"
-    if dt in (
-        "TIMESTAMP_NTZ",
-        "TIMESTAMP_LTZ",
-        "TIMESTAMP_TZ",
-        "TIMESTAMP",
-        "DATE",
-        "DATETIME",
-        "TIME",
-    ):
-        return "date/time"
-    if dt == "BOOLEAN":
-        return "boolean"
-    if dt in ("VARIANT", "OBJECT", "ARRAY"):
-        return "structured"
-    return "text"
+    return _SIMPLIFIED_TYPE_MAP.get(data_type.upper().strip(), "text")
 
 
 def _suggest_field_role(
@@ -2264,7 +2414,7 @@ def _suggest_field_role(
     name_lower = col_name.lower()
 
     # ID fields
-    if is_pk or name_lower.endswith("_id") or name_lower.endswith("_key") or name_lower == "id":
+    if is_pk or name_lower.endswith(_IDENTIFIER_SUFFIXES) or name_lower == "id":
         return "identifier"
 
     # Date/time → time dimension
@@ -2274,7 +2424,7 @@ def _suggest_field_role(
     # Numeric fields (not IDs) → potential measure
     if simplified_type == "numeric":
         # Skip fields that look like codes or counts of categories
-        if any(kw in name_lower for kw in ("code", "zip", "postal", "phone")):
+        if any(kw in name_lower for kw in _CODE_LIKE_KEYWORDS):
             return "potential dimension"
         return "potential measure"
 
@@ -2290,10 +2440,7 @@ def _suggest_field_role(
         return "potential dimension"
 
     # Descriptive text fields
-    if any(
-        kw in name_lower
-        for kw in ("description", "comment", "note", "text", "body", "message", "remark")
-    ):
+    if any(kw in name_lower for kw in _DESCRIPTIVE_KEYWORDS):
         return "descriptive"
 
     return ""
@@ -2607,6 +2754,85 @@ tool_resources:
         )
 
 
+_DISCOVERY_SECTION_RULE = "═══════════════════════════════════════════════════════\n"
+_DISCOVERY_SUMMARY_HEADER = (
+    "[INTERNAL CONTEXT — NOT FOR USER DISPLAY]\n\n"
+    + _DISCOVERY_SECTION_RULE
+    + "PRE-COMPUTED DISCOVERY RESULTS\n"
+    + _DISCOVERY_SECTION_RULE
+)
+_DISCOVERY_TABLES_BANNER = (
+    _DISCOVERY_SECTION_RULE + "TABLE DETAILS & FIELD ANALYSIS\n" + _DISCOVERY_SECTION_RULE
+)
+_DISCOVERY_QUALITY_BANNER = _DISCOVERY_SECTION_RULE + "DATA QUALITY\n" + _DISCOVERY_SECTION_RULE
+_DISCOVERY_MATURITY_BANNER = (
+    _DISCOVERY_SECTION_RULE
+    + "DATA READINESS (maturity_classifications)\n"
+    + _DISCOVERY_SECTION_RULE
+)
+_DISCOVERY_TASK_INSTRUCTIONS_HEAD = (
+    _DISCOVERY_SECTION_RULE
+    + "YOUR TASK\n"
+    + _DISCOVERY_SECTION_RULE
+    + """All profiling, classification, and quality checks are ALREADY DONE.
+Quality report artifact is ALREADY saved.
+
+The data map (ERD) and connections have NOT been built yet. You will build
+them AFTER your conversation with the user.
+
+Your job is to:
+1. Identify the business domain from table/field naming patterns
+2. Recognize each table's likely business role (transaction vs reference)
+3. Weave the quality score in naturally
+4. Form relationship HYPOTHESES from _id columns and naming patterns
+5. Using the FIELD ANALYSIS above, propose a focused set of specific metrics this
+   data could support. Use fields tagged "potential measure" for metrics and
+   fields tagged "potential dimension" for grouping options.
+6. Ask focused validation questions that cover unknown or ambiguous areas only.
+   For each: state your inference, then ask the user to confirm. Example:
+   "I suspect X connects to Y through Z — does that match your understanding?
+   If you're not sure, I'll proceed with my analysis."
+
+RULES:
+- Do NOT call tools on this first message — document intelligence is ALREADY pre-computed in the DOCUMENT INTELLIGENCE section below (if documents exist). Use that context directly to form enriched questions. You may call search_document_chunks later for deeper exploration.
+- Do NOT repeat the data above verbatim — interpret it in business language
+"""
+)
+_DISCOVERY_TASK_INSTRUCTIONS_TAIL = """- Use table short names (e.g. "your Customers table") not FQNs
+- Your suggested metrics MUST reference actual field names from the analysis above
+  Use format: business name (FIELD_NAME) — e.g. "average reading value (VALUE)"
+- If the user's description states their goal, tailor your suggestions to it.
+  Do NOT re-ask what they want to do — they already told you. Confirm understanding.
+- DATA ISOLATION: ONLY discuss the tables listed above. You know NOTHING about
+  any other databases, schemas, or tables in this Snowflake account. They do not
+  exist to you. NEVER mention or speculate about any other datasets.
+══════════════════════════════════════════════════════════════════"""
+
+
+def _escape_format_braces(text: str) -> str:
+    """Escape literal braces so *text* can be embedded in a str.format template."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+# Fixed boilerplate is assembled once; _build_discovery_summary fills the slots.
+_DISCOVERY_SUMMARY_TEMPLATE = (
+    _escape_format_braces(_DISCOVERY_SUMMARY_HEADER)
+    + "Data Product: {dp_name}{desc_line}\n"
+    + "Data Product ID (for tool calls only): {data_product_id}\n"
+    + "Tables analyzed: {table_count} ({fact_count} transaction, {dim_count} reference)\n\n"
+    + _escape_format_braces(_DISCOVERY_TABLES_BANNER)
+    + "{table_text}\n\n"
+    + _escape_format_braces(_DISCOVERY_QUALITY_BANNER)
+    + "Score: {score}/100 (average completeness: {completeness:.0f}%)\n"
+    + "{issue_summary}\n\n"
+    + _escape_format_braces(_DISCOVERY_MATURITY_BANNER)
+    + "{maturity_section}\n\n"
+    + _escape_format_braces(_DISCOVERY_TASK_INSTRUCTIONS_HEAD)
+    + '- Refer to the data product as "{dp_name}"\n'
+    + _escape_format_braces(_DISCOVERY_TASK_INSTRUCTIONS_TAIL)
+)
+
+
 def _build_discovery_summary(
     pipeline_results: dict,
     dp_name: str,
@@ -2625,14 +2851,17 @@ def _build_discovery_summary(
     quality = pipeline_results.get("quality", {})
     maturity = pipeline_results.get("maturity_classifications", {})
 
-    # Build profile lookup: fqn -> {column -> profile_data}
-    profile_lookup: dict[str, dict[str, dict]] = {}
+    # Build profile lookup: fqn -> {column -> (is_likely_pk, distinct_count, null_pct)}
+    profile_lookup: dict[str, dict[str, tuple[bool, int | None, float | None]]] = {}
     for p in profiles:
-        table_fqn = p.get("table", "")
-        col_map: dict[str, dict] = {}
-        for col in p.get("columns", []):
-            col_map[col.get("column", "")] = col
-        profile_lookup[table_fqn] = col_map
+        profile_lookup[p.get("table", "")] = {
+            col.get("column", ""): (
+                col.get("is_likely_pk", False),
+                col.get("distinct_count"),
+                col.get("null_pct"),
+            )
+            for col in p.get("columns", [])
+        }
 
     # For large datasets (>15 tables), only include the most interesting columns
     # per table to keep the summary under ~15K chars. PKs, FKs, and role-tagged
@@ -2647,8 +2876,8 @@ def _build_discovery_summary(
     else:
         _MAX_COLS_PER_TABLE_LARGE = 12
 
-    # Build table detail sections (tables + field analysis)
-    table_sections = []
+    # Table detail lines (tables + field analysis), joined once below
+    table_lines: list[str] = []
     for table in metadata:
         fqn = table["fqn"]
         name = table["name"]
@@ -2664,14 +2893,12 @@ def _build_discovery_summary(
         all_field_entries: list[tuple[int, str]] = []  # (priority, line)
         for col in table.get("columns", []):
             col_name = col["name"]
+            col_lower = col_name.lower()
             raw_type = col.get("data_type", "")
             simple_type = _simplify_type(raw_type)
 
             # Get profiling info
-            prof = col_profiles.get(col_name, {})
-            is_pk = prof.get("is_likely_pk", False)
-            distinct = prof.get("distinct_count")
-            null_pct = prof.get("null_pct")
+            is_pk, distinct, null_pct = col_profiles.get(col_name, _NO_COLUMN_PROFILE)
 
             role = _suggest_field_role(col_name, simple_type, is_pk, distinct, null_pct)
 
@@ -2679,7 +2906,7 @@ def _build_discovery_summary(
             priority = 5
             if is_pk:
                 priority = 0
-            elif col_name.lower().endswith("_id") or col_name.lower() == "id":
+            elif col_lower.endswith("_id") or col_lower == "id":
                 priority = 1
             elif role in ("potential measure", "potential time dimension"):
                 priority = 2 if "measure" in role else 3
@@ -2694,13 +2921,8 @@ def _build_discovery_summary(
                 parts.append(f"{distinct} values")
             # Only show completeness for identifier columns — non-ID sparseness
             # is structurally expected (e.g., coal fields on solar plants)
-            col_lower = col_name.lower()
             is_id_col = (
-                is_pk
-                or col_lower.endswith("_id")
-                or col_lower == "id"
-                or col_lower.endswith("_code")
-                or col_lower.endswith("_key")
+                is_pk or col_lower == "id" or col_lower.endswith(_ID_COLUMN_SUFFIXES)
             )
             if is_id_col and null_pct is not None and null_pct > 5:
                 parts.append(f"{100 - null_pct:.0f}% complete")
@@ -2720,8 +2942,11 @@ def _build_discovery_summary(
         else:
             field_lines = [line for _, line in all_field_entries]
 
-        section = f"  {name} ({biz_type}{row_str})\n" + "\n".join(field_lines)
-        table_sections.append(section)
+        table_lines.append(f"  {name} ({biz_type}{row_str})")
+        if field_lines:
+            table_lines.extend(field_lines)
+        else:
+            table_lines.append("")
 
     # Quality summary
     score = quality.get("overall_score", 0)
@@ -2733,73 +2958,30 @@ def _build_discovery_summary(
         issue_lines = [f"  - {i['message']}" for i in top_issues]
         issue_summary = "\nNotable issues:\n" + "\n".join(issue_lines)
 
-    # Counts
-    fact_count = sum(1 for v in classifications.values() if v == "FACT")
-    dim_count = sum(1 for v in classifications.values() if v == "DIMENSION")
+    # Counts (single pass over classifications)
+    classification_counts = Counter(classifications.values())
+    fact_count = classification_counts["FACT"]
+    dim_count = classification_counts["DIMENSION"]
 
     # Description line
     desc_line = f"\nUser's description: {dp_description}" if dp_description else ""
 
-    summary = f"""[INTERNAL CONTEXT — NOT FOR USER DISPLAY]
-
-═══════════════════════════════════════════════════════
-PRE-COMPUTED DISCOVERY RESULTS
-═══════════════════════════════════════════════════════
-Data Product: {dp_name}{desc_line}
-Data Product ID (for tool calls only): {data_product_id}
-Tables analyzed: {len(metadata)} ({fact_count} transaction, {dim_count} reference)
-
-═══════════════════════════════════════════════════════
-TABLE DETAILS & FIELD ANALYSIS
-═══════════════════════════════════════════════════════
-{chr(10).join(table_sections)}
-
-═══════════════════════════════════════════════════════
-DATA QUALITY
-═══════════════════════════════════════════════════════
-Score: {score}/100 (average completeness: {completeness:.0f}%)
-{issue_summary}
-
-═══════════════════════════════════════════════════════
-DATA READINESS (maturity_classifications)
-═══════════════════════════════════════════════════════
-{_build_maturity_section(maturity, metadata)}
-
-═══════════════════════════════════════════════════════
-YOUR TASK
-═══════════════════════════════════════════════════════
-All profiling, classification, and quality checks are ALREADY DONE.
-Quality report artifact is ALREADY saved.
-
-The data map (ERD) and connections have NOT been built yet. You will build
-them AFTER your conversation with the user.
-
-Your job is to:
-1. Identify the business domain from table/field naming patterns
-2. Recognize each table's likely business role (transaction vs reference)
-3. Weave the quality score in naturally
-4. Form relationship HYPOTHESES from _id columns and naming patterns
-5. Using the FIELD ANALYSIS above, propose a focused set of specific metrics this
-   data could support. Use fields tagged "potential measure" for metrics and
-   fields tagged "potential dimension" for grouping options.
-6. Ask focused validation questions that cover unknown or ambiguous areas only.
-   For each: state your inference, then ask the user to confirm. Example:
-   "I suspect X connects to Y through Z — does that match your understanding?
-   If you're not sure, I'll proceed with my analysis."
-
-RULES:
-- Do NOT call tools on this first message — document intelligence is ALREADY pre-computed in the DOCUMENT INTELLIGENCE section below (if documents exist). Use that context directly to form enriched questions. You may call search_document_chunks later for deeper exploration.
-- Do NOT repeat the data above verbatim — interpret it in business language
-- Refer to the data product as "{dp_name}"
-- Use table short names (e.g. "your Customers table") not FQNs
-- Your suggested metrics MUST reference actual field names from the analysis above
-  Use format: business name (FIELD_NAME) — e.g. "average reading value (VALUE)"
-- If the user's description states their goal, tailor your suggestions to it.
-  Do NOT re-ask what they want to do — they already told you. Confirm understanding.
-- DATA ISOLATION: ONLY discuss the tables listed above. You know NOTHING about
-  any other databases, schemas, or tables in this Snowflake account. They do not
-  exist to you. NEVER mention or speculate about any other datasets.
-══════════════════════════════════════════════════════════════════"""
+    table_text = "\n".join(table_lines)
+    summary = _DISCOVERY_SUMMARY_TEMPLATE.format_map(
+        {
+            "dp_name": dp_name,
+            "desc_line": desc_line,
+            "data_product_id": data_product_id,
+            "table_count": len(metadata),
+            "fact_count": fact_count,
+            "dim_count": dim_count,
+            "table_text": table_text,
+            "score": score,
+            "completeness": completeness,
+            "issue_summary": issue_summary,
+            "maturity_section": _build_maturity_section(maturity, metadata),
+        }
+    )
 
     # Hard cap: if summary exceeds 15K chars, the LLM may hang or produce
     # empty output. Truncate table sections to fit.
@@ -2812,30 +2994,21 @@ RULES:
             _MAX_SUMMARY_CHARS,
         )
         # Find where table sections end and truncate
-        marker = "═══════════════════════════════════════════════════════\nDATA QUALITY"
-        marker_pos = summary.find(marker)
+        marker_pos = summary.find(_DISCOVERY_QUALITY_BANNER)
         if marker_pos > 0:
             # Get prefix (before tables) and suffix (quality + task sections)
-            prefix_end = summary.find(
-                "═══════════════════════════════════════════════════════\nTABLE DETAILS"
-            )
+            prefix_end = summary.find(_DISCOVERY_TABLES_BANNER)
             suffix = summary[marker_pos:]
             prefix = summary[:prefix_end] if prefix_end > 0 else ""
             # Available space for table sections
             available = _MAX_SUMMARY_CHARS - len(prefix) - len(suffix) - 200
-            table_text = chr(10).join(table_sections)
             if len(table_text) > available:
                 # Truncate table text and add note
                 table_text = (
                     table_text[:available]
                     + f"\n\n  ... ({len(metadata)} tables total — showing key columns only)"
                 )
-            summary = f"""{prefix}═══════════════════════════════════════════════════════
-TABLE DETAILS & FIELD ANALYSIS
-═══════════════════════════════════════════════════════
-{table_text}
-
-{suffix}"""
+            summary = f"{prefix}{_DISCOVERY_TABLES_BANNER}{table_text}\n\n{suffix}"
         else:
             # Fallback: hard truncate
             summary = summary[:_MAX_SUMMARY_CHARS] + "\n... (truncated)"
@@ -2877,7 +3050,7 @@ async def _build_document_intelligence(
             # Skip generic columns (IDs, timestamps, metadata)
             if cname_lower in ("id", "created_at", "updated_at", "row_id"):
                 continue
-            if cname_lower.endswith("_id") or cname_lower.endswith("_key"):
+            if cname_lower.endswith(_IDENTIFIER_SUFFIXES):
                 continue
             # Business-relevant columns become search terms
             # Convert SNAKE_CASE to space-separated words
@@ -3617,10 +3790,15 @@ async def _run_agent(
     session_id: str,
     message: str,
     data_product_id: str,
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
     file_contents: list | None = None,
+    client_gone: asyncio.Event | None = None,
 ) -> None:
     """Run the orchestrator agent and push events to the SSE queue."""
+    # All events go through the coalescer so buffered tokens are flushed ahead
+    # of any non-token event, preserving stream order.
+    stream = _TokenCoalescer(queue, client_gone=client_gone)
+
     # --- Langfuse scoring ---
     from services.langfuse_scoring import (
         PipelineTimer,
@@ -3640,6 +3818,7 @@ async def _run_agent(
     # Local assistant text buffer for SSE streaming and safety net (BRD detection).
     # Chat history persistence is handled by LangGraph's PostgreSQL checkpointer.
     _assistant_texts: list[str] = []
+    _longest_assistant_text = ""  # Longest entry in _assistant_texts (DD safety net)
     current_assistant_content = ""
     # Track which LLM run_id is currently streaming to detect when a new
     # agent starts speaking (prevents concatenating subagent + orchestrator output)
@@ -3655,8 +3834,8 @@ async def _run_agent(
     _subagent_completed: bool = False  # True after a `task` tool returns
     _previous_run_content: str = ""  # Last subagent run's text (for safety net)
     # Per-run dedup: buffer initial tokens to detect duplicate LLM runs within a task
-    _DEDUP_CHECK_LEN = 80
     _run_token_buffer: list[str] = []
+    _run_token_buffer_len: int = 0  # Running char count of _run_token_buffer
     _run_dedup_resolved: bool = True  # True once dedup check is done or not needed
     _run_suppressed: bool = False  # True if current run is a duplicate
     # Safety net: track whether save_data_description was called during discovery conversation
@@ -3697,14 +3876,6 @@ async def _run_agent(
     _query_route_plan: dict[str, Any] | None = None
     _last_model_end_output_text: str = ""
     # Phase tracking: detect subagent transitions
-    _SUBAGENT_PHASE_MAP: dict[str, str] = {
-        "discovery-agent": "discovery",
-        "transformation-agent": "prepare",  # between discovery and requirements
-        "modeling-agent": "generation",  # internal — maps to generation phase
-        "model-builder": "requirements",  # default; refined by tool detection
-        "publishing-agent": "publishing",
-        "explorer-agent": "explorer",
-    }
     _current_phase: str = "idle"
     _last_reasoning_update: str = ""
     _last_reasoning_emit_at: float = 0.0
@@ -3725,7 +3896,7 @@ async def _run_agent(
         if now_ts - _last_reasoning_emit_at < _reasoning_min_interval_sec:
             return
 
-        await queue.put(
+        await stream.put(
             {
                 "type": "reasoning_update",
                 "data": {"message": snippet, "source": source},
@@ -3736,13 +3907,13 @@ async def _run_agent(
 
     try:
         from agents.orchestrator import get_orchestrator
-        from config import get_effective_settings
 
         workflow_snapshot = await _get_workflow_snapshot(data_product_id)
         _current_phase = str(workflow_snapshot.get("current_phase") or "idle")
         supervisor_forced_phase: str | None = None
         supervisor_transition_reason: str | None = None
-        publish_phase, already_published = await _get_publish_gate_context(data_product_id)
+        publish_phase: str | None = workflow_snapshot.get("publish_gate_phase")
+        already_published = bool(workflow_snapshot.get("already_published"))
 
         # Check if this is a discovery trigger
         actual_message = message
@@ -3762,7 +3933,13 @@ async def _run_agent(
             and not analysis_only_no_publish_intent
             and _is_end_to_end_autopilot_intent(message)
         )
-        dp_info: dict | None = None  # Set inside discovery block, used for timeout check
+        # Resolved once per run and reused for the discovery pipeline, the
+        # large-discovery timeout check and data isolation below. The snapshot
+        # already read the row; only fall back to a query if it failed.
+        if "data_product_info" in workflow_snapshot:
+            dp_info = workflow_snapshot["data_product_info"]
+        else:
+            dp_info = await _get_data_product_info(data_product_id)
         if is_discovery:
             _inside_task = True  # Discovery: orchestrator interprets summary directly
             logger.info(
@@ -3772,7 +3949,7 @@ async def _run_agent(
             )
             # Emit phase change to discovery
             _current_phase = "discovery"
-            await queue.put(
+            await stream.put(
                 {
                     "type": "phase_change",
                     "data": {"from": "idle", "to": "discovery"},
@@ -3833,8 +4010,7 @@ async def _run_agent(
             # Keep persisted phase aligned for both forced and non-forced discovery starts.
             await _persist_phase(data_product_id, "discovery")
 
-            # 1. Get data product details
-            dp_info = await _get_data_product_info(data_product_id)
+            # 1. Data product details (fetched above)
             if dp_info is None:
                 actual_message = "Please tell me about the data you want to analyze."
             elif not dp_info["tables"]:
@@ -3848,7 +4024,7 @@ async def _run_agent(
                     tables=dp_info["tables"],
                     database=dp_info["database"],
                     schemas=dp_info["schemas"],
-                    queue=queue,
+                    queue=stream,
                     force=force_rerun,
                 )
 
@@ -3864,15 +4040,16 @@ async def _run_agent(
                         artifact_ids = cached_artifacts.get("artifact_ids", {})
                         # Map storage types to frontend types — only quality_report in Phase 1
                         # ERD comes later from the discovery conversation (Phase 2)
-                        _ART_TYPE_MAP = {"quality_report": "data_quality"}
                         for art_type, art_id in artifact_ids.items():
                             if art_id and art_type == "quality_report":
-                                await queue.put(
+                                await stream.put(
                                     {
                                         "type": "artifact",
                                         "data": {
                                             "artifact_id": art_id,
-                                            "artifact_type": _ART_TYPE_MAP.get(art_type, art_type),
+                                            "artifact_type": _FRONTEND_ARTIFACT_TYPE_MAP.get(
+                                                art_type, art_type
+                                            ),
                                         },
                                     }
                                 )
@@ -3891,7 +4068,7 @@ async def _run_agent(
                             _cached_tier = "gold"
                     else:
                         _cached_tier = "gold"
-                    await queue.put(
+                    await stream.put(
                         {
                             "type": "data_maturity",
                             "data": {"tier": _cached_tier},
@@ -3970,7 +4147,7 @@ async def _run_agent(
                     else:
                         _aggregate_tier = "gold"
 
-                    await queue.put(
+                    await stream.put(
                         {
                             "type": "data_maturity",
                             "data": {"tier": _aggregate_tier},
@@ -4004,7 +4181,7 @@ async def _run_agent(
                         _current_phase = "requirements"
                         workflow_snapshot["current_phase"] = "requirements"
                         _pipeline_timer.phase_started("requirements")
-                        await queue.put(
+                        await stream.put(
                             {
                                 "type": "phase_change",
                                 "data": {"from": old_phase, "to": "requirements"},
@@ -4042,7 +4219,7 @@ async def _run_agent(
                 _current_phase = supervisor_forced_phase
                 workflow_snapshot["current_phase"] = supervisor_forced_phase
                 _pipeline_timer.phase_started(supervisor_forced_phase)
-                await queue.put(
+                await stream.put(
                     {
                         "type": "phase_change",
                         "data": {"from": old_phase, "to": supervisor_forced_phase},
@@ -4087,13 +4264,12 @@ async def _run_agent(
         # even if the LLM truncates or mangles the ID in tool call arguments.
         set_data_product_context(data_product_id)
 
-        dp_info_for_isolation = await _get_data_product_info(data_product_id)
-        if dp_info_for_isolation:
+        if dp_info:
             set_data_isolation_context(
-                database=dp_info_for_isolation["database"],
-                tables=dp_info_for_isolation["tables"],
+                database=dp_info["database"],
+                tables=dp_info["tables"],
             )
-            set_data_product_name_context(dp_info_for_isolation["name"])
+            set_data_product_name_context(dp_info["name"])
         else:
             set_data_isolation_context(database=None, tables=None)
 
@@ -4151,7 +4327,20 @@ async def _run_agent(
         # (e.g. task) with no text content.
         from langchain_core.messages import RemoveMessage as _RM
 
-        _chk_state = await agent.aget_state(config)
+        # The checkpoint read and the document context lookup (non-discovery
+        # turns only) hit independent stores, so overlap the two round-trips.
+        document_context_contract: dict[str, Any] | None = None
+        effective_phase = supervisor_forced_phase or _current_phase
+        if is_discovery:
+            _chk_state = await agent.aget_state(config)
+        else:
+            _chk_state, document_context_contract = await asyncio.gather(
+                agent.aget_state(config),
+                _get_document_context_contract(
+                    data_product_id=data_product_id,
+                    phase=effective_phase,
+                ),
+            )
         _chk_msgs = (
             _chk_state.values.get("messages", []) if _chk_state and _chk_state.values else []
         )
@@ -4199,19 +4388,13 @@ async def _run_agent(
         # Wire the SSE queue contextvar so build_erd_from_description can emit artifact events
         from tools.discovery_tools import _sse_queue
 
-        _sse_queue.set(queue)
+        _sse_queue.set(stream)
 
         # With PostgreSQL checkpointer, LangGraph automatically restores
         # conversation history for this thread_id. We only send the new message.
         # Inject supervisor context contract for non-discovery turns only.
         # This keeps subagent routing deterministic without exposing internals to the user.
-        document_context_contract: dict[str, Any] | None = None
         if not is_discovery:
-            effective_phase = supervisor_forced_phase or _current_phase
-            document_context_contract = await _get_document_context_contract(
-                data_product_id=data_product_id,
-                phase=effective_phase,
-            )
             if settings.feature_hybrid_planner:
                 _query_route_plan = _build_query_route_plan(
                     message,
@@ -4312,13 +4495,16 @@ async def _run_agent(
                 len(actual_message),
             )
 
-        # Use wait_for on each iteration to enforce timeout on blocked LLM calls.
-        # A simple `async for` blocks if the LLM never responds.
+        # Bound each iteration to enforce timeout on blocked LLM calls.
+        # A simple `async for` blocks if the LLM never responds. asyncio.timeout
+        # only arms a loop timer, unlike wait_for which wraps every __anext__
+        # in a new Task on Python 3.11.
         _iter = _agent_stream.__aiter__()
         while True:
             try:
                 if _agent_timeout:
-                    event = await asyncio.wait_for(_iter.__anext__(), timeout=_agent_timeout)
+                    async with asyncio.timeout(_agent_timeout):
+                        event = await _iter.__anext__()
                 else:
                     event = await _iter.__anext__()
             except StopAsyncIteration:
@@ -4422,12 +4608,7 @@ async def _run_agent(
                                     current_assistant_content, source="fallback"
                                 )
                             for tok in _run_token_buffer:
-                                await queue.put(
-                                    {
-                                        "type": "token",
-                                        "data": {"content": tok},
-                                    }
-                                )
+                                await stream.put_token(tok)
                         _run_token_buffer = []
 
                     if _current_run_id is not None and current_assistant_content.strip():
@@ -4435,8 +4616,10 @@ async def _run_agent(
                         if _finalized:
                             _previous_run_content = _finalized
                             _assistant_texts.append(_finalized)
+                            if len(_finalized) > len(_longest_assistant_text):
+                                _longest_assistant_text = _finalized
                         current_assistant_content = ""
-                        await queue.put(
+                        await stream.put(
                             {
                                 "type": "message_done",
                                 "data": {"content": _finalized},
@@ -4445,6 +4628,7 @@ async def _run_agent(
                     _current_run_id = run_id
                     # Reset per-run dedup state
                     _run_token_buffer = []
+                    _run_token_buffer_len = 0
                     _run_suppressed = False
                     _run_dedup_resolved = not (_inside_task and bool(_previous_run_content))
                     _current_run_has_llm_reasoning = False
@@ -4476,9 +4660,10 @@ async def _run_agent(
                 # Dedup check: buffer initial tokens and compare with previous run
                 if not _run_dedup_resolved:
                     _run_token_buffer.append(content)
-                    buffered_text = "".join(_run_token_buffer)
-                    if len(buffered_text) >= _DEDUP_CHECK_LEN:
+                    _run_token_buffer_len += len(content)
+                    if _run_token_buffer_len >= _DEDUP_CHECK_LEN:
                         _run_dedup_resolved = True
+                        buffered_text = "".join(_run_token_buffer)
                         if _previous_run_content.startswith(buffered_text.strip()):
                             _run_suppressed = True
                             logger.info(
@@ -4499,20 +4684,17 @@ async def _run_agent(
                                     current_assistant_content, source="fallback"
                                 )
                             for tok in _run_token_buffer:
-                                await queue.put(
-                                    {
-                                        "type": "token",
-                                        "data": {"content": tok},
-                                    }
-                                )
+                                await stream.put_token(tok)
                             _run_token_buffer = []
+                            _run_token_buffer_len = 0
                     continue
 
                 # Normal path — emit token
                 current_assistant_content += content
 
                 # Supervisor firewall: suppress internal reasoning/tool leakage.
-                if _is_internal_reasoning_leak(current_assistant_content):
+                # Only the new chunk's tail is scanned, not the whole message.
+                if _appended_text_leaks(current_assistant_content, len(content)):
                     _run_suppressed = True
                     _stream_firewall_blocks += 1
                     current_assistant_content = ""
@@ -4521,12 +4703,7 @@ async def _run_agent(
                 if not _current_run_has_llm_reasoning:
                     await _emit_reasoning_update(current_assistant_content, source="fallback")
                 _stream_token_count += 1
-                await queue.put(
-                    {
-                        "type": "token",
-                        "data": {"content": content},
-                    }
-                )
+                await stream.put_token(content)
 
             elif kind == "on_tool_start":
                 tool_name = event.get("name", "unknown")
@@ -4562,9 +4739,8 @@ async def _run_agent(
                         _brd_artifact_uploaded = True
                     if art_type:
                         # Map backend artifact types to frontend types
-                        _ARTIFACT_TYPE_MAP = {"quality_report": "data_quality"}
-                        mapped_type = _ARTIFACT_TYPE_MAP.get(art_type, art_type)
-                        await queue.put(
+                        mapped_type = _FRONTEND_ARTIFACT_TYPE_MAP.get(art_type, art_type)
+                        await stream.put(
                             {
                                 "type": "artifact",
                                 "data": {
@@ -4629,7 +4805,7 @@ async def _run_agent(
                         old_phase = _current_phase
                         _current_phase = phase_name
                         _pipeline_timer.phase_started(phase_name)
-                        await queue.put(
+                        await stream.put(
                             {
                                 "type": "phase_change",
                                 "data": {"from": old_phase, "to": phase_name},
@@ -4647,7 +4823,7 @@ async def _run_agent(
                     old_phase = _current_phase
                     _current_phase = "requirements"
                     _pipeline_timer.phase_started("requirements")
-                    await queue.put(
+                    await stream.put(
                         {"type": "phase_change", "data": {"from": old_phase, "to": "requirements"}}
                     )
                     await _persist_phase(data_product_id, "requirements")
@@ -4659,7 +4835,7 @@ async def _run_agent(
                     _current_phase = "generation"
                     _generation_phase_ran = True
                     _pipeline_timer.phase_started("generation")
-                    await queue.put(
+                    await stream.put(
                         {"type": "phase_change", "data": {"from": old_phase, "to": "generation"}}
                     )
                     await _persist_phase(data_product_id, "generation")
@@ -4667,14 +4843,14 @@ async def _run_agent(
                     old_phase = _current_phase
                     _current_phase = "validation"
                     _pipeline_timer.phase_started("validation")
-                    await queue.put(
+                    await stream.put(
                         {"type": "phase_change", "data": {"from": old_phase, "to": "validation"}}
                     )
                     await _persist_phase(data_product_id, "validation")
 
                 # Skip tool_call event for internal `task` tool — phase_change events handle this
                 if tool_name != "task":
-                    await queue.put(
+                    await stream.put(
                         {
                             "type": "tool_call",
                             "data": {
@@ -4866,7 +5042,7 @@ async def _run_agent(
                     logger.info("register_gold_layer completed for session %s", session_id)
                     # Lineage is written to Neo4j inside register_gold_layer —
                     # emit the lineage artifact event so frontend shows it
-                    await queue.put(
+                    await stream.put(
                         {
                             "type": "artifact",
                             "data": {
@@ -4887,15 +5063,8 @@ async def _run_agent(
                         )
 
                 # Emit artifact events for modeling save tools
-                _MODELING_TOOL_ARTIFACT_MAP = {
-                    "save_data_catalog": "data_catalog",
-                    "save_business_glossary": "business_glossary",
-                    "save_metrics_definitions": "metrics",
-                    "save_validation_rules": "validation_rules",
-                    "save_openlineage_artifact": "lineage",
-                }
                 if tool_name in _MODELING_TOOL_ARTIFACT_MAP:
-                    await queue.put(
+                    await stream.put(
                         {
                             "type": "artifact",
                             "data": {
@@ -4993,7 +5162,7 @@ async def _run_agent(
                                 old_phase = _current_phase
                                 _current_phase = "publishing"
                                 _pipeline_timer.phase_started("publishing")
-                                await queue.put(
+                                await stream.put(
                                     {
                                         "type": "phase_change",
                                         "data": {"from": old_phase, "to": "publishing"},
@@ -5015,7 +5184,7 @@ async def _run_agent(
                                 output_error[:300],
                             )
 
-                await queue.put(
+                await stream.put(
                     {
                         "type": "tool_result",
                         "data": {
@@ -5117,13 +5286,8 @@ async def _run_agent(
             recovered_text = _sanitize_assistant_text(_last_model_end_output_text)
             if recovered_text and not _is_internal_reasoning_leak(recovered_text):
                 current_assistant_content = recovered_text
-                await queue.put(
-                    {
-                        "type": "token",
-                        "data": {"content": recovered_text},
-                    }
-                )
-                await queue.put(
+                await stream.put_token(recovered_text)
+                await stream.put(
                     {
                         "type": "message_done",
                         "data": {"content": recovered_text},
@@ -5178,13 +5342,8 @@ async def _run_agent(
             )
             current_assistant_content = _sanitize_assistant_text(fallback_msg)
             for token_chunk in [fallback_msg]:
-                await queue.put(
-                    {
-                        "type": "token",
-                        "data": {"content": _sanitize_assistant_text(token_chunk)},
-                    }
-                )
-            await queue.put(
+                await stream.put_token(_sanitize_assistant_text(token_chunk))
+            await stream.put(
                 {
                     "type": "message_done",
                     "data": {"content": _sanitize_assistant_text(fallback_msg)},
@@ -5210,9 +5369,7 @@ async def _run_agent(
         )
         _trust_contract_enabled = True
         try:
-            from config import get_effective_settings as _get_effective_settings
-
-            _trust_contract_enabled = _get_effective_settings().feature_trust_ux_contract
+            _trust_contract_enabled = get_effective_settings().feature_trust_ux_contract
         except Exception:
             _trust_contract_enabled = True
         if _query_route_plan:
@@ -5248,7 +5405,7 @@ async def _run_agent(
                     if dp_name:
                         fallback_chunks = _search_preview(dp_name, message, limit=10)
                         if fallback_chunks:
-                            await queue.put({
+                            await stream.put({
                                 "type": "document_evidence",
                                 "data": {
                                     "source": "system_search_preview_fallback",
@@ -5264,7 +5421,7 @@ async def _run_agent(
                     logger.warning("System doc search fallback failed: %s", e)
 
         if _failure_plan_message:
-            await queue.put(
+            await stream.put(
                 {
                     "type": "status",
                     "data": {
@@ -5291,13 +5448,8 @@ async def _run_agent(
                 "Please review the latest artifacts and tell me to continue."
             )
             current_assistant_content = fallback_msg
-            await queue.put(
-                {
-                    "type": "token",
-                    "data": {"content": fallback_msg},
-                }
-            )
-            await queue.put(
+            await stream.put_token(fallback_msg)
+            await stream.put(
                 {
                     "type": "message_done",
                     "data": {"content": _sanitize_assistant_text(fallback_msg)},
@@ -5309,10 +5461,12 @@ async def _run_agent(
             safe_final = _sanitize_assistant_text(current_assistant_content)
             if safe_final:
                 _assistant_texts.append(safe_final)
+                if len(safe_final) > len(_longest_assistant_text):
+                    _longest_assistant_text = safe_final
 
         # Emit a final trust contract for the UI even when no explicit failure occurred.
         if not _failure_plan_message and _trust_contract_enabled:
-            await queue.put(
+            await stream.put(
                 {
                     "type": "status",
                     "data": {
@@ -5324,18 +5478,12 @@ async def _run_agent(
 
         # --- Safety net: save Data Description if discovery agent produced text but didn't call save_data_description ---
         if _discovery_conversation_ran and not _dd_tool_called:
-            dd_content = ""
-            for text in _assistant_texts:
-                if len(text) > len(dd_content):
-                    dd_content = text
-            _DD_MARKERS = (
-                "[1] System Architecture",
-                "[2] Business Context",
-                "---BEGIN DATA DESCRIPTION---",
-                "[6] Data Map",
+            dd_content = _longest_assistant_text
+            # Only scan for markers once the text is long enough to qualify.
+            has_dd_markers = len(dd_content) > 1000 and any(
+                marker in dd_content for marker in _DD_MARKERS
             )
-            has_dd_markers = any(marker in dd_content for marker in _DD_MARKERS)
-            if len(dd_content) > 1000 and has_dd_markers:
+            if has_dd_markers:
                 logger.warning(
                     "Safety net: discovery agent did not call save_data_description for session %s — saving programmatically",
                     session_id,
@@ -5348,7 +5496,7 @@ async def _run_agent(
 
                     pool = await _get_pool()
                     dd_id = str(_uuid4())
-                    clean_json = json.dumps({"document": dd_content})
+                    clean_json = orjson.dumps({"document": dd_content}).decode()
                     sql = """
                     INSERT INTO data_descriptions (id, data_product_id, description_json, created_by)
                     VALUES ($1::uuid, $2::uuid, $3::jsonb, $4)
@@ -5357,16 +5505,25 @@ async def _run_agent(
                     logger.info("Safety net: Data Description saved (dd_id=%s)", dd_id)
                     _dd_tool_called = True
 
-                    # Upload artifact
+                    # Upload artifact only once the description row exists, so a
+                    # failed insert never leaves an orphaned artifact behind. An
+                    # upload failure must not skip the event or the ERD build:
+                    # the description itself is already saved.
                     from tools.minio_tools import upload_artifact_programmatic
 
-                    await upload_artifact_programmatic(
-                        data_product_id=data_product_id,
-                        artifact_type="data_description",
-                        filename="data-description.json",
-                        content=dd_content,
-                    )
-                    await queue.put(
+                    try:
+                        await upload_artifact_programmatic(
+                            data_product_id=data_product_id,
+                            artifact_type="data_description",
+                            filename="data-description.json",
+                            content=dd_content,
+                        )
+                    except Exception as upload_err:
+                        logger.error(
+                            "Safety net: failed to upload Data Description artifact: %s",
+                            upload_err,
+                        )
+                    await stream.put(
                         {
                             "type": "artifact",
                             "data": {
@@ -5386,7 +5543,7 @@ async def _run_agent(
                             )
                             erd_artifact_id = erd_result.get("erd_artifact_id")
                             if erd_artifact_id:
-                                await queue.put(
+                                await stream.put(
                                     {
                                         "type": "artifact",
                                         "data": {
@@ -5423,10 +5580,8 @@ async def _run_agent(
         # Chat history is now persisted automatically by LangGraph's PostgreSQL checkpointer.
         try:
             from services.postgres import get_pool, execute
-            from config import get_settings
 
-            settings = get_settings()
-            pool = await get_pool(settings.database_url)
+            pool = await get_pool(_settings.database_url)
             await execute(
                 pool,
                 """UPDATE data_products
@@ -5461,7 +5616,7 @@ async def _run_agent(
                 )
             # ──────────────────────────────────────────────────────────────
 
-            await queue.put(
+            await stream.put(
                 {
                     "type": "phase_change",
                     "data": {"from": _current_phase, "to": "explorer"},
@@ -5475,13 +5630,12 @@ async def _run_agent(
 
         # Persist answer evidence packet for auditability and trust UX playback.
         try:
-            from config import get_effective_settings as _get_effective_settings
             from services.postgres import execute as _pg_execute
             from services.postgres import get_pool as _pg_get_pool
             from services.postgres import query as _pg_query
 
             _pool = await _pg_get_pool(_settings.database_url)
-            _effective_settings = _get_effective_settings()
+            _effective_settings = get_effective_settings()
             _model_signature = _resolve_llm_signature_for_audit(_effective_settings)
             _exists_rows = await _pg_query(
                 _pool,
@@ -5539,11 +5693,10 @@ async def _run_agent(
                 # Citation check only applies to explorer phase — pipeline phases
                 # (discovery/requirements/generation/validation/publishing) use artifacts,
                 # not live document queries, so citation_missing is a false positive there.
-                _citation_check_phases = {"explorer", ""}
                 if (
                     _trust_state in {"answer_ready", "answer_with_warnings"}
                     and not (_sql_refs or _fact_refs or _chunk_refs)
-                    and _current_phase in _citation_check_phases
+                    and _current_phase in _CITATION_CHECK_PHASES
                 ):
                     logger.warning(
                         "OPS_ALERT[citation_missing] session=%s source_mode=%s trust_state=%s phase=%s",
@@ -5615,72 +5768,293 @@ async def _run_agent(
             logger.warning("Failed to persist qa_evidence for session %s: %s", session_id, e)
 
         # Signal stream end
-        await queue.put(
+        await stream.put(
             {
                 "type": "done",
                 "data": {"message": "Agent processing complete"},
             }
         )
-        await queue.put(None)  # Sentinel to close the generator
+        await stream.put(None)  # Sentinel to close the generator
+
+
+def _format_sse_event(event: AgentStreamEvent) -> bytes:
+    """Frame a stream event as SSE bytes (orjson encodes straight to bytes)."""
+    return (
+        b"event: "
+        + event.type.encode()
+        + b"\ndata: "
+        + orjson.dumps(event.model_dump(mode="json"))
+        + b"\n\n"
+    )
+
+
+# SSE frame head ("event:" line + start of the JSON envelope) per known event type
+_EVENT_FRAME_PREFIX: dict[str, bytes] = {
+    t: f'event: {t}\ndata: {{"type":"{t}","data":'.encode() for t in get_args(StreamEventType)
+}
 
 
-async def _event_generator(session_id: str) -> AsyncGenerator[str, None]:
+def _format_event_frame(item: dict[str, Any]) -> bytes:
+    """Frame a queued event dict as SSE bytes.
+
+    Known event types whose data orjson can encode natively are framed
+    directly; anything else (unknown types, Decimal, models, non-str keys)
+    is serialized through ``AgentStreamEvent``.
+    """
+    event_type = item["type"]
+    data = item["data"]
+    prefix = _EVENT_FRAME_PREFIX.get(event_type)
+    if prefix is not None and isinstance(data, dict):
+        try:
+            data_json = orjson.dumps(data, option=orjson.OPT_UTC_Z)
+        except TypeError:
+            pass
+        else:
+            return prefix + data_json + b',"timestamp":' + _frame_timestamp_json() + b"}\n\n"
+    # Queue items are produced in-process, so skip validation: model_dump's
+    # JSON-mode serializer still converts the non-native values.
+    event = AgentStreamEvent.model_construct(
+        type=event_type,
+        data=data,
+        timestamp=_frame_timestamp()[0],
+    )
+    return _format_sse_event(event)
+
+
+_FRAME_TIMESTAMP_TICKS_PER_SEC = 100  # Frame timestamps are reused within 10ms
+_frame_timestamp_cache: tuple[int, datetime, bytes] = (
+    0,
+    datetime.fromtimestamp(0, tz=timezone.utc),
+    b'""',
+)
+
+
+def _frame_timestamp() -> tuple[datetime, bytes]:
+    """Return the current UTC time and its JSON encoding, reused within 10ms.
+
+    Events are produced in bursts; datetime construction + encoding is done
+    at most once per tick instead of once per frame.
+    """
+    global _frame_timestamp_cache
+    now = time.time()
+    tick = int(now * _FRAME_TIMESTAMP_TICKS_PER_SEC)
+    if _frame_timestamp_cache[0] != tick:
+        ts = datetime.fromtimestamp(now, tz=timezone.utc)
+        _frame_timestamp_cache = (tick, ts, orjson.dumps(ts, option=orjson.OPT_UTC_Z))
+    return _frame_timestamp_cache[1], _frame_timestamp_cache[2]
+
+
+def _frame_timestamp_json() -> bytes:
+    """Return the cached frame timestamp as a JSON string."""
+    return _frame_timestamp()[1]
+
+
+_TOKEN_FRAME_PREFIX = _EVENT_FRAME_PREFIX["token"] + b'{"content":'
+
+
+def _format_token_frame(content: str) -> bytes:
+    """Pre-frame a token event as SSE bytes.
+
+    Tokens are the bulk of stream traffic, so the producer queues them already
+    framed: no per-token event dict, model validation or re-encoding in the
+    generator. The envelope matches ``_format_sse_event`` output.
+    """
+    return (
+        _TOKEN_FRAME_PREFIX
+        + orjson.dumps(content)
+        + b'},"timestamp":'
+        + _frame_timestamp_json()
+        + b"}\n\n"
+    )
+
+
+_TOKEN_COALESCE_MAX_CHARS = 64
+_TOKEN_COALESCE_MAX_DELAY_SEC = 0.02
+
+
+class _TokenCoalescer:
+    """Producer-side front for a session queue that merges token bursts.
+
+    Tokens arriving within a short window are joined into one SSE frame,
+    flushed once the buffer reaches ``_TOKEN_COALESCE_MAX_CHARS`` or the
+    oldest buffered token is ``_TOKEN_COALESCE_MAX_DELAY_SEC`` old (a timer
+    guarantees the flush when the LLM goes quiet). Any other event flushes
+    pending tokens first so ordering is preserved.
+
+    The session queue is bounded: awaited puts block the producer while the
+    consumer catches up, and a timer flush that finds the queue full keeps
+    coalescing tokens until a slot frees up.
+    """
+
+    def __init__(
+        self,
+        queue: asyncio.Queue[dict | bytes | None],
+        *,
+        client_gone: asyncio.Event | None = None,
+    ) -> None:
+        self._queue = queue
+        self._client_gone = client_gone
+        self._buf: list[str] = []
+        self._buf_len = 0
+        self._first_at = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def put_token(self, content: str) -> None:
+        """Buffer a token, flushing when the size or age threshold is hit."""
+        if not content or self._dropping:
+            return
+        loop = asyncio.get_running_loop()
+        if not self._buf:
+            self._first_at = loop.time()
+            self._timer = loop.call_later(_TOKEN_COALESCE_MAX_DELAY_SEC, self.flush)
+        self._buf.append(content)
+        self._buf_len += len(content)
+        if (
+            self._buf_len >= _TOKEN_COALESCE_MAX_CHARS
+            or loop.time() - self._first_at >= _TOKEN_COALESCE_MAX_DELAY_SEC
+        ):
+            await self._flush_wait()
+
+    def flush(self) -> None:
+        """Emit buffered tokens as a single token frame without blocking.
+
+        Called from the idle timer. If the queue is full the tokens stay
+        buffered and the timer is re-armed.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buf:
+            return
+        if self._dropping:
+            self._clear()
+            return
+        content = "".join(self._buf)
+        try:
+            self._queue.put_nowait(_format_token_frame(content))
+        except asyncio.QueueFull:
+            self._buf = [content]
+            self._timer = asyncio.get_running_loop().call_later(
+                _TOKEN_COALESCE_MAX_DELAY_SEC, self.flush
+            )
+            return
+        self._clear()
+
+    async def _flush_wait(self) -> None:
+        """Emit buffered tokens as a single token frame, waiting for queue space."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buf:
+            return
+        content = "".join(self._buf)
+        self._clear()
+        if not self._dropping:
+            await self._queue.put(_format_token_frame(content))
+
+    def _clear(self) -> None:
+        self._buf = []
+        self._buf_len = 0
+
+    @property
+    def _dropping(self) -> bool:
+        """True once the SSE consumer is gone — nobody will drain the queue."""
+        return self._client_gone is not None and self._client_gone.is_set()
+
+    async def put(self, item: dict | bytes | None) -> None:
+        """Queue a non-token event after flushing any buffered tokens."""
+        await self._flush_wait()
+        if self._dropping:
+            return
+        await self._queue.put(item)
+
+
+async def _event_generator(session_id: str) -> AsyncGenerator[bytes, None]:
     """Generate SSE-formatted events for a given agent session."""
-    queue = _active_streams.get(session_id)
+    session = _active_streams.get(session_id)
 
-    if queue is None:
+    if session is None:
         # No active stream — send a waiting message then done
         event = AgentStreamEvent(
             type="done",
             data={"message": "No active processing for this session. Send a message first."},
             timestamp=datetime.now(tz=timezone.utc),
         )
-        yield f"event: {event.type}\ndata: {json.dumps(event.model_dump(mode='json'))}\n\n"
+        yield _format_sse_event(event)
         return
 
+    session.attached = True
     # Send keepalive comment
-    yield ": keepalive\n\n"
-
+    yield b": keepalive\n\n"
+
+    # Idle keepalive pings are sent by EventSourceResponse, so this loop only
+    # wakes when an event arrives. A client disconnect cancels the pending wait.
+    queue = session.queue
+    control = session.control
+    data_get: asyncio.Future | None = None
+    control_get: asyncio.Future | None = None
     try:
         while True:
-            try:
-                # Wait for events with timeout for keepalive
-                item = await asyncio.wait_for(queue.get(), timeout=_settings.agent_stream_timeout)
-            except asyncio.TimeoutError:
-                # Send keepalive ping
-                yield ": ping\n\n"
-                continue
+            if not control.empty():
+                item = control.get_nowait()
+            elif data_get is not None and data_get.done():
+                item = data_get.result()
+                data_get = None
+            elif queue.empty() or control_get is not None:
+                if data_get is None:
+                    data_get = asyncio.ensure_future(queue.get())
+                if control_get is None:
+                    control_get = asyncio.ensure_future(control.get())
+                done, _ = await asyncio.wait(
+                    (data_get, control_get), return_when=asyncio.FIRST_COMPLETED
+                )
+                if control_get in done:
+                    item = control_get.result()
+                    control_get = None
+                else:
+                    item = data_get.result()
+                    data_get = None
+            else:
+                item = queue.get_nowait()
+            session.last_seen = time.monotonic()
 
             if item is None:
                 # Sentinel: stream is done
                 break
 
-            event = AgentStreamEvent(
-                type=item["type"],
-                data=item["data"],
-                timestamp=datetime.now(tz=timezone.utc),
-            )
-            yield f"event: {event.type}\ndata: {json.dumps(event.model_dump(mode='json'))}\n\n"
+            if isinstance(item, bytes):
+                # Pre-framed event (tokens) — forward verbatim
+                yield item
+                continue
+
+            yield _format_event_frame(item)
 
             if item["type"] == "done":
                 break
 
     finally:
-        # Clean up the stream
-        _active_streams.pop(session_id, None)
+        for pending in (data_get, control_get):
+            if pending is not None:
+                pending.cancel()
+        # Tell the producer to stop queueing, and only drop the registry entry
+        # if a newer turn has not already replaced this session.
+        _release_stream_session(session)
+        if _active_streams.get(session_id) is session:
+            del _active_streams[session_id]
 
 
 @router.get("/stream/{session_id}")
-async def stream_response(session_id: str) -> StreamingResponse:
-    """Subscribe to the agent response stream via Server-Sent Events."""
-    return StreamingResponse(
+async def stream_response(session_id: str) -> EventSourceResponse:
+    """Subscribe to the agent response stream via Server-Sent Events.
+
+    EventSourceResponse sends the idle keepalive pings and the no-cache /
+    X-Accel-Buffering headers; pre-framed bytes from the generator pass through as-is.
+    """
+    return EventSourceResponse(
         _event_generator(session_id),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        ping=_settings.agent_stream_timeout,
+        sep="\n",
+        headers={"Cache-Control": "no-cache"},
     )
 
 
@@ -5690,21 +6064,23 @@ async def interrupt_agent(session_id: str) -> dict[str, str]:
     logger.info("Interrupt requested for session %s", session_id)
 
     # Push an error event and close the stream
-    queue = _active_streams.get(session_id)
-    if queue:
-        await queue.put(
+    session = _active_streams.get(session_id)
+    if session:
+        # Control queue: delivered ahead of any data backlog, never blocks
+        control = session.control
+        control.put_nowait(
             {
                 "type": "error",
                 "data": {"message": "Interrupted by user"},
             }
         )
-        await queue.put(
+        control.put_nowait(
             {
                 "type": "done",
                 "data": {"message": "Session interrupted by user"},
             }
         )
-        await queue.put(None)
+        control.put_nowait(None)
 
     return {"status": "interrupted", "session_id": session_id}
 
@@ -5719,10 +6095,10 @@ async def approve_action(request: ApproveRequest) -> dict[str, str]:
     )
 
     # Resume the agent with the approval decision
-    queue = _active_streams.get(request.session_id)
-    if queue:
+    session = _active_streams.get(request.session_id)
+    if session:
         status = "approved" if request.approved else "rejected"
-        await queue.put(
+        session.control.put_nowait(
             {
                 "type": "approval_response",
                 "data": {"approved": request.approved, "status": status},
@@ -5749,17 +6125,17 @@ async def retry_message(request: RetryRequest) -> InvokeResponse:
         request.edited_content is not None,
     )
 
-    queue: asyncio.Queue[dict | None] = asyncio.Queue()
-    _active_streams[session_id] = queue
+    session = _open_stream_session(session_id)
 
-    asyncio.create_task(
+    session.run_task = asyncio.create_task(
         _run_agent_from_checkpoint(
             session_id=session_id,
             data_product_id=str(request.data_product_id),
             target_message_id=request.message_id,
             edited_content=request.edited_content,
             original_content=request.original_content,
-            queue=queue,
+            queue=session.queue,
+            client_gone=session.client_gone,
         )
     )
 
@@ -5776,7 +6152,8 @@ async def _run_agent_from_checkpoint(
     target_message_id: str | None,
     edited_content: str | None,
     original_content: str | None,
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
+    client_gone: asyncio.Event | None = None,
 ) -> None:
     """Run the agent from a specific point for retry/edit.
 
@@ -5965,6 +6342,7 @@ async def _run_agent_from_checkpoint(
             message=replay_content,
             data_product_id=data_product_id,
             queue=queue,
+            client_gone=client_gone,
         )
 
     except Exception as e:
@@ -6361,8 +6739,6 @@ async def get_history(session_id: str) -> dict:
                 # Repetitive text — same sentence 3+ times (Gemini loop)
                 sentences = [s.strip() for s in c.split("\n") if s.strip()]
                 if len(sentences) >= 3:
-                    from collections import Counter
-
                     counts = Counter(sentences)
                     if counts.most_common(1)[0][1] >= 3:
                         return True
@@ -6385,45 +6761,51 @@ async def get_history(session_id: str) -> dict:
             # Infer the pipeline phase from tool calls + database state
             phase = await _infer_phase(session_id, raw_messages)
 
+            assistant_indexes = [
+                idx for idx, message in enumerate(deduped) if message.get("role") == "assistant"
+            ]
+
             # Replay persisted trust contracts so history answers keep
-            # source/confidence/exactness signals after page reload.
+            # source/confidence/exactness signals after page reload. Contracts
+            # pair with the most recent assistant answers, so only that many
+            # rows are fetched (newest first) instead of the full session log.
             replay_contracts: list[dict[str, Any]] = []
-            try:
-                from services.postgres import get_pool as _pg_get_pool
-                from services.postgres import query as _pg_query
+            if assistant_indexes:
+                try:
+                    from services.postgres import get_pool as _pg_get_pool
+                    from services.postgres import query as _pg_query
 
-                _pool = await _pg_get_pool(_settings.database_url)
-                evidence_rows = await _pg_query(
-                    _pool,
-                    """SELECT query_id, source_mode, confidence, exactness_state, final_decision,
-                              sql_refs, fact_refs, chunk_refs, conflicts, recovery_plan, created_at
-                       FROM qa_evidence
-                       WHERE query_id LIKE $1
-                       ORDER BY created_at ASC""",
-                    f"{session_id}:%",
-                )
-                if isinstance(evidence_rows, list):
-                    for row in evidence_rows:
-                        candidate: dict[str, Any] | None = None
-                        if isinstance(row, dict):
-                            candidate = row
-                        else:
-                            try:
-                                candidate = dict(row)
-                            except Exception:
-                                candidate = None
-                        if candidate is not None:
-                            replay_contracts.append(_build_history_answer_contract(candidate))
-            except Exception as replay_err:
-                logger.debug(
-                    "History trust replay unavailable for session %s: %s",
-                    session_id,
-                    replay_err,
-                )
+                    _pool = await _pg_get_pool(_settings.database_url)
+                    evidence_rows = await _pg_query(
+                        _pool,
+                        """SELECT query_id, source_mode, confidence, exactness_state, final_decision,
+                                  sql_refs, fact_refs, chunk_refs, conflicts, recovery_plan, created_at
+                           FROM qa_evidence
+                           WHERE query_id LIKE $1
+                           ORDER BY created_at DESC
+                           LIMIT $2""",
+                        f"{session_id}:%",
+                        len(assistant_indexes),
+                    )
+                    if isinstance(evidence_rows, list):
+                        for row in reversed(evidence_rows):
+                            candidate: dict[str, Any] | None = None
+                            if isinstance(row, dict):
+                                candidate = row
+                            else:
+                                try:
+                                    candidate = dict(row)
+                                except Exception:
+                                    candidate = None
+                            if candidate is not None:
+                                replay_contracts.append(_build_history_answer_contract(candidate))
+                except Exception as replay_err:
+                    logger.debug(
+                        "History trust replay unavailable for session %s: %s",
+                        session_id,
+                        replay_err,
+                    )
 
-            assistant_indexes = [
-                idx for idx, message in enumerate(deduped) if message.get("role") == "assistant"
-            ]
             contract_idx = len(replay_contracts) - 1
             for message_idx in reversed(assistant_indexes):
                 if contract_idx < 0:
@@ -17,7 +17,7 @@ from config import (
     get_settings,
 )
 from services.model_names import normalize_vertex_model_name
-from services.llm import _is_reasoning_model
+from services.llm import _is_reasoning_model, _vertex_credentials_path
 from models.schemas import (
     LLMConfigRequest,
     LLMConfigResponse,
@@ -31,20 +31,43 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/config", tags=["config"])
 
+# Settings field that holds the model name for each provider
+_PROVIDER_MODEL_FIELD: dict[str, str] = {
+    "snowflake-cortex": "cortex_model",
+    "vertex-ai": "vertex_model",
+    "azure-openai": "azure_openai_deployment",
+    "anthropic": "anthropic_model",
+    "openai": "openai_model",
+}
+
+# Provider-specific request fields copied verbatim onto the same-named Settings fields
+_PROVIDER_OVERRIDE_FIELDS: tuple[str, ...] = (
+    "cortex_model",
+    # Vertex AI
+    "vertex_credentials_json",
+    "vertex_project",
+    "vertex_location",
+    "vertex_model",
+    # Anthropic
+    "anthropic_api_key",
+    "anthropic_model",
+    # OpenAI
+    "openai_api_key",
+    "openai_model",
+    # Azure OpenAI
+    "azure_openai_api_key",
+    "azure_openai_endpoint",
+    "azure_openai_deployment",
+    "azure_openai_api_version",
+)
+
 
 def _get_active_model_name(provider: str, settings: Any) -> str:
     """Return the model name for the given provider from settings."""
-    if provider == "snowflake-cortex":
-        return settings.cortex_model
-    if provider == "vertex-ai":
-        return settings.vertex_model
-    if provider == "azure-openai":
-        return settings.azure_openai_deployment
-    if provider == "anthropic":
-        return settings.anthropic_model
-    if provider == "openai":
-        return settings.openai_model
-    return "unknown"
+    field_name = _PROVIDER_MODEL_FIELD.get(provider)
+    if field_name is None:
+        return "unknown"
+    return getattr(settings, field_name)
 
 
 def _request_to_overrides(req: LLMConfigRequest | LLMTestRequest) -> dict[str, Any]:
@@ -52,43 +75,16 @@ def _request_to_overrides(req: LLMConfigRequest | LLMTestRequest) -> dict[str, A
     overrides: dict[str, Any] = {"llm_provider": req.provider}
 
     # Model shorthand: if `model` is set, map to the provider-specific field
-    if req.model:
-        if req.provider == "snowflake-cortex":
-            overrides["cortex_model"] = req.model
-        elif req.provider == "vertex-ai":
-            overrides["vertex_model"] = normalize_vertex_model_name(req.model)
-        elif req.provider == "azure-openai":
-            overrides["azure_openai_deployment"] = req.model
-        elif req.provider == "anthropic":
-            overrides["anthropic_model"] = req.model
-        elif req.provider == "openai":
-            overrides["openai_model"] = req.model
+    # (a Vertex model name is normalized below with the explicit field).
+    model_field = _PROVIDER_MODEL_FIELD.get(req.provider)
+    if req.model and model_field:
+        overrides[model_field] = req.model
 
     # Provider-specific fields
-    field_map: dict[str, str] = {
-        "cortex_model": "cortex_model",
-        # Vertex AI
-        "vertex_credentials_json": "vertex_credentials_json",
-        "vertex_project": "vertex_project",
-        "vertex_location": "vertex_location",
-        "vertex_model": "vertex_model",
-        # Anthropic
-        "anthropic_api_key": "anthropic_api_key",
-        "anthropic_model": "anthropic_model",
-        # OpenAI
-        "openai_api_key": "openai_api_key",
-        "openai_model": "openai_model",
-        # Azure OpenAI
-        "azure_openai_api_key": "azure_openai_api_key",
-        "azure_openai_endpoint": "azure_openai_endpoint",
-        "azure_openai_deployment": "azure_openai_deployment",
-        "azure_openai_api_version": "azure_openai_api_version",
-    }
-
-    for req_field, settings_field in field_map.items():
-        value = getattr(req, req_field, None)
+    for field_name in _PROVIDER_OVERRIDE_FIELDS:
+        value = getattr(req, field_name, None)
         if value is not None:
-            overrides[settings_field] = value
+            overrides[field_name] = value
 
     if overrides.get("vertex_model") is not None:
         overrides["vertex_model"] = normalize_vertex_model_name(
@@ -111,14 +107,12 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
             model=overrides.get("cortex_model", base.cortex_model),
             base_url=f"https://{account}.snowflakecomputing.com/api/v2/cortex/v1",
             api_key=base.snowflake_password.get_secret_value(),
-            temperature=get_settings().llm_temperature,
-            max_tokens=get_settings().llm_test_max_tokens,
+            temperature=base.llm_temperature,
+            max_tokens=base.llm_test_max_tokens,
         )
 
     if provider == "vertex-ai":
-        import json
         import os
-        import tempfile
 
         creds_json = overrides.get("vertex_credentials_json", base.vertex_credentials_json)
         project = overrides.get("vertex_project", base.vertex_project)
@@ -132,13 +126,8 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
         if not project:
             raise ValueError("Vertex AI project ID is required")
 
-        # Write credentials to temp file for GOOGLE_APPLICATION_CREDENTIALS
-        creds_data = json.loads(creds_json)
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            json.dump(creds_data, f)
-            creds_path = f.name
-
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = creds_path
+        # Point GOOGLE_APPLICATION_CREDENTIALS at the (reused) credentials file
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = _vertex_credentials_path(creds_json)
 
         # Determine if this is a Gemini or Claude model
         is_claude = model_name.startswith("claude-")
@@ -150,8 +139,8 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
                 model=model_name,
                 project=project,
                 location=location,
-                temperature=get_settings().llm_temperature,
-                max_tokens=get_settings().llm_test_max_tokens,
+                temperature=base.llm_temperature,
+                max_tokens=base.llm_test_max_tokens,
             )
         else:
             from langchain_google_genai import ChatGoogleGenerativeAI
@@ -160,8 +149,8 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
                 model=model_name,
                 project=project,
                 location=location,
-                temperature=get_settings().llm_temperature,
-                max_tokens=get_settings().llm_test_max_tokens,
+                temperature=base.llm_temperature,
+                max_tokens=base.llm_test_max_tokens,
             )
 
     if provider == "azure-openai":
@@ -186,7 +175,7 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
                 model=deployment,
                 base_url=base_url,
                 api_key=resolved_key,
-                max_completion_tokens=get_settings().llm_test_max_tokens,
+                max_completion_tokens=base.llm_test_max_tokens,
             )
         else:
             # Legacy models: use AzureChatOpenAI
@@ -199,8 +188,8 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
                 api_version=overrides.get(
                     "azure_openai_api_version", base.azure_openai_api_version
                 ),
-                temperature=get_settings().llm_temperature,
-                max_tokens=get_settings().llm_test_max_tokens,
+                temperature=base.llm_temperature,
+                max_tokens=base.llm_test_max_tokens,
             )
 
     if provider == "anthropic":
@@ -215,8 +204,8 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
         return ChatAnthropic(
             model=overrides.get("anthropic_model", base.anthropic_model),
             api_key=api_key,
-            temperature=get_settings().llm_temperature,
-            max_tokens=get_settings().llm_test_max_tokens,
+            temperature=base.llm_temperature,
+            max_tokens=base.llm_test_max_tokens,
         )
 
     if provider == "openai":
@@ -232,15 +221,32 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
         oi_kwargs: dict[str, Any] = dict(
             model=model_name,
             api_key=api_key,
-            max_tokens=get_settings().llm_test_max_tokens,
+            max_tokens=base.llm_test_max_tokens,
         )
         if not _is_reasoning_model(model_name):
-            oi_kwargs["temperature"] = get_settings().llm_temperature
+            oi_kwargs["temperature"] = base.llm_temperature
         return ChatOpenAI(**oi_kwargs)
 
     raise ValueError(f"Unknown provider: {provider}")
 
 
+# Background persistence of runtime overrides. Tasks are kept referenced until
+# done, and writes are serialized so the last one stored is the latest state.
+_persist_tasks: set[asyncio.Task[None]] = set()
+_persist_lock = asyncio.Lock()
+
+
+async def _persist_overrides(pool: Any) -> None:
+    """Write the current LLM overrides to PostgreSQL, logging any failure."""
+    from config import persist_llm_overrides
+
+    async with _persist_lock:
+        try:
+            await persist_llm_overrides(pool)
+        except Exception as persist_err:
+            logger.warning("Failed to persist LLM overrides: %s", persist_err)
+
+
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
@@ -248,18 +254,10 @@ def _build_test_model(overrides: dict[str, Any]) -> BaseChatModel:
 
 def _get_fallback_model_name(fb_config: dict) -> str:
     """Extract the model name from a fallback config dict."""
-    provider = fb_config.get("provider", "")
-    if provider == "snowflake-cortex":
-        return fb_config.get("cortex_model", "")
-    if provider == "vertex-ai":
-        return fb_config.get("vertex_model", "")
-    if provider == "azure-openai":
-        return fb_config.get("azure_openai_deployment", "")
-    if provider == "anthropic":
-        return fb_config.get("anthropic_model", "")
-    if provider == "openai":
-        return fb_config.get("openai_model", "")
-    return ""
+    field_name = _PROVIDER_MODEL_FIELD.get(fb_config.get("provider", ""))
+    if field_name is None:
+        return ""
+    return fb_config.get(field_name, "")
 
 
 @router.get("/llm", response_model=LLMStatusResponse)
@@ -317,15 +315,14 @@ async def set_llm_config(req: LLMConfigRequest) -> LLMConfigResponse:
 
         await reset_orchestrator()
 
-        # Persist to PostgreSQL so config survives restarts
-        try:
-            from config import persist_llm_overrides
-            from services.postgres import _pool as pg_pool
+        # Persist to PostgreSQL so config survives restarts. The in-memory
+        # overrides are already live, so the write runs off the request path.
+        from services.postgres import _pool as pg_pool
 
-            if pg_pool:
-                await persist_llm_overrides(pg_pool)
-        except Exception as persist_err:
-            logger.warning("Failed to persist LLM overrides: %s", persist_err)
+        if pg_pool:
+            task = asyncio.create_task(_persist_overrides(pg_pool))
+            _persist_tasks.add(task)
+            task.add_done_callback(_persist_tasks.discard)
 
         effective = get_effective_settings()
         model_name = _get_active_model_name(req.provider, effective)
@@ -372,10 +369,11 @@ async def test_llm_connection(req: LLMTestRequest) -> LLMTestResponse:
 
     try:
         model = _build_test_model(overrides)
+        test_timeout = get_settings().llm_test_timeout
         start = time.monotonic()
         response = await asyncio.wait_for(
             model.ainvoke("Say hello in one sentence."),
-            timeout=get_settings().llm_test_timeout,
+            timeout=test_timeout,
         )
         elapsed_ms = int((time.monotonic() - start) * 1000)
 
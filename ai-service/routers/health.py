@@ -1,5 +1,6 @@
 """Health check endpoints for service monitoring and readiness probes."""
 
+import asyncio
 import logging
 from typing import Any
 
@@ -26,53 +27,65 @@ async def readiness_check() -> JSONResponse:
     from services import redis as redis_service
     from services import snowflake as snowflake_service
 
-    checks: dict[str, str] = {}
-
-    try:
-        pool = postgres_service._pool
-        if pool:
+    async def _check_postgres() -> tuple[str, str]:
+        try:
+            pool = postgres_service._pool
+            if not pool:
+                return "postgresql", "not initialized"
             pg_ok = await postgres_service.health_check(pool)
-            checks["postgresql"] = "ok" if pg_ok else "error"
-        else:
-            checks["postgresql"] = "not initialized"
-    except Exception as e:
-        checks["postgresql"] = f"error: {e}"
-
-    try:
-        driver = neo4j_service._driver
-        if driver:
+            return "postgresql", "ok" if pg_ok else "error"
+        except Exception as e:
+            return "postgresql", f"error: {e}"
+
+    async def _check_neo4j() -> tuple[str, str]:
+        try:
+            driver = neo4j_service._driver
+            if not driver:
+                return "neo4j", "not initialized"
             neo4j_ok = await neo4j_service.health_check(driver)
-            checks["neo4j"] = "ok" if neo4j_ok else "error"
-        else:
-            checks["neo4j"] = "not initialized"
-    except Exception as e:
-        checks["neo4j"] = f"error: {e}"
-
-    try:
-        client = redis_service._client
-        if client:
+            return "neo4j", "ok" if neo4j_ok else "error"
+        except Exception as e:
+            return "neo4j", f"error: {e}"
+
+    async def _check_redis() -> tuple[str, str]:
+        try:
+            client = redis_service._client
+            if not client:
+                return "redis", "not initialized"
             redis_ok = await redis_service.health_check(client)
-            checks["redis"] = "ok" if redis_ok else "error"
-        else:
-            checks["redis"] = "not initialized"
-    except Exception as e:
-        checks["redis"] = f"error: {e}"
-
-    try:
-        minio_client = minio_service._client
-        if minio_client:
-            minio_ok = minio_service.health_check(minio_client)
-            checks["minio"] = "ok" if minio_ok else "error"
-        else:
-            checks["minio"] = "not initialized"
-    except Exception as e:
-        checks["minio"] = f"error: {e}"
-
-    try:
-        sf_ok = await snowflake_service.health_check()
-        checks["snowflake"] = "ok" if sf_ok else "error"
-    except Exception as e:
-        checks["snowflake"] = f"error: {e}"
+            return "redis", "ok" if redis_ok else "error"
+        except Exception as e:
+            return "redis", f"error: {e}"
+
+    async def _check_minio() -> tuple[str, str]:
+        try:
+            minio_client = minio_service._client
+            if not minio_client:
+                return "minio", "not initialized"
+            # The MinIO SDK is synchronous — keep its round-trip off the event loop
+            loop = asyncio.get_running_loop()
+            minio_ok = await loop.run_in_executor(None, minio_service.health_check, minio_client)
+            return "minio", "ok" if minio_ok else "error"
+        except Exception as e:
+            return "minio", f"error: {e}"
+
+    async def _check_snowflake() -> tuple[str, str]:
+        try:
+            sf_ok = await snowflake_service.health_check()
+            return "snowflake", "ok" if sf_ok else "error"
+        except Exception as e:
+            return "snowflake", f"error: {e}"
+
+    # Probes are independent, so the readiness latency is the slowest one
+    # rather than the sum of all of them.
+    results = await asyncio.gather(
+        _check_postgres(),
+        _check_neo4j(),
+        _check_redis(),
+        _check_minio(),
+        _check_snowflake(),
+    )
+    checks: dict[str, str] = dict(results)
 
     all_ok = all(v == "ok" for v in checks.values())
     status_code = 200 if all_ok else 503
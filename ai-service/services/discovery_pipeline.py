@@ -8,14 +8,30 @@ Results are cached in Redis to avoid re-running on repeat triggers.
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import logging
+import os
+import re
+import tempfile
 import time
 from itertools import combinations
-from typing import Any
+from typing import IO, Any
 from uuid import uuid4
 
+import numpy as np
+import orjson
+
+from agents.discovery import (
+    classify_data_maturity,
+    classify_table,
+    compute_health_score,
+    infer_foreign_keys,
+    infer_foreign_keys_enhanced,
+)
 from config import get_settings
+from services import postgres as pg_service
+from services import redis as redis_service
 
 logger = logging.getLogger(__name__)
 
@@ -36,10 +52,28 @@ TOTAL_STEPS = len(STEPS)
 CACHE_KEY_PREFIX = "discovery:pipeline"
 CACHE_TTL = 86400  # 24 hours
 FRESH_THRESHOLD = 300  # 5 minutes — skip pipeline if cache is this fresh
+# Steps that query Snowflake; their results are checkpointed as they finish
+# so a rerun after a failure resumes instead of starting over.
+_RESUMABLE_STEPS = ("metadata", "profiles", "maturity_classifications")
 
 # Column types for which sample_values are collected during profiling
 _STRING_TYPES = {"VARCHAR", "TEXT", "STRING", "CHAR", "NCHAR", "NVARCHAR", "NTEXT"}
 
+# Distinct values kept per string column as sample_values
+_SAMPLE_VALUES_LIMIT = 25
+
+# Semantic PK filtering: names and types of columns unlikely to be keys
+_PK_EXCLUDED_NAME_RE = re.compile(
+    r"description|comment|note|text|body|message|remark|summary|detail|content"
+)
+_PK_EXCLUDED_TYPES = frozenset({"TEXT", "CLOB", "NCLOB", "STRING", "VARIANT"})
+# Types never considered for composite PK candidates
+_COMPOSITE_PK_EXCLUDED_TYPES = frozenset({
+    "BOOLEAN", "VARIANT", "OBJECT", "ARRAY", "CLOB", "NCLOB",
+})
+# Lower-cased name suffixes the quality step treats as identifiers
+_ID_SUFFIXES = ("_id", "_code", "_key")
+
 
 # ---------------------------------------------------------------------------
 # SSE progress helpers
@@ -47,7 +81,7 @@ _STRING_TYPES = {"VARCHAR", "TEXT", "STRING", "CHAR", "NCHAR", "NVARCHAR", "NTEX
 
 
 async def _emit(
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
     step_key: str,
     label: str,
     status: str,
@@ -83,8 +117,27 @@ async def _emit(
             "overall_pct": min(overall_pct, 100),
         },
     })
-    # Yield control so the SSE generator can flush this event to the client
-    await asyncio.sleep(0)
+
+
+_PROGRESS_MIN_INTERVAL = 0.05  # Seconds between per-table "running" updates
+
+
+class _ProgressThrottle:
+    """Rate-limit the per-table progress updates of a concurrent step.
+
+    Tables finishing in a burst would otherwise each cost an SSE frame; the
+    step's "completed" event always follows, so skipped updates are superseded.
+    """
+
+    def __init__(self) -> None:
+        self._last_sent = 0.0
+
+    def ready(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_sent < _PROGRESS_MIN_INTERVAL:
+            return False
+        self._last_sent = now
+        return True
 
 
 # ---------------------------------------------------------------------------
@@ -92,12 +145,21 @@ async def _emit(
 # ---------------------------------------------------------------------------
 
 
+def _input_fingerprint(database: str, schemas: list[str], tables: list[str]) -> str:
+    """Hash the pipeline inputs so a cache hit implies the same table selection."""
+    payload = json.dumps(
+        {"db": database, "schemas": sorted(schemas), "tables": sorted(tables)},
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
 async def run_discovery_pipeline(
     data_product_id: str,
     tables: list[str],
     database: str,
     schemas: list[str],
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
     force: bool = False,
 ) -> dict[str, Any]:
     """Execute the 5-step deterministic discovery pipeline (Phase 1).
@@ -116,21 +178,24 @@ async def run_discovery_pipeline(
         Phase 2 after the discovery conversation.
     """
     settings = get_settings()
+    input_key = _input_fingerprint(database, schemas, tables)
+    cache_key = f"{CACHE_KEY_PREFIX}:{data_product_id}"
+
+    # One Redis client for the whole run: the cache check, step checkpoints,
+    # the duplicate-rate cache in step 4 and the final cache write.
+    client = await redis_service.get_client(settings.redis_url)
 
     # -----------------------------------------------------------------------
     # Check Redis cache
     # -----------------------------------------------------------------------
     if not force:
         try:
-            from services import redis as redis_service
-
-            client = await redis_service.get_client(settings.redis_url)
-            cache_key = f"{CACHE_KEY_PREFIX}:{data_product_id}"
             cached = await redis_service.get_json(client, cache_key)
             if cached:
                 cached_at = cached.get("_cached_at", 0)
                 age = time.time() - cached_at
-                if age < FRESH_THRESHOLD:
+                # Results for a different table selection are stale regardless of age
+                if age < FRESH_THRESHOLD and cached.get("_input_key") == input_key:
                     logger.info(
                         "Pipeline cache hit for %s (age=%.0fs), skipping pipeline",
                         data_product_id, age,
@@ -152,32 +217,65 @@ async def run_discovery_pipeline(
         "schemas": schemas,
         "tables": tables,
     }
+    # LAST_ALTERED per base table, read during profiling; keys the
+    # duplicate-rate cache in step 4.
+    last_altered: dict[str, str] = {}
+    checkpoint = _Checkpointer(client, f"{cache_key}:partial", input_key, last_altered)
+    if not force:
+        resumed = await checkpoint.load()
+        if resumed:
+            logger.info(
+                "Resuming pipeline for %s from checkpoint (%s)",
+                data_product_id, ", ".join(resumed),
+            )
+            results.update(resumed)
+
+    # Pure-Python steps run in the default executor so that scoring a large
+    # schema does not stall the event loop (and every other SSE stream on it).
+    loop = asyncio.get_running_loop()
 
     try:
         # Step 1: Metadata ------------------------------------------------
-        results["metadata"] = await _step_metadata(
-            queue, database, schemas, tables,
-        )
+        if "metadata" in results:
+            await _emit(queue, "metadata", STEPS[0]["label"],
+                        "completed", "Resumed", 1, 1, 0)
+        else:
+            results["metadata"] = await _step_metadata(
+                queue, database, schemas, tables,
+            )
+            checkpoint.save(results)
 
         # Step 2: Profiling ------------------------------------------------
-        results["profiles"] = await _step_profiling(
-            queue, tables,
-        )
+        if "profiles" in results:
+            await _emit(queue, "profiling", STEPS[1]["label"],
+                        "completed", "Resumed", 1, 1, 1)
+        else:
+            results["profiles"] = await _step_profiling(
+                queue, tables, last_altered, results["metadata"],
+            )
+            checkpoint.save(results)
 
         # Step 3: Classification -------------------------------------------
-        results["classifications"] = _step_classification(
-            results["metadata"],
+        results["classifications"] = await loop.run_in_executor(
+            None, _step_classification, results["metadata"],
         )
         await _emit(queue, "classification", STEPS[2]["label"],
                      "completed", "Done", 1, 1, 2)
 
         # Step 4: Data maturity classification -----------------------------
-        results["maturity_classifications"] = await _step_classify_maturity(
-            queue, results["profiles"], results["metadata"],
-        )
+        if "maturity_classifications" in results:
+            await _emit(queue, "maturity", STEPS[3]["label"],
+                        "completed", "Resumed", 1, 1, 3)
+        else:
+            results["maturity_classifications"] = await _step_classify_maturity(
+                queue, results["profiles"], results["metadata"], last_altered, client,
+            )
+            checkpoint.save(results)
 
         # Step 5: Quality score --------------------------------------------
-        results["quality"] = _step_quality(results)
+        results["quality"] = await loop.run_in_executor(
+            None, _step_quality, results,
+        )
         await _emit(queue, "quality", STEPS[4]["label"],
                      "completed", "Done", 1, 1, 4)
 
@@ -194,20 +292,85 @@ async def run_discovery_pipeline(
         return results
 
     # -----------------------------------------------------------------------
-    # Cache results
+    # Cache results (in the background — the caller does not wait on Redis)
     # -----------------------------------------------------------------------
-    try:
-        from services import redis as redis_service
+    results["_cached_at"] = time.time()
+    results["_input_key"] = input_key
+    task = asyncio.create_task(_write_cache(client, cache_key, results))
+    _cache_write_tasks.add(task)
+    task.add_done_callback(_cache_write_tasks.discard)
+
+    return results
+
+
+# Strong references to in-flight cache writes (asyncio keeps only weak ones)
+_cache_write_tasks: set[asyncio.Task[None]] = set()
+
 
-        client = await redis_service.get_client(settings.redis_url)
-        cache_key = f"{CACHE_KEY_PREFIX}:{data_product_id}"
-        results["_cached_at"] = time.time()
+async def _write_cache(client: Any, cache_key: str, results: dict[str, Any]) -> None:
+    """Store pipeline results in Redis, logging any failure."""
+    try:
         await redis_service.set_json(client, cache_key, results, ttl=CACHE_TTL)
-        logger.info("Pipeline results cached for %s", data_product_id)
+        logger.info("Pipeline results cached under %s", cache_key)
     except Exception as e:
         logger.warning("Failed to cache pipeline results: %s", e)
 
-    return results
+
+class _Checkpointer:
+    """Persist the resumable steps' results to Redis as each step finishes.
+
+    At most one write is in flight: saving while a write is running only
+    replaces the pending snapshot, which the running write picks up next.
+    Checkpoints live for ``FRESH_THRESHOLD`` and are only resumed for the
+    same input fingerprint.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        key: str,
+        input_key: str,
+        last_altered: dict[str, str],
+    ) -> None:
+        self._client = client
+        self._key = key
+        self._input_key = input_key
+        self._last_altered = last_altered
+        self._pending: dict[str, Any] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    async def load(self) -> dict[str, Any]:
+        """Return the checkpointed step results, restoring ``last_altered``."""
+        try:
+            saved = await redis_service.get_json(self._client, self._key)
+        except Exception as e:
+            logger.warning("Pipeline checkpoint read failed: %s", e)
+            return {}
+        if not saved or saved.get("_input_key") != self._input_key:
+            return {}
+        self._last_altered.update(saved.get("_last_altered") or {})
+        return {step: saved[step] for step in _RESUMABLE_STEPS if step in saved}
+
+    def save(self, results: dict[str, Any]) -> None:
+        """Schedule a checkpoint write of the finished resumable steps."""
+        snapshot = {step: results[step] for step in _RESUMABLE_STEPS if step in results}
+        snapshot["_input_key"] = self._input_key
+        snapshot["_last_altered"] = dict(self._last_altered)
+        self._pending = snapshot
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+            _cache_write_tasks.add(self._task)
+            self._task.add_done_callback(_cache_write_tasks.discard)
+
+    async def _drain(self) -> None:
+        while self._pending is not None:
+            snapshot, self._pending = self._pending, None
+            try:
+                await redis_service.set_json(
+                    self._client, self._key, snapshot, ttl=FRESH_THRESHOLD,
+                )
+            except Exception as e:
+                logger.warning("Pipeline checkpoint write failed: %s", e)
 
 
 # ---------------------------------------------------------------------------
@@ -216,7 +379,7 @@ async def run_discovery_pipeline(
 
 
 async def _step_metadata(
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
     database: str,
     schemas: list[str],
     tables: list[str],
@@ -230,18 +393,20 @@ async def _step_metadata(
     from tools.snowflake_tools import _parse_data_type, _validate_identifier
 
     all_tables: list[dict[str, Any]] = []
+    selected_tables = frozenset(tables)
 
-    for schema_name in schemas:
-        # Validate identifiers
-        if _validate_identifier(database, "database") or _validate_identifier(schema_name, "schema"):
-            continue
+    # Validate identifiers once, up front (validators return an error or None)
+    valid_schemas = (
+        []
+        if _validate_identifier(database, "database")
+        else [s for s in schemas if not _validate_identifier(s, "schema")]
+    )
 
+    for schema_name in valid_schemas:
         try:
-            sf_tables = await execute_query(
-                f'SHOW TABLES IN SCHEMA "{database}"."{schema_name}"'
-            )
-            sf_views = await execute_query(
-                f'SHOW VIEWS IN SCHEMA "{database}"."{schema_name}"'
+            sf_tables, sf_views = await asyncio.gather(
+                execute_query(f'SHOW TABLES IN SCHEMA "{database}"."{schema_name}"'),
+                execute_query(f'SHOW VIEWS IN SCHEMA "{database}"."{schema_name}"'),
             )
         except Exception as e:
             logger.warning("Failed to list objects in %s.%s: %s", database, schema_name, e)
@@ -267,7 +432,7 @@ async def _step_metadata(
             obj_name = obj["name"]
             fqn = f"{database}.{schema_name}.{obj_name}"
             # Only include tables that are in the data product's table list
-            if fqn not in tables:
+            if fqn not in selected_tables:
                 continue
 
             try:
@@ -305,249 +470,341 @@ async def _step_metadata(
     return all_tables
 
 
+def _profile_concurrency() -> int:
+    """Tables to profile at once, capped to a quarter of the default executor.
+
+    Snowflake queries block an executor thread each (two per table while
+    profiling), and that executor — ``min(32, cpu_count + 4)`` threads — is
+    shared with every other session's Snowflake and MinIO work.
+    """
+    executor_workers = min(32, (os.cpu_count() or 1) + 4)
+    configured = get_settings().discovery_profile_concurrency
+    return max(1, min(configured, executor_workers // 4))
+
+
 async def _step_profiling(
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
     tables: list[str],
+    last_altered: dict[str, str] | None = None,
+    metadata: list[dict[str, Any]] | None = None,
 ) -> list[dict[str, Any]]:
-    """Step 2: Profile each table (batch aggregate SQL)."""
+    """Step 2: Profile each table (batch aggregate SQL).
+
+    Tables are profiled concurrently, up to ``_profile_concurrency()`` at a
+    time; progress is emitted as each table finishes and the returned list
+    keeps the input order. If *last_altered* is given, it is filled with
+    each base table's ``LAST_ALTERED`` timestamp.
+
+    With *metadata* from step 1, base tables known to be empty get a zero
+    profile without any SQL, and the column lists already fetched there
+    are reused instead of issuing ``SHOW COLUMNS`` again.
+    """
     step_idx = 1
     total = len(tables)
-    profiles: list[dict[str, Any]] = []
+    await _emit(queue, "profiling", STEPS[step_idx]["label"],
+                "running", f"Analyzing {total} tables", 0, total, step_idx)
 
-    from services.snowflake import execute_query
-    from tools.snowflake_tools import _validate_fqn, _quoted_fqn, SAMPLE_SIZE
+    meta_by_fqn = {table["fqn"]: table for table in metadata or []}
+    sem = asyncio.Semaphore(_profile_concurrency())
 
-    for i, table_fqn in enumerate(tables):
-        table_name = table_fqn.split(".")[-1] if "." in table_fqn else table_fqn
+    async def _bounded(i: int, table_fqn: str) -> tuple[int, dict[str, Any]]:
+        meta = meta_by_fqn.get(table_fqn, {})
+        if meta.get("object_type") == "TABLE" and meta.get("row_count") == 0:
+            return i, {"table": table_fqn, "row_count": 0, "columns": [], "sampled": False}
+        async with sem:
+            try:
+                return i, await _profile_table(
+                    table_fqn, last_altered, meta.get("columns") or None,
+                )
+            except Exception as e:
+                logger.warning("Profiling table %s failed: %s", table_fqn, e)
+                return i, {"table": table_fqn, "error": str(e), "columns": []}
+
+    profiles: list[dict[str, Any]] = [{} for _ in tables]
+    done = 0
+    throttle = _ProgressThrottle()
+    for next_done in asyncio.as_completed(
+        [_bounded(i, fqn) for i, fqn in enumerate(tables)]
+    ):
+        i, profile = await next_done
+        profiles[i] = profile
+        done += 1
+        if not throttle.ready():
+            continue
+        table_fqn = tables[i]
+        table_name = table_fqn.rsplit(".", 1)[-1] if "." in table_fqn else table_fqn
         await _emit(queue, "profiling", STEPS[step_idx]["label"],
-                    "running", f"Analyzing {table_name} ({i + 1} of {total})",
-                    i, total, step_idx)
+                    "running", f"Analyzed {table_name} ({done} of {total})",
+                    done, total, step_idx)
 
-        parts, fqn_err = _validate_fqn(table_fqn)
-        if fqn_err:
-            logger.warning("Invalid FQN %s: %s", table_fqn, fqn_err)
-            profiles.append({"table": table_fqn, "error": fqn_err, "columns": []})
-            continue
+    await _emit(queue, "profiling", STEPS[step_idx]["label"],
+                "completed", f"{len(profiles)} tables profiled", total, total, step_idx)
+    return profiles
 
-        quoted = _quoted_fqn(parts)
 
-        try:
-            # Get metadata for sampling strategy
-            meta = await execute_query(
-                f'SELECT "ROW_COUNT", "TABLE_TYPE" FROM "{parts[0]}".INFORMATION_SCHEMA.TABLES '
-                f"WHERE TABLE_SCHEMA='{parts[1]}' AND TABLE_NAME='{parts[2]}'"
+async def _profile_table(
+    table_fqn: str,
+    last_altered: dict[str, str] | None = None,
+    known_columns: list[dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """Profile a single table: sampling strategy, columns, batch aggregates.
+
+    *known_columns* are the column dicts from ``_step_metadata``; when given,
+    the ``SHOW COLUMNS`` lookup is skipped.
+    """
+    from services.snowflake import execute_query
+    from tools.snowflake_tools import _validate_fqn, _quoted_fqn, SAMPLE_SIZE
+
+    parts, fqn_err = _validate_fqn(table_fqn)
+    if fqn_err:
+        logger.warning("Invalid FQN %s: %s", table_fqn, fqn_err)
+        return {"table": table_fqn, "error": fqn_err, "columns": []}
+
+    quoted = _quoted_fqn(parts)
+
+    meta_sql = (
+        f'SELECT "ROW_COUNT", "TABLE_TYPE", "LAST_ALTERED" '
+        f'FROM "{parts[0]}".INFORMATION_SCHEMA.TABLES '
+        f"WHERE TABLE_SCHEMA='{parts[1]}' AND TABLE_NAME='{parts[2]}'"
+    )
+    if known_columns:
+        meta = await execute_query(meta_sql)
+        raw_cols: list[dict[str, Any]] = []
+    else:
+        # Metadata (for the sampling strategy) and the column list are
+        # independent lookups — issue both in a single round-trip.
+        meta, raw_cols = await asyncio.gather(
+            execute_query(meta_sql),
+            execute_query(f'SHOW COLUMNS IN TABLE {quoted}'),
+        )
+    meta_row = meta[0] if meta else {}
+    table_type = meta_row.get("TABLE_TYPE")
+    row_count_val = meta_row.get("ROW_COUNT")
+    is_view = not meta or table_type in ("VIEW", "MATERIALIZED VIEW")
+    metadata_row_count = int(row_count_val) if row_count_val is not None else None
+    # Only a base table's LAST_ALTERED moves with its data (a view's tracks DDL)
+    altered_at = meta_row.get("LAST_ALTERED")
+    if last_altered is not None and not is_view and altered_at is not None:
+        last_altered[table_fqn] = str(altered_at)
+
+    # Determine sampling strategy
+    sampled = False
+    if is_view or metadata_row_count is None:
+        from_clause = f"(SELECT * FROM {quoted} LIMIT {SAMPLE_SIZE}) AS _sample"
+        sampled = True
+        total_rows = None
+    elif metadata_row_count == 0:
+        return {"table": table_fqn, "row_count": 0, "columns": [], "sampled": False}
+    elif metadata_row_count <= SAMPLE_SIZE:
+        from_clause = quoted
+        total_rows = metadata_row_count
+    else:
+        from_clause = f"{quoted} TABLESAMPLE BERNOULLI ({SAMPLE_SIZE} ROWS)"
+        sampled = True
+        total_rows = metadata_row_count
+
+    from tools.snowflake_tools import _parse_data_type
+    # Case-normalized name and type are computed once here and reused by
+    # the batch expression builder, PK filtering and composite-key search.
+    if known_columns:
+        col_specs = [
+            (col.get("name", ""), col.get("data_type", ""), col.get("nullable", True))
+            for col in known_columns
+        ]
+    else:
+        col_specs = [
+            (
+                col.get("column_name", ""),
+                _parse_data_type(col.get("data_type", "{}")),
+                col.get("null?", True) in (True, "true", "Y", "YES"),
             )
-            meta_row = meta[0] if meta else {}
-            table_type = meta_row.get("TABLE_TYPE")
-            row_count_val = meta_row.get("ROW_COUNT")
-            is_view = not meta or table_type in ("VIEW", "MATERIALIZED VIEW")
-            metadata_row_count = int(row_count_val) if row_count_val is not None else None
-
-            # Determine sampling strategy
-            sampled = False
-            if is_view or metadata_row_count is None:
-                from_clause = f"(SELECT * FROM {quoted} LIMIT {SAMPLE_SIZE}) AS _sample"
-                sampled = True
-                total_rows = None
-            elif metadata_row_count == 0:
-                profiles.append({"table": table_fqn, "row_count": 0, "columns": [], "sampled": False})
-                continue
-            elif metadata_row_count <= SAMPLE_SIZE:
-                from_clause = quoted
-                total_rows = metadata_row_count
-            else:
-                from_clause = f"{quoted} TABLESAMPLE BERNOULLI ({SAMPLE_SIZE} ROWS)"
-                sampled = True
-                total_rows = metadata_row_count
+            for col in raw_cols
+        ]
+    columns = [
+        {
+            "column_name": col_name,
+            "column_lower": col_name.lower(),
+            "data_type": data_type,
+            "data_type_upper": data_type.upper(),
+            "is_nullable": "YES" if nullable else "NO",
+        }
+        for col_name, data_type, nullable in col_specs
+    ]
 
-            # Get columns
-            raw_cols = await execute_query(f'SHOW COLUMNS IN TABLE {quoted}')
-            from tools.snowflake_tools import _parse_data_type
-            columns = []
-            for col in raw_cols:
-                nullable = col.get("null?", True)
-                columns.append({
-                    "column_name": col.get("column_name", ""),
-                    "data_type": _parse_data_type(col.get("data_type", "{}")),
-                    "is_nullable": "YES" if nullable in (True, "true", "Y", "YES") else "NO",
-                })
+    if not columns:
+        return {"table": table_fqn, "row_count": total_rows or 0, "columns": [], "sampled": sampled}
 
-            if not columns:
-                profiles.append({"table": table_fqn, "row_count": total_rows or 0, "columns": [], "sampled": sampled})
-                continue
+    # Batch profile all columns
+    col_expressions = []
+    for col in columns:
+        cn = col["column_name"]
+        if not cn:
+            continue
+        expr = (
+            f'COUNT("{cn}") AS "nn_{cn}", '
+            f'APPROX_COUNT_DISTINCT("{cn}") AS "dc_{cn}"'
+        )
+        # For string-type columns, also collect up to 25 sample distinct values.
+        # APPROX_TOP_K works in bounded memory, unlike ARRAY_AGG(DISTINCT),
+        # which materializes every distinct value before slicing.
+        if col["data_type_upper"] in _STRING_TYPES:
+            expr += f', APPROX_TOP_K("{cn}", {_SAMPLE_VALUES_LIMIT}) AS "sv_{cn}"'
+        col_expressions.append(expr)
+
+    batch_row: dict[str, Any] = {}
+    sample_n = 0
+    if col_expressions:
+        batch_sql = (
+            f'SELECT COUNT(*) AS "_sample_n", {", ".join(col_expressions)} '
+            f"FROM {from_clause}"
+        )
+        batch_result = await execute_query(batch_sql)
+        batch_row = batch_result[0] if batch_result else {}
+
+    sample_n = batch_row.get("_sample_n", 0) or 0
+    if total_rows is None:
+        total_rows = sample_n
+
+    # Null and uniqueness percentages for every column in one vectorized pass
+    named_cols = [col for col in columns if col["column_name"]]
+    non_nulls = [batch_row.get(f"nn_{col['column_name']}", 0) or 0 for col in named_cols]
+    distincts = [batch_row.get(f"dc_{col['column_name']}", 0) or 0 for col in named_cols]
+    nn = np.fromiter(non_nulls, dtype=np.float64, count=len(named_cols))
+    dc = np.fromiter(distincts, dtype=np.float64, count=len(named_cols))
+    if sample_n > 0:
+        null_pcts = np.round((1 - nn / sample_n) * 100, 2).tolist()
+    else:
+        null_pcts = [0] * len(named_cols)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        uniqueness_pcts = np.round(np.where(nn > 0, dc / nn * 100, 0), 2).tolist()
+
+    profile_cols = []
+    for col, non_null, distinct, null_pct, uniqueness_pct in zip(
+        named_cols, non_nulls, distincts, null_pcts, uniqueness_pcts,
+    ):
+        col_name = col["column_name"]
+        try:
+            if not non_null:
+                uniqueness_pct = 0
+
+            # Semantic PK filtering: exclude columns unlikely to be keys
+            is_text_like = col["data_type_upper"] in _PK_EXCLUDED_TYPES
+            is_excluded_name = _PK_EXCLUDED_NAME_RE.search(col["column_lower"]) is not None
+            stats_say_pk = uniqueness_pct > 98 and null_pct == 0
+            is_likely_pk = stats_say_pk and not is_text_like and not is_excluded_name
+
+            entry: dict[str, Any] = {
+                "column": col_name,
+                "data_type": col["data_type"],
+                "nullable": col["is_nullable"] == "YES",
+                "null_pct": null_pct,
+                "uniqueness_pct": uniqueness_pct,
+                "distinct_count": distinct,
+                "total_rows": total_rows,
+                "is_likely_pk": is_likely_pk,
+                "sampled": sampled,
+            }
 
-            # Batch profile all columns
-            col_expressions = []
-            for col in columns:
-                cn = col["column_name"]
-                if not cn:
-                    continue
-                expr = (
-                    f'COUNT("{cn}") AS "nn_{cn}", '
-                    f'APPROX_COUNT_DISTINCT("{cn}") AS "dc_{cn}"'
+            # Attach sample_values for string-type columns
+            sv_key = f"sv_{col_name}"
+            raw_sv = batch_row.get(sv_key)
+            if raw_sv is not None:
+                # Snowflake ARRAY comes back as JSON string from the connector
+                if isinstance(raw_sv, str):
+                    try:
+                        raw_sv = orjson.loads(raw_sv)
+                    except orjson.JSONDecodeError:
+                        raw_sv = None
+                if isinstance(raw_sv, list):
+                    # APPROX_TOP_K yields [value, count] pairs, most frequent first
+                    sample_vals = [
+                        str(pair[0]) for pair in raw_sv
+                        if isinstance(pair, list) and pair and pair[0] is not None
+                    ][:_SAMPLE_VALUES_LIMIT]
+                    if sample_vals:
+                        entry["sample_values"] = sample_vals
+
+            profile_cols.append(entry)
+        except Exception as col_err:
+            logger.warning("Profiling column %s.%s failed: %s", table_fqn, col_name, col_err)
+
+    # Composite PK detection: if no single-column PK was found, test
+    # candidate combinations of NOT-NULL columns with moderate
+    # cardinality.  Pure data-driven — no column-name heuristics.
+    has_single_pk = any(pc.get("is_likely_pk") for pc in profile_cols)
+    if not has_single_pk and total_rows and total_rows > 0:
+        type_upper = {col["column_name"]: col["data_type_upper"] for col in named_cols}
+        pk_pool = [
+            pc["column"] for pc in profile_cols
+            if pc["null_pct"] == 0
+            and type_upper[pc["column"]] not in _COMPOSITE_PK_EXCLUDED_TYPES
+            and pc.get("distinct_count", 0) > 1
+            and pc.get("uniqueness_pct", 0) < 90
+        ]
+        # Sort by selectivity (highest distinct count first) and cap
+        # at 6 columns to keep the combinatorial search manageable.
+        col_distinct = {
+            pc["column"]: pc.get("distinct_count", 0)
+            for pc in profile_cols
+        }
+        pk_pool.sort(key=lambda c: col_distinct.get(c, 0), reverse=True)
+        pk_pool = pk_pool[:6]
+
+        # Generate all 2..min(5, len) sized combinations, smallest first.
+        candidates: list[list[str]] = []
+        max_r = min(len(pk_pool), 5)
+        for r in range(2, max_r + 1):
+            for subset in combinations(pk_pool, r):
+                candidates.append(list(subset))
+
+        # Score every candidate in one scan: HASH() folds each combination
+        # into a single value so APPROX_COUNT_DISTINCT can count it, and the
+        # first combination (smallest first) that is >98% unique wins.
+        if candidates:
+            ck_expressions = []
+            for n, combo in enumerate(candidates):
+                combo_cols = ", ".join(f'"{c}"' for c in combo)
+                ck_expressions.append(
+                    f'APPROX_COUNT_DISTINCT(HASH({combo_cols})) AS "ck_{n}"'
                 )
-                # For string-type columns, also collect up to 25 sample distinct values
-                if col["data_type"].upper() in _STRING_TYPES:
-                    expr += f', ARRAY_SLICE(ARRAY_AGG(DISTINCT "{cn}"), 0, 25) AS "sv_{cn}"'
-                col_expressions.append(expr)
-
-            batch_row: dict[str, Any] = {}
-            sample_n = 0
-            if col_expressions:
-                batch_sql = (
-                    f'SELECT COUNT(*) AS "_sample_n", {", ".join(col_expressions)} '
+            try:
+                ck_result = await execute_query(
+                    f'SELECT COUNT(*) AS "_ck_n", {", ".join(ck_expressions)} '
                     f"FROM {from_clause}"
                 )
-                batch_result = await execute_query(batch_sql)
-                batch_row = batch_result[0] if batch_result else {}
-
-            sample_n = batch_row.get("_sample_n", 0) or 0
-            if total_rows is None:
-                total_rows = sample_n
-
-            profile_cols = []
-            for col in columns:
-                col_name = col["column_name"]
-                if not col_name:
-                    continue
-                try:
-                    non_null = batch_row.get(f"nn_{col_name}", 0) or 0
-                    distinct = batch_row.get(f"dc_{col_name}", 0) or 0
-                    null_pct = round((1 - non_null / sample_n) * 100, 2) if sample_n > 0 else 0
-                    uniqueness_pct = round((distinct / non_null) * 100, 2) if non_null > 0 else 0
-
-                    # Semantic PK filtering: exclude columns unlikely to be keys
-                    data_type_upper = col["data_type"].upper()
-                    col_name_lower = col_name.lower()
-                    pk_excluded_keywords = (
-                        "description", "comment", "note", "text", "body",
-                        "message", "remark", "summary", "detail", "content",
-                    )
-                    is_text_like = data_type_upper in (
-                        "TEXT", "CLOB", "NCLOB", "STRING", "VARIANT",
-                    )
-                    is_excluded_name = any(kw in col_name_lower for kw in pk_excluded_keywords)
-                    stats_say_pk = uniqueness_pct > 98 and null_pct == 0
-                    is_likely_pk = stats_say_pk and not is_text_like and not is_excluded_name
-
-                    entry: dict[str, Any] = {
-                        "column": col_name,
-                        "data_type": col["data_type"],
-                        "nullable": col["is_nullable"] == "YES",
-                        "null_pct": null_pct,
-                        "uniqueness_pct": uniqueness_pct,
-                        "distinct_count": distinct,
-                        "total_rows": total_rows,
-                        "is_likely_pk": is_likely_pk,
-                        "sampled": sampled,
-                    }
-
-                    # Attach sample_values for string-type columns
-                    sv_key = f"sv_{col_name}"
-                    raw_sv = batch_row.get(sv_key)
-                    if raw_sv is not None:
-                        # Snowflake ARRAY comes back as JSON string from the connector
-                        if isinstance(raw_sv, str):
-                            try:
-                                raw_sv = json.loads(raw_sv)
-                            except (json.JSONDecodeError, TypeError):
-                                raw_sv = None
-                        if isinstance(raw_sv, list):
-                            sample_vals = [str(v) for v in raw_sv if v is not None][:25]
-                            if sample_vals:
-                                entry["sample_values"] = sample_vals
-
-                    profile_cols.append(entry)
-                except Exception as col_err:
-                    logger.warning("Profiling column %s.%s failed: %s", table_fqn, col_name, col_err)
-
-            # Composite PK detection: if no single-column PK was found, test
-            # candidate combinations of NOT-NULL columns with moderate
-            # cardinality.  Pure data-driven — no column-name heuristics.
-            has_single_pk = any(pc.get("is_likely_pk") for pc in profile_cols)
-            if not has_single_pk and total_rows and total_rows > 0:
-                _EXCLUDE_TYPES = {
-                    "BOOLEAN", "VARIANT", "OBJECT", "ARRAY",
-                    "CLOB", "NCLOB",
-                }
-                pk_pool = [
-                    pc["column"] for pc in profile_cols
-                    if pc["null_pct"] == 0
-                    and pc["data_type"].upper() not in _EXCLUDE_TYPES
-                    and pc.get("distinct_count", 0) > 1
-                    and pc.get("uniqueness_pct", 0) < 90
-                ]
-                # Sort by selectivity (highest distinct count first) and cap
-                # at 6 columns to keep the combinatorial search manageable.
-                col_distinct = {
-                    pc["column"]: pc.get("distinct_count", 0)
-                    for pc in profile_cols
-                }
-                pk_pool.sort(key=lambda c: col_distinct.get(c, 0), reverse=True)
-                pk_pool = pk_pool[:6]
-
-                # Generate all 2..min(5, len) sized combinations, smallest first.
-                candidates: list[list[str]] = []
-                max_r = min(len(pk_pool), 5)
-                for r in range(2, max_r + 1):
-                    for subset in combinations(pk_pool, r):
-                        candidates.append(list(subset))
-
-                for combo in candidates:
-                    if len(combo) < 2 or len(combo) > 5:
-                        continue
-                    quoted = ", ".join(f'"{c}"' for c in combo)
-                    try:
-                        # Snowflake doesn't support COUNT(DISTINCT (col1, col2)) tuple syntax.
-                        # Use a subquery with GROUP BY instead.
-                        ck_sql = (
-                            f"SELECT "
-                            f"(SELECT COUNT(*) FROM {from_clause}) AS total, "
-                            f"(SELECT COUNT(*) FROM "
-                            f"(SELECT 1 FROM {from_clause} GROUP BY {quoted})) AS uniq"
+                ck_row = ck_result[0] if ck_result else {}
+                ck_total = ck_row.get("_ck_n", 0) or 0
+                for n, combo in enumerate(candidates):
+                    ck_uniq = ck_row.get(f"ck_{n}", 0) or 0
+                    if ck_total > 0 and ck_uniq / ck_total > 0.98:
+                        # Mark these columns as composite PK
+                        combo_set = set(combo)
+                        for pc in profile_cols:
+                            if pc["column"] in combo_set:
+                                pc["is_likely_pk"] = True
+                        logger.info(
+                            "Composite PK detected for %s: %s",
+                            table_fqn, combo,
                         )
-                        ck_result = await execute_query(ck_sql)
-                        ck_row = ck_result[0] if ck_result else {}
-                        ck_total = ck_row.get("TOTAL", 0) or 0
-                        ck_uniq = ck_row.get("UNIQ", 0) or 0
-                        if ck_total > 0 and ck_uniq / ck_total > 0.98:
-                            # Mark these columns as composite PK
-                            combo_set = set(combo)
-                            for pc in profile_cols:
-                                if pc["column"] in combo_set:
-                                    pc["is_likely_pk"] = True
-                            logger.info(
-                                "Composite PK detected for %s: %s",
-                                table_fqn, combo,
-                            )
-                            break  # Use first valid composite key
-                    except Exception as ck_err:
-                        logger.debug("Composite PK check failed for %s: %s", table_fqn, ck_err)
-
-            profiles.append({
-                "table": table_fqn,
-                "row_count": total_rows,
-                "column_count": len(columns),
-                "columns": profile_cols,
-                "sampled": sampled,
-                "sample_size": sample_n if sampled else total_rows,
-            })
+                        break  # Use first valid composite key
+            except Exception as ck_err:
+                logger.debug("Composite PK check failed for %s: %s", table_fqn, ck_err)
 
-        except Exception as e:
-            logger.warning("Profiling table %s failed: %s", table_fqn, e)
-            profiles.append({"table": table_fqn, "error": str(e), "columns": []})
+    return {
+        "table": table_fqn,
+        "row_count": total_rows,
+        "column_count": len(columns),
+        "columns": profile_cols,
+        "sampled": sampled,
+        "sample_size": sample_n if sampled else total_rows,
+    }
 
-    await _emit(queue, "profiling", STEPS[step_idx]["label"],
-                "completed", f"{len(profiles)} tables profiled", total, total, step_idx)
-    return profiles
 
 
 def _step_classification(
     metadata: list[dict[str, Any]],
 ) -> dict[str, str]:
     """Step 3: Classify each table as FACT or DIMENSION (pure Python)."""
-    from agents.discovery import classify_table
-
     classifications: dict[str, str] = {}
     for table in metadata:
         col_names = [c["name"] for c in table.get("columns", [])]
@@ -561,13 +818,25 @@ def _step_classification(
 
 
 _DUP_CHECK_LIMIT = 10_000  # Row limit for duplicate rate estimation
+_DUP_CACHE_PREFIX = "discovery:dup"
+_DUP_CACHE_TTL = 86400  # 24 hours
 
 
-async def _compute_duplicate_rate(fqn: str) -> float:
+async def _compute_duplicate_rate(
+    fqn: str,
+    redis_client: Any = None,
+    last_altered: str | None = None,
+    row_count: int | None = None,
+) -> float:
     """Compute approximate duplicate row rate for a table.
 
     Returns a float between 0.0 (no duplicates) and 1.0 (all duplicates).
-    Uses HASH(*) over a 10K-row sample for speed.
+    Counts ``APPROX_COUNT_DISTINCT(HASH(*))`` (HyperLogLog, ~2% error) over
+    a 10K-row sample, which is ample for a rate. *row_count* is given for
+    base tables only: small tables are read whole and larger ones use a
+    uniform ``TABLESAMPLE ROW`` sample; views keep the ``LIMIT`` subquery.
+    When a Redis client and the table's ``LAST_ALTERED`` are given, the rate
+    is memoized per (table, LAST_ALTERED) so unchanged tables skip the scan.
     """
     from services.snowflake import execute_query
     from tools.snowflake_tools import _validate_fqn, _quoted_fqn
@@ -576,61 +845,110 @@ async def _compute_duplicate_rate(fqn: str) -> float:
     if err:
         return 0.0
 
+    cache_key = None
+    if redis_client is not None and last_altered:
+        cache_key = f"{_DUP_CACHE_PREFIX}:{fqn}:{last_altered}"
+        try:
+            cached = await redis_client.get(cache_key)
+            if cached is not None:
+                return float(cached)
+        except Exception as e:
+            logger.debug("Duplicate rate cache read failed for %s: %s", fqn, e)
+
     quoted = _quoted_fqn(parts)
 
+    if row_count is None:
+        from_clause = f"(SELECT * FROM {quoted} LIMIT {_DUP_CHECK_LIMIT}) AS _dup_sample"
+    elif row_count <= _DUP_CHECK_LIMIT:
+        from_clause = quoted
+    else:
+        from_clause = f"{quoted} TABLESAMPLE ROW ({_DUP_CHECK_LIMIT} ROWS)"
+
     try:
         sql = (
-            f"SELECT COUNT(*) AS total, COUNT(DISTINCT HASH(*)) AS distinct_hashes "
-            f"FROM (SELECT * FROM {quoted} LIMIT {_DUP_CHECK_LIMIT}) AS _dup_sample"
+            f"SELECT COUNT(*) AS total, APPROX_COUNT_DISTINCT(HASH(*)) AS distinct_hashes "
+            f"FROM {from_clause}"
         )
         result = await execute_query(sql)
-        if not result:
-            return 0.0
-        row = result[0]
-        total = row.get("TOTAL", 0) or 0
-        distinct = row.get("DISTINCT_HASHES", 0) or 0
-        if total == 0:
-            return 0.0
-        return max(0.0, 1.0 - distinct / total)
     except Exception as e:
         logger.warning("Duplicate rate check failed for %s: %s", fqn, e)
         return 0.0
 
+    row = result[0] if result else {}
+    total = row.get("TOTAL", 0) or 0
+    distinct = row.get("DISTINCT_HASHES", 0) or 0
+    rate = max(0.0, 1.0 - distinct / total) if total else 0.0
+
+    if cache_key is not None:
+        try:
+            # repr() round-trips the float exactly (the client decodes to str)
+            await redis_client.set(cache_key, repr(rate), ex=_DUP_CACHE_TTL)
+        except Exception as e:
+            logger.debug("Duplicate rate cache write failed for %s: %s", fqn, e)
+    return rate
+
 
 async def _step_classify_maturity(
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
     profiles: list[dict[str, Any]],
     metadata: list[dict[str, Any]],
+    last_altered: dict[str, str] | None = None,
+    redis_client: Any = None,
 ) -> dict[str, dict[str, Any]]:
-    """Step 4: Classify data maturity (bronze/silver/gold) per table."""
+    """Step 4: Classify data maturity (bronze/silver/gold) per table.
+
+    With *redis_client*, duplicate rates are memoized per table and
+    ``LAST_ALTERED`` (see ``_compute_duplicate_rate``).
+    """
     step_idx = 3
     total = len(profiles)
     await _emit(queue, "maturity", STEPS[step_idx]["label"],
                 "running", "Analyzing data maturity...", 0, total, step_idx)
 
-    from agents.discovery import classify_data_maturity
-
     classifications: dict[str, dict[str, Any]] = {}
+    last_altered = last_altered or {}
+    # Row counts of base tables pick the duplicate-check sampling strategy
+    table_row_counts = {
+        table["fqn"]: table.get("row_count")
+        for table in metadata
+        if table.get("object_type") == "TABLE"
+    }
+    sem = asyncio.Semaphore(_profile_concurrency())
 
-    for i, profile in enumerate(profiles):
-        if profile.get("error"):
-            continue
-        fqn = profile.get("table", "")
-        columns = profile.get("columns", [])
-        if not columns:
-            continue
+    async def _bounded_dup_rate(fqn: str) -> tuple[str, float]:
+        async with sem:
+            return fqn, await _compute_duplicate_rate(
+                fqn, redis_client, last_altered.get(fqn), table_row_counts.get(fqn),
+            )
 
+    # Duplicate rate is the only signal that needs SQL, and it is independent
+    # per table — run those queries concurrently.
+    columns_by_fqn = {
+        profile.get("table", ""): profile["columns"]
+        for profile in profiles
+        if not profile.get("error") and profile.get("columns")
+    }
+    dup_rates: dict[str, float] = {}
+    done = 0
+    throttle = _ProgressThrottle()
+    for next_done in asyncio.as_completed(
+        [_bounded_dup_rate(fqn) for fqn in columns_by_fqn]
+    ):
+        fqn, dup_rate = await next_done
+        dup_rates[fqn] = dup_rate
+        done += 1
+        if not throttle.ready():
+            continue
         table_name = fqn.split(".")[-1] if "." in fqn else fqn
         await _emit(queue, "maturity", STEPS[step_idx]["label"],
-                    "running", f"Classifying {table_name} ({i + 1} of {total})",
-                    i, total, step_idx)
+                    "running", f"Classified {table_name} ({done} of {total})",
+                    done, total, step_idx)
 
-        # Compute duplicate rate (the only signal that needs SQL)
-        dup_rate = await _compute_duplicate_rate(fqn)
-
-        # Use the shared classification function from discovery.py
-        result = classify_data_maturity(columns, duplicate_rate=dup_rate)
-        classifications[fqn] = result
+    # Use the shared classification function from discovery.py, in profile order
+    for fqn, columns in columns_by_fqn.items():
+        classifications[fqn] = classify_data_maturity(
+            columns, duplicate_rate=dup_rates[fqn],
+        )
 
     await _emit(queue, "maturity", STEPS[step_idx]["label"],
                 "completed", f"{len(classifications)} tables classified",
@@ -643,14 +961,15 @@ def _step_fk_inference(
     profiles: list[dict[str, Any]],
 ) -> list[dict[str, Any]]:
     """Infer foreign key relationships (pure Python). Used by Phase 2."""
-    from agents.discovery import infer_foreign_keys
-
     tables_for_fk = _build_fk_input(metadata, profiles)
     return infer_foreign_keys(tables_for_fk)
 
 
+_NEO4J_BATCH_SIZE = 1000  # Rows per UNWIND write, to bound transaction size
+
+
 async def _step_erd(
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
     data_product_id: str,
     results: dict[str, Any],
 ) -> dict[str, Any]:
@@ -680,72 +999,82 @@ async def _step_erd(
 
         driver = neo4j_service._driver
 
-        # Upsert table + column nodes
+        # Collect every node and edge first, then write each entity type with
+        # batched UNWIND statements instead of one round-trip per row.
+        tables_batch: list[dict[str, Any]] = []
+        cols_batch: list[dict[str, Any]] = []
         for table in metadata:
             fqn = table["fqn"]
-            classification = classifications.get(fqn, "UNKNOWN")
-            profile_cols = profile_map.get(fqn, [])
-
-            table_cypher = """
-            MERGE (t:Table {fqn: $fqn})
-            SET t.data_product_id = $dp_id,
-                t.classification = $classification,
-                t.row_count = $row_count
-            """
-            await neo4j_service.execute_write(
-                driver, table_cypher,
-                fqn=fqn,
-                dp_id=data_product_id,
-                classification=classification,
-                row_count=table.get("row_count") or 0,
-            )
-
+            tables_batch.append({
+                "fqn": fqn,
+                "classification": classifications.get(fqn, "UNKNOWN"),
+                "row_count": table.get("row_count") or 0,
+            })
+            # Determine PKs from profile data (first profile entry per column wins)
+            pk_by_col = {
+                pc.get("column"): pc.get("is_likely_pk", False)
+                for pc in reversed(profile_map.get(fqn, []))
+            }
             for col in table.get("columns", []):
-                # Determine if PK from profile data
-                is_pk = False
-                for pc in profile_cols:
-                    if pc.get("column") == col["name"]:
-                        is_pk = pc.get("is_likely_pk", False)
-                        break
-
-                col_cypher = """
-                MATCH (t:Table {fqn: $table_fqn})
-                MERGE (c:Column {name: $name, table_fqn: $table_fqn})
-                SET c.data_type = $data_type,
-                    c.nullable = $nullable,
-                    c.is_pk = $is_pk
-                MERGE (t)-[:HAS_COLUMN]->(c)
-                """
+                cols_batch.append({
+                    "table_fqn": fqn,
+                    "name": col["name"],
+                    "data_type": col.get("data_type", "VARCHAR"),
+                    "nullable": col.get("nullable", True),
+                    "is_pk": pk_by_col.get(col["name"], False),
+                })
+        edges_batch = [
+            {
+                "source": rel["from_table"],
+                "target": rel["to_table"],
+                "confidence": rel.get("confidence", 0.0),
+                "cardinality": rel.get("cardinality", "many_to_one"),
+                "source_column": rel.get("from_column", ""),
+                "target_column": rel.get("to_column", ""),
+            }
+            for rel in relationships
+        ]
+
+        table_cypher = """
+        UNWIND $rows AS row
+        MERGE (t:Table {fqn: row.fqn})
+        SET t.data_product_id = $dp_id,
+            t.classification = row.classification,
+            t.row_count = row.row_count
+        """
+        col_cypher = """
+        UNWIND $rows AS row
+        MATCH (t:Table {fqn: row.table_fqn})
+        MERGE (c:Column {name: row.name, table_fqn: row.table_fqn})
+        SET c.data_type = row.data_type,
+            c.nullable = row.nullable,
+            c.is_pk = row.is_pk
+        MERGE (t)-[:HAS_COLUMN]->(c)
+        """
+        edge_cypher = """
+        UNWIND $rows AS row
+        MATCH (src:Table {fqn: row.source})
+        MATCH (tgt:Table {fqn: row.target})
+        MERGE (src)-[r:FK_REFERENCES]->(tgt)
+        SET r.confidence = row.confidence,
+            r.cardinality = row.cardinality,
+            r.source_column = row.source_column,
+            r.target_column = row.target_column
+        """
+        # Tables before columns before edges: the later statements MATCH
+        # the Table nodes the earlier ones create.
+        for cypher, batch in (
+            (table_cypher, tables_batch),
+            (col_cypher, cols_batch),
+            (edge_cypher, edges_batch),
+        ):
+            for start in range(0, len(batch), _NEO4J_BATCH_SIZE):
                 await neo4j_service.execute_write(
-                    driver, col_cypher,
-                    table_fqn=fqn,
-                    name=col["name"],
-                    data_type=col.get("data_type", "VARCHAR"),
-                    nullable=col.get("nullable", True),
-                    is_pk=is_pk,
+                    driver, cypher,
+                    rows=batch[start:start + _NEO4J_BATCH_SIZE],
+                    dp_id=data_product_id,
                 )
 
-        # Upsert FK relationships
-        for rel in relationships:
-            edge_cypher = """
-            MATCH (src:Table {fqn: $source})
-            MATCH (tgt:Table {fqn: $target})
-            MERGE (src)-[r:FK_REFERENCES]->(tgt)
-            SET r.confidence = $confidence,
-                r.cardinality = $cardinality,
-                r.source_column = $source_column,
-                r.target_column = $target_column
-            """
-            await neo4j_service.execute_write(
-                driver, edge_cypher,
-                source=rel["from_table"],
-                target=rel["to_table"],
-                confidence=rel.get("confidence", 0.0),
-                cardinality=rel.get("cardinality", "many_to_one"),
-                source_column=rel.get("from_column", ""),
-                target_column=rel.get("to_column", ""),
-            )
-
         await _emit(queue, "erd", "Building data map",
                     "completed", f"{len(metadata)} tables, {len(relationships)} connections",
                     1, 1, 0)
@@ -762,14 +1091,19 @@ async def _step_erd(
         return {"status": "error", "error": str(e)}
 
 
+def _is_identifier(col: dict[str, Any]) -> bool:
+    """Whether a profiled column is a likely PK or named like an id/code/key."""
+    if col.get("is_likely_pk", False):
+        return True
+    col_name = col.get("column", "").lower()
+    return col_name == "id" or col_name.endswith(_ID_SUFFIXES)
+
+
 def _step_quality(results: dict[str, Any]) -> dict[str, Any]:
     """Step 4: Compute data quality health score (pure Python)."""
-    from agents.discovery import compute_health_score
-
     profiles = results.get("profiles", [])
     classifications = results.get("classifications", {})
 
-    completeness_pcts: list[float] = []
     issues: list[dict[str, Any]] = []
     check_results: dict[str, list[Any]] = {
         "duplicate_pks": [],
@@ -778,69 +1112,58 @@ def _step_quality(results: dict[str, Any]) -> dict[str, Any]:
         "missing_descriptions": [],
     }
 
-    for profile in profiles:
-        if profile.get("error"):
-            continue
-        columns = profile.get("columns", [])
-        if not columns:
-            completeness_pcts.append(0.0)
-            continue
-
-        # Completeness is measured ONLY on identifier columns (likely PKs/FKs).
-        # Rationale: sparse optional columns (e.g., coal-specific fields on solar
-        # plants) are structurally correct — their nulls are not quality issues.
-        # What matters is whether the core identifiers that link tables together
-        # are populated and consistent.
-        id_null_pcts: list[float] = []
-        for c in columns:
+    # Completeness is measured ONLY on identifier columns (likely PKs/FKs).
+    # Rationale: sparse optional columns (e.g., coal-specific fields on solar
+    # plants) are structurally correct — their nulls are not quality issues.
+    # What matters is whether the core identifiers that link tables together
+    # are populated and consistent.
+    #
+    # One pass flattens every profiled column's null_pct with its table index
+    # and identifier flag, and collects issues along the way; per-table
+    # averages are then computed for all tables at once.
+    scored_profiles = [profile for profile in profiles if not profile.get("error")]
+    table_idx: list[int] = []
+    null_pcts: list[float] = []
+    id_flags: list[bool] = []
+    for t, profile in enumerate(scored_profiles):
+        table_fqn = profile.get("table", "")
+        table_name = table_fqn.rsplit(".", 1)[-1]
+        for c in profile.get("columns", []):
             if "null_pct" not in c:
                 continue
-            col_name = c.get("column", "").lower()
-            is_id = (
-                c.get("is_likely_pk", False)
-                or col_name.endswith("_id")
-                or col_name == "id"
-                or col_name.endswith("_code")
-                or col_name.endswith("_key")
-            )
-            if is_id:
-                id_null_pcts.append(c["null_pct"])
-
-        if id_null_pcts:
-            avg_non_null = 100.0 - (sum(id_null_pcts) / len(id_null_pcts))
-            completeness_pcts.append(max(0.0, avg_non_null))
-        else:
-            # No identifier columns found — fall back to all columns
-            all_null_pcts = [c.get("null_pct", 0) for c in columns if "null_pct" in c]
-            if all_null_pcts:
-                avg_non_null = 100.0 - (sum(all_null_pcts) / len(all_null_pcts))
-                completeness_pcts.append(max(0.0, avg_non_null))
-            else:
-                completeness_pcts.append(0.0)
-
-        # Only flag identifier columns with gaps — these are real quality issues.
-        # Non-identifier columns with high nulls are informational (shown in the
-        # report but don't affect the score).
-        table_name = profile.get("table", "").split(".")[-1]
-        for col in columns:
-            null_pct = col.get("null_pct", 0)
-            if null_pct <= 5:
-                continue
-            col_name = col.get("column", "").lower()
-            is_id = (
-                col.get("is_likely_pk", False)
-                or col_name.endswith("_id")
-                or col_name == "id"
-                or col_name.endswith("_code")
-                or col_name.endswith("_key")
-            )
+            null_pct = c["null_pct"]
+            is_id = _is_identifier(c)
+            table_idx.append(t)
+            null_pcts.append(null_pct)
+            id_flags.append(is_id)
+            # Only flag identifier columns with gaps — these are real quality
+            # issues. Non-identifier columns with high nulls are informational
+            # (shown in the report but don't affect the score).
             if is_id and null_pct > 5:
                 issues.append({
                     "severity": "warning",
-                    "message": f"{table_name}.{col['column']} is {100 - null_pct:.0f}% complete",
-                    "affected_tables": [profile.get("table", "")],
+                    "message": f"{table_name}.{c['column']} is {100 - null_pct:.0f}% complete",
+                    "affected_tables": [table_fqn],
                 })
 
+    n_tables = len(scored_profiles)
+    tidx = np.array(table_idx, dtype=np.intp)
+    nulls = np.array(null_pcts, dtype=np.float64)
+    id_mask = np.array(id_flags, dtype=bool)
+    all_sum = np.bincount(tidx, weights=nulls, minlength=n_tables)
+    all_cnt = np.bincount(tidx, minlength=n_tables)
+    id_sum = np.bincount(tidx[id_mask], weights=nulls[id_mask], minlength=n_tables)
+    id_cnt = np.bincount(tidx[id_mask], minlength=n_tables)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # No identifier columns found — fall back to all columns; no profiled
+        # columns at all scores 0.
+        completeness = np.where(
+            id_cnt > 0,
+            100.0 - id_sum / id_cnt,
+            np.where(all_cnt > 0, 100.0 - all_sum / all_cnt, 0.0),
+        )
+    completeness_pcts = np.clip(completeness, 0.0, None).tolist()
+
     # Check for missing descriptions in metadata
     for table in results.get("metadata", []):
         if not table.get("comment"):
@@ -851,6 +1174,8 @@ def _step_quality(results: dict[str, Any]) -> dict[str, Any]:
 
     check_results["completeness_pcts"] = completeness_pcts
     overall_score = compute_health_score(check_results)
+    # Only the score needs the per-table completeness; drop it from the report
+    del check_results["completeness_pcts"]
     avg_completeness = sum(completeness_pcts) / len(completeness_pcts) if completeness_pcts else 0
 
     return {
@@ -858,12 +1183,50 @@ def _step_quality(results: dict[str, Any]) -> dict[str, Any]:
         "avg_completeness_pct": round(avg_completeness, 1),
         "table_count": len(profiles),
         "issues": issues,
-        "check_results": {k: v for k, v in check_results.items() if k != "completeness_pcts"},
+        "check_results": check_results,
     }
 
 
+def _encode_json_artifact(data: dict[str, Any]) -> bytes:
+    """Serialize an artifact payload to UTF-8 JSON bytes.
+
+    orjson writes the bytes directly (no intermediate ``str``); non-str keys
+    and unknown types are stringified like ``json.dumps(default=str)``.
+    """
+    return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+_SPOOL_MAX_MEMORY = 8 * 1024 * 1024  # Spooled artifacts beyond this go to disk
+
+
+def _spool_json_artifact(data: dict[str, Any], stream_key: str) -> tuple[IO[bytes], int]:
+    """Serialize an artifact payload into a spooled temp file.
+
+    The list under *stream_key* (e.g. every column profile) is written one
+    element at a time, so the JSON never exists as a single buffer. Returns
+    the file, rewound, and its size in bytes.
+    """
+    def _dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+    spool.write(b"{")
+    for key, value in data.items():
+        if key != stream_key:
+            spool.write(_dumps(key) + b":" + _dumps(value) + b",")
+    spool.write(_dumps(stream_key) + b":[")
+    for i, item in enumerate(data.get(stream_key, [])):
+        if i:
+            spool.write(b",")
+        spool.write(_dumps(item))
+    spool.write(b"]}")
+    size = spool.tell()
+    spool.seek(0)
+    return spool, size
+
+
 async def _step_artifacts(
-    queue: asyncio.Queue[dict | None],
+    queue: asyncio.Queue[dict | bytes | None],
     data_product_id: str,
     results: dict[str, Any],
 ) -> dict[str, Any]:
@@ -874,68 +1237,74 @@ async def _step_artifacts(
 
     quality = results.get("quality", {})
     artifact_ids: dict[str, str] = {}
-    settings = get_settings()
-
-    # 7a: Save quality report to PostgreSQL
-    try:
-        from services import postgres as pg_service
-
-        if pg_service._pool is not None:
-            pool = pg_service._pool
-            report_id = str(uuid4())
-            sql = """
-            INSERT INTO data_quality_checks (id, data_product_id, overall_score, check_results, issues)
-            VALUES ($1::uuid, $2::uuid, $3, $4::jsonb, $5::jsonb)
-            """
-            await pg_service.execute(
-                pool, sql,
-                report_id,
-                data_product_id,
-                quality.get("overall_score", 0),
-                json.dumps(quality.get("check_results", {})),
-                json.dumps(quality.get("issues", [])),
-            )
-            artifact_ids["quality_report_db"] = report_id
-            logger.info("Quality report saved to PostgreSQL: %s", report_id)
-    except Exception as e:
-        logger.warning("Failed to save quality report to PostgreSQL: %s", e)
 
-    # 5b: Upload quality report to MinIO
-    try:
-        from services import minio as minio_service
-        from services import postgres as pg_service
+    # The quality-check row and the report artifact are independent writes;
+    # run them concurrently.
+    async def _save_quality_check() -> None:
+        # 7a: Save quality report to PostgreSQL
+        try:
+            if pg_service._pool is not None:
+                pool = pg_service._pool
+                report_id = str(uuid4())
+                sql = """
+                INSERT INTO data_quality_checks (id, data_product_id, overall_score, check_results, issues)
+                VALUES ($1::uuid, $2::uuid, $3, $4::jsonb, $5::jsonb)
+                """
+                await pg_service.execute(
+                    pool, sql,
+                    report_id,
+                    data_product_id,
+                    quality.get("overall_score", 0),
+                    # asyncpg's default jsonb codec takes str
+                    orjson.dumps(quality.get("check_results", {})).decode(),
+                    orjson.dumps(quality.get("issues", [])).decode(),
+                )
+                artifact_ids["quality_report_db"] = report_id
+                logger.info("Quality report saved to PostgreSQL: %s", report_id)
+        except Exception as e:
+            logger.warning("Failed to save quality report to PostgreSQL: %s", e)
 
-        if minio_service._client is not None:
-            client = minio_service._client
-            bucket = settings.minio_artifacts_bucket
-            minio_service.ensure_bucket(client, bucket)
+    async def _upload_quality_report() -> None:
+        # 5b: Upload quality report to MinIO
+        try:
+            from services import minio as minio_service
+
+            if minio_service._client is not None:
+                # Quality report artifact (JSON)
+                qr_data = {
+                    "overall_score": quality.get("overall_score", 0),
+                    "avg_completeness_pct": quality.get("avg_completeness_pct", 0),
+                    "table_count": quality.get("table_count", 0),
+                    "check_results": quality.get("check_results", {}),
+                    "issues": quality.get("issues", []),
+                    "profiles": results.get("profiles", []),
+                }
+                # The report embeds every column profile — stream it into a
+                # spooled file off the loop and upload from there.
+                qr_file, qr_size = await asyncio.get_running_loop().run_in_executor(
+                    None, _spool_json_artifact, qr_data, "profiles",
+                )
+                with qr_file:
+                    qr_path, qr_artifact_id = await _upload_artifact_with_pg(
+                        data_product_id, "quality_report", "quality_report.json",
+                        qr_file,
+                        "application/json",
+                        size=qr_size,
+                    )
+                if qr_artifact_id:
+                    artifact_ids["quality_report"] = qr_artifact_id
+                    await queue.put({
+                        "type": "artifact",
+                        "data": {
+                            "artifact_id": qr_artifact_id,
+                            "artifact_type": "data_quality",
+                        },
+                    })
 
-            # Quality report artifact (JSON)
-            qr_data = {
-                "overall_score": quality.get("overall_score", 0),
-                "avg_completeness_pct": quality.get("avg_completeness_pct", 0),
-                "table_count": quality.get("table_count", 0),
-                "check_results": quality.get("check_results", {}),
-                "issues": quality.get("issues", []),
-                "profiles": results.get("profiles", []),
-            }
-            qr_path, qr_artifact_id = await _upload_artifact_with_pg(
-                data_product_id, "quality_report", "quality_report.json",
-                json.dumps(qr_data, default=str).encode("utf-8"),
-                "application/json",
-            )
-            if qr_artifact_id:
-                artifact_ids["quality_report"] = qr_artifact_id
-                await queue.put({
-                    "type": "artifact",
-                    "data": {
-                        "artifact_id": qr_artifact_id,
-                        "artifact_type": "data_quality",
-                    },
-                })
+        except Exception as e:
+            logger.warning("Failed to upload artifacts to MinIO: %s", e)
 
-    except Exception as e:
-        logger.warning("Failed to upload artifacts to MinIO: %s", e)
+    await asyncio.gather(_save_quality_check(), _upload_quality_report())
 
     await _emit(queue, "artifacts", STEPS[step_idx]["label"],
                 "completed", "Done", 1, 1, step_idx)
@@ -952,12 +1321,15 @@ def _build_fk_input(
     profiles: list[dict[str, Any]],
 ) -> list[dict[str, Any]]:
     """Build the table list expected by infer_foreign_keys from pipeline data."""
-    profile_map: dict[str, dict[str, bool]] = {}
-    for p in profiles:
-        pk_lookup: dict[str, bool] = {}
-        for pc in p.get("columns", []):
-            pk_lookup[pc["column"]] = pc.get("is_likely_pk", False)
-        profile_map[p["table"]] = pk_lookup
+    # Table FQN -> {column name: is_likely_pk}
+    profile_map: dict[str, dict[str, bool]] = {
+        p["table"]: {
+            pc["column"]: pc.get("is_likely_pk", False)
+            for pc in p.get("columns", ())
+            if "column" in pc
+        }
+        for p in profiles
+    }
 
     tables_for_fk: list[dict[str, Any]] = []
     for table in metadata:
@@ -966,7 +1338,7 @@ def _build_fk_input(
             "name": table["fqn"],
             "columns": [
                 {"name": c["name"], "is_pk": pk_lookup.get(c["name"], False)}
-                for c in table.get("columns", [])
+                for c in table.get("columns", ())
             ],
         })
     return tables_for_fk
@@ -980,7 +1352,7 @@ async def _upload_erd_artifact(
     try:
         erd_path, erd_artifact_id = await _upload_artifact_with_pg(
             data_product_id, "erd", "erd.json",
-            json.dumps(erd_data, default=str).encode("utf-8"),
+            _encode_json_artifact(erd_data),
             "application/json",
         )
         return erd_artifact_id
@@ -998,8 +1370,6 @@ async def run_erd_pipeline(
     Loads Phase 1 results from Redis cache, runs enhanced FK inference,
     builds Neo4j graph, and saves ERD artifact.
     """
-    from services import redis as redis_service
-
     settings = get_settings()
     client = await redis_service.get_client(settings.redis_url)
     cache_key = f"{CACHE_KEY_PREFIX}:{data_product_id}"
@@ -1012,14 +1382,12 @@ async def run_erd_pipeline(
     profiles = results.get("profiles", [])
 
     # Enhanced FK inference using data description context
-    from agents.discovery import infer_foreign_keys_enhanced
-
     fk_input = _build_fk_input(metadata, profiles)
     relationships = infer_foreign_keys_enhanced(fk_input, data_description)
     results["relationships"] = relationships
 
     # Build ERD in Neo4j (reuse existing _step_erd with a dummy queue)
-    dummy_queue: asyncio.Queue[dict | None] = asyncio.Queue()
+    dummy_queue: asyncio.Queue[dict | bytes | None] = asyncio.Queue()
     erd_result = await _step_erd(dummy_queue, data_product_id, results)
 
     # Save ERD artifact
@@ -1052,27 +1420,27 @@ def _build_erd_artifact(results: dict[str, Any]) -> dict[str, Any]:
     relationships = results.get("relationships", [])
     profiles = results.get("profiles", [])
 
-    profile_map: dict[str, list[dict[str, Any]]] = {}
+    # Table FQN -> {column name: is_likely_pk}
+    profile_map: dict[str, dict[str, bool]] = {}
     for p in profiles:
         if "columns" in p:
-            profile_map[p["table"]] = p.get("columns", [])
+            profile_map[p["table"]] = {
+                pc["column"]: pc.get("is_likely_pk", False)
+                for pc in p.get("columns", [])
+                if "column" in pc
+            }
 
     nodes = []
     for table in metadata:
         fqn = table["fqn"]
-        profile_cols = profile_map.get(fqn, [])
+        profile_pks = profile_map.get(fqn, {})
         cols = []
         for col in table.get("columns", []):
-            is_pk = False
-            for pc in profile_cols:
-                if pc.get("column") == col["name"]:
-                    is_pk = pc.get("is_likely_pk", False)
-                    break
             cols.append({
                 "name": col["name"],
                 "data_type": col.get("data_type", "VARCHAR"),
                 "nullable": col.get("nullable", True),
-                "is_pk": is_pk,
+                "is_pk": profile_pks.get(col["name"], False),
             })
         nodes.append({
             "table_fqn": fqn,
@@ -1099,51 +1467,54 @@ async def _upload_artifact_with_pg(
     data_product_id: str,
     artifact_type: str,
     filename: str,
-    content_bytes: bytes,
+    content: bytes | IO[bytes],
     content_type: str,
+    size: int | None = None,
 ) -> tuple[str, str | None]:
     """Upload artifact to MinIO and persist metadata to PostgreSQL.
 
+    *content* is either the artifact bytes or a readable file of *size* bytes.
+
     Returns (minio_path, artifact_id) or (path, None) on PG failure.
     """
     from services import minio as minio_service
-    from services import postgres as pg_service
 
     settings = get_settings()
     client = minio_service._client
     bucket = settings.minio_artifacts_bucket
     artifact_id = str(uuid4())
     version = 1
+    content_size = len(content) if isinstance(content, bytes) else size
 
     # Persist to PostgreSQL for versioning
     try:
         if pg_service._pool is not None:
-            pool = pg_service._pool
-            sql = """
-            INSERT INTO artifacts (id, data_product_id, artifact_type, minio_path, filename, file_size_bytes, content_type, created_by)
-            VALUES ($1::uuid, $2::uuid, $3::artifact_type, $4, $5, $6, $7, $8)
-            RETURNING version
-            """
-            placeholder_path = f"{data_product_id}/{artifact_type}/{filename}"
-            rows = await pg_service.query(
-                pool, sql,
-                artifact_id, data_product_id, artifact_type,
-                placeholder_path, filename, len(content_bytes), content_type, "pipeline",
+            from tools.minio_tools import _insert_artifact_row
+
+            version = await _insert_artifact_row(
+                pg_service._pool, artifact_id, data_product_id, artifact_type,
+                filename, content_size, content_type, "pipeline",
             )
-            if rows:
-                version = rows[0]["version"] if "version" in rows[0].keys() else 1
-            final_path = f"{data_product_id}/{artifact_type}/v{version}/{filename}"
-            update_sql = "UPDATE artifacts SET minio_path = $1 WHERE id = $2::uuid"
-            await pg_service.execute(pool, update_sql, final_path, artifact_id)
     except Exception as e:
         logger.warning("Failed to persist artifact metadata to PostgreSQL: %s", e)
         artifact_id = str(uuid4())
 
     final_path = f"{data_product_id}/{artifact_type}/v{version}/{filename}"
 
-    # Upload to MinIO
+    # Upload to MinIO (blocking client — run it off the event loop)
     if client is not None:
-        minio_service.ensure_bucket(client, bucket)
-        minio_service.upload_file(client, bucket, final_path, content_bytes, content_type=content_type)
+        def _put() -> None:
+            minio_service.ensure_bucket(client, bucket)
+            if isinstance(content, bytes):
+                minio_service.upload_file(
+                    client, bucket, final_path, content, content_type=content_type,
+                )
+            else:
+                minio_service.upload_stream(
+                    client, bucket, final_path, content, content_size,
+                    content_type=content_type,
+                )
+
+        await asyncio.get_running_loop().run_in_executor(None, _put)
 
     return final_path, artifact_id
@@ -18,8 +18,12 @@ Reference: https://docs.litellm.ai/docs/routing-load-balancing
 
 from __future__ import annotations
 
+import hashlib
 import logging
-from typing import Any
+import threading
+from typing import Any, Callable
+
+import orjson
 
 from litellm import Router
 
@@ -32,6 +36,12 @@ logger = logging.getLogger(__name__)
 PRIMARY_MODEL_GROUP = "ekaiX-primary"
 FALLBACK_MODEL_GROUP = "ekaiX-fallback"
 
+# (config digest, Router) for the last router built. The digest covers the
+# full Router configuration, credentials included, so a settings change
+# simply misses and rebuilds.
+_router_cache: tuple[str, Router] | None = None
+_router_lock = threading.Lock()
+
 
 def build_litellm_router() -> Router:
     """Build LiteLLM Router with primary + fallback providers from Settings.
@@ -40,6 +50,9 @@ def build_litellm_router() -> Router:
     ANY error from the primary (including 403/401 auth errors) triggers failover
     to the fallback provider.
 
+    The Router is reused across calls while its configuration is unchanged,
+    which also lets its cooldown state carry over between requests.
+
     Returns:
         Router configured with primary and fallback providers.
 
@@ -56,6 +69,7 @@ def build_litellm_router() -> Router:
         provider=settings.llm_provider,
         model=primary_model,
         model_group=PRIMARY_MODEL_GROUP,
+        settings=settings,
     )
     if primary_config:
         model_list.append(primary_config)
@@ -71,6 +85,7 @@ def build_litellm_router() -> Router:
             provider=fallback_provider,
             model=fallback_model,
             model_group=FALLBACK_MODEL_GROUP,
+            settings=settings,
             credentials=fallback,
         )
         if fallback_config:
@@ -92,12 +107,22 @@ def build_litellm_router() -> Router:
     if has_fallback:
         router_kwargs["fallbacks"] = [{PRIMARY_MODEL_GROUP: [FALLBACK_MODEL_GROUP]}]
 
-    # Drop unsupported params (e.g. temperature for reasoning models like gpt-5)
-    # rather than failing with UnsupportedParamsError
-    import litellm
-    litellm.drop_params = True
+    global _router_cache
+    config_digest = hashlib.blake2b(
+        orjson.dumps(router_kwargs, option=orjson.OPT_SORT_KEYS, default=str),
+        digest_size=16,
+    ).hexdigest()
+    with _router_lock:
+        if _router_cache is not None and _router_cache[0] == config_digest:
+            return _router_cache[1]
+
+        # Drop unsupported params (e.g. temperature for reasoning models like gpt-5)
+        # rather than failing with UnsupportedParamsError
+        import litellm
+        litellm.drop_params = True
 
-    router = Router(**router_kwargs)
+        router = Router(**router_kwargs)
+        _router_cache = (config_digest, router)
 
     logger.info(
         "LiteLLM Router initialized with %d provider(s)%s",
@@ -107,19 +132,30 @@ def build_litellm_router() -> Router:
     return router
 
 
+def invalidate_router_cache() -> None:
+    """Drop the cached Router so the next build creates a fresh one."""
+    global _router_cache
+    with _router_lock:
+        _router_cache = None
+
+
+# Provider -> top-level Settings field holding its model (or Azure deployment)
+_PROVIDER_MODEL_SETTING: dict[str, str] = {
+    "anthropic": "anthropic_model",
+    "openai": "openai_model",
+    "vertex-ai": "vertex_model",
+    "azure-openai": "azure_openai_deployment",
+    "snowflake-cortex": "cortex_model",
+}
+
+
 def _get_model_for_provider(settings: Any, provider: str) -> str:
     """Get the model name for a specific provider from top-level settings."""
-    if provider == "anthropic":
-        return settings.anthropic_model
-    elif provider == "openai":
-        return settings.openai_model
-    elif provider == "vertex-ai":
-        return normalize_vertex_model_name(settings.vertex_model)
-    elif provider == "azure-openai":
-        return settings.azure_openai_deployment
-    elif provider == "snowflake-cortex":
-        return settings.cortex_model
-    return ""
+    field = _PROVIDER_MODEL_SETTING.get(provider)
+    if field is None:
+        return ""
+    model = getattr(settings, field)
+    return normalize_vertex_model_name(model) if provider == "vertex-ai" else model
 
 
 def _get_model_from_fallback_config(fallback: dict[str, Any], provider: str) -> str:
@@ -128,19 +164,11 @@ def _get_model_from_fallback_config(fallback: dict[str, Any], provider: str) ->
     The fallback config uses provider-specific keys (azure_openai_deployment,
     vertex_model, etc.), not a generic "model" key.
     """
-    if provider == "azure-openai":
-        return fallback.get("azure_openai_deployment", fallback.get("model", ""))
-    elif provider == "vertex-ai":
-        return normalize_vertex_model_name(
-            fallback.get("vertex_model", fallback.get("model", ""))
-        )
-    elif provider == "anthropic":
-        return fallback.get("anthropic_model", fallback.get("model", ""))
-    elif provider == "openai":
-        return fallback.get("openai_model", fallback.get("model", ""))
-    elif provider == "snowflake-cortex":
-        return fallback.get("cortex_model", fallback.get("model", ""))
-    return fallback.get("model", "")
+    field = _PROVIDER_MODEL_SETTING.get(provider)
+    if field is None:
+        return fallback.get("model", "")
+    model = fallback.get(field, fallback.get("model", ""))
+    return normalize_vertex_model_name(model) if provider == "vertex-ai" else model
 
 
 def _get_secret(value: Any) -> str:
@@ -152,10 +180,105 @@ def _get_secret(value: Any) -> str:
     return str(value)
 
 
+# Per-provider builders for the "litellm_params" of a model_list entry. Each
+# takes (model, settings, credentials); *credentials* is the fallback config
+# dict, or None for the primary provider, which reads top-level settings.
+
+
+def _anthropic_params(
+    model: str, settings: Any, credentials: dict[str, Any] | None,
+) -> dict[str, Any]:
+    params: dict[str, Any] = {"model": f"anthropic/{model}"}
+    api_key = (
+        credentials.get("anthropic_api_key", "") if credentials
+        else _get_secret(settings.anthropic_api_key)
+    )
+    if api_key:
+        params["api_key"] = api_key
+    return params
+
+
+def _openai_params(
+    model: str, settings: Any, credentials: dict[str, Any] | None,
+) -> dict[str, Any]:
+    params: dict[str, Any] = {"model": f"openai/{model}"}
+    api_key = (
+        credentials.get("openai_api_key", "") if credentials
+        else _get_secret(settings.openai_api_key)
+    )
+    if api_key:
+        params["api_key"] = api_key
+    return params
+
+
+def _vertex_params(
+    model: str, settings: Any, credentials: dict[str, Any] | None,
+) -> dict[str, Any]:
+    # Vertex AI uses GOOGLE_APPLICATION_CREDENTIALS env var for auth
+    return {
+        "model": f"vertex_ai/{model}",
+        "vertex_project": (
+            credentials.get("vertex_project", "") if credentials
+            else settings.vertex_project
+        ),
+        "vertex_location": (
+            credentials.get("vertex_location", "") if credentials
+            else settings.vertex_location
+        ),
+    }
+
+
+def _azure_params(
+    model: str, settings: Any, credentials: dict[str, Any] | None,
+) -> dict[str, Any]:
+    # For Azure, model IS the deployment name
+    params: dict[str, Any] = {"model": f"azure/{model}"}
+    api_key = (
+        credentials.get("azure_openai_api_key", "") if credentials
+        else _get_secret(settings.azure_openai_api_key)
+    )
+    if api_key:
+        params["api_key"] = api_key
+    params["api_base"] = (
+        credentials.get("azure_openai_endpoint", "") if credentials
+        else settings.azure_openai_endpoint
+    )
+    params["api_version"] = (
+        credentials.get("azure_openai_api_version", "") if credentials
+        else settings.azure_openai_api_version
+    )
+    return params
+
+
+def _cortex_params(
+    model: str, settings: Any, credentials: dict[str, Any] | None,
+) -> dict[str, Any]:
+    # Use the OpenAI-compatible Cortex Chat Completions REST API.
+    # LiteLLM's native snowflake/ prefix requires JWT key-pair auth,
+    # but Snowflake session tokens work with the OpenAI-compatible endpoint.
+    return {
+        "model": f"openai/{model}",
+        "api_key": _get_secret(settings.snowflake_password),
+        "api_base": f"https://{settings.snowflake_account}.snowflakecomputing.com/api/v2/cortex/v1",
+    }
+
+
+_PROVIDER_PARAMS: dict[
+    str, Callable[[str, Any, dict[str, Any] | None], dict[str, Any]]
+] = {
+    "anthropic": _anthropic_params,
+    "openai": _openai_params,
+    "vertex-ai": _vertex_params,
+    "azure-openai": _azure_params,
+    "snowflake-cortex": _cortex_params,
+}
+
+
 def _build_provider_config(
     provider: str,
     model: str,
     model_group: str,
+    settings: Any,
     credentials: dict[str, Any] | None = None,
 ) -> dict[str, Any] | None:
     """Build a LiteLLM model_list entry for a specific provider.
@@ -164,6 +287,7 @@ def _build_provider_config(
         provider: Provider name (anthropic, openai, vertex-ai, azure-openai, snowflake-cortex)
         model: Model identifier for the provider
         model_group: Router model group name (e.g. "ekaiX-primary" or "ekaiX-fallback")
+        settings: Effective settings, as read by ``build_litellm_router``.
         credentials: Optional dict with provider-specific credentials.
             For the primary provider, reads from top-level settings.
             For the fallback provider, uses this dict instead.
@@ -174,74 +298,12 @@ def _build_provider_config(
     if not provider or not model:
         return None
 
-    settings = get_effective_settings()
-
-    config: dict[str, Any] = {
-        "model_name": model_group,
-        "litellm_params": {},
-    }
-
-    if provider == "anthropic":
-        config["litellm_params"]["model"] = f"anthropic/{model}"
-        api_key = (
-            credentials.get("anthropic_api_key", "") if credentials
-            else _get_secret(settings.anthropic_api_key)
-        )
-        if api_key:
-            config["litellm_params"]["api_key"] = api_key
-
-    elif provider == "openai":
-        config["litellm_params"]["model"] = f"openai/{model}"
-        api_key = (
-            credentials.get("openai_api_key", "") if credentials
-            else _get_secret(settings.openai_api_key)
-        )
-        if api_key:
-            config["litellm_params"]["api_key"] = api_key
-
-    elif provider == "vertex-ai":
-        config["litellm_params"]["model"] = f"vertex_ai/{model}"
-        config["litellm_params"]["vertex_project"] = (
-            credentials.get("vertex_project", "") if credentials
-            else settings.vertex_project
-        )
-        config["litellm_params"]["vertex_location"] = (
-            credentials.get("vertex_location", "") if credentials
-            else settings.vertex_location
-        )
-        # Vertex AI uses GOOGLE_APPLICATION_CREDENTIALS env var for auth
-
-    elif provider == "azure-openai":
-        deployment = model  # For Azure, model IS the deployment name
-        config["litellm_params"]["model"] = f"azure/{deployment}"
-        api_key = (
-            credentials.get("azure_openai_api_key", "") if credentials
-            else _get_secret(settings.azure_openai_api_key)
-        )
-        if api_key:
-            config["litellm_params"]["api_key"] = api_key
-        config["litellm_params"]["api_base"] = (
-            credentials.get("azure_openai_endpoint", "") if credentials
-            else settings.azure_openai_endpoint
-        )
-        config["litellm_params"]["api_version"] = (
-            credentials.get("azure_openai_api_version", "") if credentials
-            else settings.azure_openai_api_version
-        )
-
-    elif provider == "snowflake-cortex":
-        # Use the OpenAI-compatible Cortex Chat Completions REST API.
-        # LiteLLM's native snowflake/ prefix requires JWT key-pair auth,
-        # but Snowflake session tokens work with the OpenAI-compatible endpoint.
-        account = settings.snowflake_account
-        config["litellm_params"]["model"] = f"openai/{model}"
-        config["litellm_params"]["api_key"] = _get_secret(settings.snowflake_password)
-        config["litellm_params"]["api_base"] = (
-            f"https://{account}.snowflakecomputing.com/api/v2/cortex/v1"
-        )
-
-    else:
+    build_params = _PROVIDER_PARAMS.get(provider)
+    if build_params is None:
         logger.warning("Unknown LLM provider: %s", provider)
         return None
 
-    return config
+    return {
+        "model_name": model_group,
+        "litellm_params": build_params(model, settings, credentials),
+    }
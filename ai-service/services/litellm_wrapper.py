@@ -108,10 +108,9 @@ class ChatLiteLLMRouterWithFallback(ChatLiteLLMRouter):
         **kwargs: Any,
     ) -> AsyncIterator[ChatGenerationChunk]:
         """Stream with automatic fallback on initial connection errors."""
+        message_dicts, params = self._build_stream_request(messages, stop, **kwargs)
         try:
-            async for chunk in self._do_astream(
-                messages, stop, run_manager, **kwargs
-            ):
+            async for chunk in self._do_astream(message_dicts, params, run_manager):
                 yield chunk
         except Exception as e:
             if self.fallback_model_group and _should_fallback(e):
@@ -121,41 +120,42 @@ class ChatLiteLLMRouterWithFallback(ChatLiteLLMRouter):
                     str(e)[:200],
                     self.fallback_model_group,
                 )
-                async for chunk in self._do_astream(
-                    messages,
-                    stop,
-                    run_manager,
-                    model_override=self.fallback_model_group,
-                    **kwargs,
-                ):
+                # Same request, only the model group changes
+                fallback_params = {**params, "model": self.fallback_model_group}
+                async for chunk in self._do_astream(message_dicts, fallback_params, run_manager):
                     yield chunk
             else:
                 raise
 
-    async def _do_astream(
+    def _build_stream_request(
         self,
         messages: List[BaseMessage],
         stop: Optional[List[str]] = None,
-        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
-        model_override: Optional[str] = None,
         **kwargs: Any,
-    ) -> AsyncIterator[ChatGenerationChunk]:
-        """Execute the actual streaming call against the router."""
-        default_chunk_class = AIMessageChunk
+    ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """Build the message dicts and router params for a streaming call."""
         message_dicts, params = self._create_message_dicts(messages, stop)
-        params = {**params, **kwargs, "stream": True}
-        params = {k: v for k, v in params.items() if v is not None}
+        params = {k: v for k, v in {**params, **kwargs}.items() if v is not None}
+        params["stream"] = True
         params["stream_options"] = self.stream_options
         if self.reasoning_effort and "reasoning_effort" not in params:
             # Vertex/Gemini: enables reasoning_content in stream when supported.
             # Unsupported providers ignore this because litellm.drop_params=True.
             params["reasoning_effort"] = self.reasoning_effort
         self._prepare_params_for_router(params)
+        return message_dicts, params
 
-        # Override model group for fallback
-        if model_override:
-            params["model"] = model_override
+    async def _do_astream(
+        self,
+        message_dicts: list[dict[str, Any]],
+        params: dict[str, Any],
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Execute the actual streaming call against the router."""
+        default_chunk_class = AIMessageChunk
 
+        # The request params are not forwarded to on_llm_new_token: no handler
+        # reads them, and expanding them into every per-token call is pure overhead.
         async for chunk in await self.router.acompletion(
             messages=message_dicts, **params
         ):
@@ -163,20 +163,19 @@ class ChatLiteLLMRouterWithFallback(ChatLiteLLMRouter):
             if "usage" in chunk and chunk["usage"]:
                 usage_metadata = _create_usage_metadata(chunk["usage"])
 
-            if len(chunk["choices"]) == 0:
+            choices = chunk["choices"]
+            if not choices:
                 if usage_metadata:
                     chunk_obj = default_chunk_class(
                         content="", usage_metadata=usage_metadata
                     )
                     cg_chunk = ChatGenerationChunk(message=chunk_obj)
                     if run_manager:
-                        await run_manager.on_llm_new_token(
-                            "", chunk=cg_chunk, **params
-                        )
+                        await run_manager.on_llm_new_token("", chunk=cg_chunk)
                     yield cg_chunk
                 continue
 
-            delta = chunk["choices"][0]["delta"]
+            delta = choices[0]["delta"]
             chunk = _convert_delta_to_message_chunk(delta, default_chunk_class)
 
             if usage_metadata and isinstance(chunk, AIMessageChunk):
@@ -188,9 +187,7 @@ class ChatLiteLLMRouterWithFallback(ChatLiteLLMRouter):
                 if not callback_token and isinstance(chunk, AIMessageChunk):
                     reasoning_payload = chunk.additional_kwargs.get("reasoning_content")
                     callback_token = _coerce_reasoning_text(reasoning_payload)
-                await run_manager.on_llm_new_token(
-                    callback_token, chunk=cg_chunk, **params
-                )
+                await run_manager.on_llm_new_token(callback_token, chunk=cg_chunk)
             yield cg_chunk
 
 
@@ -21,40 +21,98 @@ Note on retry/fallback:
 - LangChain provider SDKs (Vertex AI, OpenAI, Anthropic) have built-in retry for transient errors
 """
 
-import json
+import atexit
+import hashlib
 import logging
 import os
 import tempfile
+import threading
 from typing import Any
 
+import orjson
 from langchain_core.language_models.chat_models import BaseChatModel
 
-from config import get_effective_settings
+from config import _settings_overrides, get_effective_settings
 from services.model_names import normalize_vertex_model_name
 
 logger = logging.getLogger(__name__)
 
+# Service-account JSON digest -> temp credentials file, so rebuilding a model
+# with unchanged credentials reuses one file instead of writing a new one.
+_vertex_credentials_paths: dict[str, str] = {}
+
+# (settings digest, model) for the last model get_chat_model built. Effective
+# settings are the .env values (fixed per process) plus the runtime overrides,
+# so a digest of the overrides identifies them; any override change misses.
+_chat_model_cache: tuple[str, Any] | None = None
+_chat_model_lock = threading.Lock()
+
+# Model-name prefixes of OpenAI reasoning models (no temperature support)
+_REASONING_MODEL_PREFIXES = ("o1", "o3", "o4", "gpt-5")
+
+# Module-level Langfuse callback handler — lazy init
+_langfuse_handler: Any = None
+_langfuse_init_failed: bool = False
+
+
+def _remove_credentials_file(path: str) -> None:
+    """Delete a written credentials file, ignoring one that is already gone."""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _vertex_credentials_path(creds_json: str) -> str:
+    """Return a credentials file for *creds_json*, writing it once per content.
+
+    Files are removed at interpreter exit so service-account keys do not
+    outlive the process in the temp directory.
+    """
+    digest = hashlib.blake2b(creds_json.encode("utf-8"), digest_size=16).hexdigest()
+    creds_path = _vertex_credentials_paths.get(digest)
+    if creds_path is None or not os.path.exists(creds_path):
+        creds_data = orjson.loads(creds_json)
+        with tempfile.NamedTemporaryFile(mode="wb", suffix=".json", delete=False) as f:
+            f.write(orjson.dumps(creds_data))
+            creds_path = f.name
+        _vertex_credentials_paths[digest] = creds_path
+        atexit.register(_remove_credentials_file, creds_path)
+    return creds_path
+
 
 def _get_langfuse_callback() -> Any | None:
-    """Create Langfuse callback handler if credentials are configured.
+    """Return the shared Langfuse callback handler if credentials are configured.
+
+    Langfuse keys come from the .env file only, so one handler serves every
+    model built in this process; it tracks runs by run_id.
 
     Returns None if Langfuse is not configured or fails to initialize.
     """
+    global _langfuse_handler, _langfuse_init_failed
+
+    if _langfuse_init_failed:
+        return None
+    if _langfuse_handler is not None:
+        return _langfuse_handler
+
     settings = get_effective_settings()
     if not settings.langfuse_public_key or not settings.langfuse_secret_key:
+        _langfuse_init_failed = True
         return None
 
     try:
         from langfuse.langchain import CallbackHandler
 
-        handler = CallbackHandler()
+        _langfuse_handler = CallbackHandler()
         logger.info(
             "Langfuse callback handler created (base_url=%s)",
             settings.langfuse_base_url or "default",
         )
-        return handler
+        return _langfuse_handler
     except Exception as e:
         logger.warning("Failed to create Langfuse callback handler: %s", e)
+        _langfuse_init_failed = True
         return None
 
 
@@ -65,11 +123,7 @@ def _is_reasoning_model(model_name: str) -> bool:
     (o1, o3, o4-mini) are reasoning models that reject the temperature param.
     They use reasoning_effort instead.
     """
-    name = model_name.lower()
-    return any(
-        name.startswith(prefix)
-        for prefix in ("o1", "o3", "o4", "gpt-5")
-    )
+    return model_name.lower().startswith(_REASONING_MODEL_PREFIXES)
 
 
 def _build_model_for_provider(
@@ -108,11 +162,7 @@ def _build_model_for_provider(
             )
 
         if settings.vertex_credentials_json:
-            creds_json = settings.vertex_credentials_json
-            creds_data = json.loads(creds_json)
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-                json.dump(creds_data, f)
-                creds_path = f.name
+            creds_path = _vertex_credentials_path(settings.vertex_credentials_json)
             os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = creds_path
             logger.info("Using Vertex AI credentials from runtime overrides")
         elif os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"):
@@ -271,7 +321,42 @@ def _build_model_for_provider(
     )
 
 
+def _settings_digest() -> str:
+    """Digest the runtime settings overrides (secrets included, never stored)."""
+    overrides = orjson.dumps(
+        _settings_overrides, option=orjson.OPT_SORT_KEYS, default=str,
+    )
+    return hashlib.blake2b(overrides, digest_size=16).hexdigest()
+
+
+def clear_chat_model_cache() -> None:
+    """Drop the cached chat model so the next call builds a fresh one."""
+    global _chat_model_cache
+    with _chat_model_lock:
+        _chat_model_cache = None
+
+
 def get_chat_model() -> BaseChatModel | Any:
+    """Return the chat model for the current settings, building it on change.
+
+    The model is cached until the effective settings change (or
+    ``clear_chat_model_cache`` is called); LangChain chat models and the
+    LiteLLM wrapper hold no per-request state, so callers share it. A
+    degraded single-provider model, built because the router failed, is not
+    cached so the router is retried on the next call.
+    """
+    global _chat_model_cache
+    digest = _settings_digest()
+    with _chat_model_lock:
+        if _chat_model_cache is not None and _chat_model_cache[0] == digest:
+            return _chat_model_cache[1]
+        model, cacheable = _create_chat_model()
+        if cacheable:
+            _chat_model_cache = (digest, model)
+    return model
+
+
+def _create_chat_model() -> tuple[BaseChatModel | Any, bool]:
     """Create a LangChain ChatModel or LiteLLM Router based on configuration.
 
     When litellm_enable=True (recommended for production):
@@ -286,7 +371,8 @@ def get_chat_model() -> BaseChatModel | Any:
     ensuring all LLM calls are traced regardless of how the model is invoked.
 
     Returns:
-        A LiteLLM Router (if enabled) or BaseChatModel instance.
+        A LiteLLM Router (if enabled) or BaseChatModel instance, and whether
+        it may be cached (False for the fallback after a router failure).
 
     Raises:
         ValueError: If the provider is unknown or misconfigured.
@@ -336,7 +422,7 @@ def get_chat_model() -> BaseChatModel | Any:
                 fallback_model_group=FALLBACK_MODEL_GROUP if has_fallback else None,
             )
             logger.info("Using LiteLLM Router for LLM calls (automatic failover enabled)")
-            return model
+            return model, True
         except Exception as e:
             logger.error("Failed to build LiteLLM Router: %s. Falling back to single provider.", e)
             # Fall through to legacy mode if router build fails
@@ -348,4 +434,4 @@ def get_chat_model() -> BaseChatModel | Any:
     callbacks = [langfuse_callback] if langfuse_callback else None
 
     logger.info("Using legacy single-provider mode (no automatic failover)")
-    return _build_model_for_provider(provider, settings, callbacks)
+    return _build_model_for_provider(provider, settings, callbacks), not settings.litellm_enable
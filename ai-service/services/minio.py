@@ -5,6 +5,7 @@ Manages buckets: artifacts, documents, workspace.
 """
 
 from io import BytesIO
+from typing import BinaryIO
 
 from minio import Minio
 
@@ -56,6 +57,18 @@ def upload_file(
     client.put_object(bucket, path, BytesIO(data), len(data), content_type=content_type)
 
 
+def upload_stream(
+    client: Minio,
+    bucket: str,
+    path: str,
+    stream: BinaryIO,
+    length: int,
+    content_type: str = "application/octet-stream",
+) -> None:
+    """Upload *length* bytes read from a file-like *stream* to bucket/path."""
+    client.put_object(bucket, path, stream, length, content_type=content_type)
+
+
 def download_file(client: Minio, bucket: str, path: str) -> bytes:
     """Download an object from MinIO and return its contents as bytes."""
     response = client.get_object(bucket, path)
@@ -7,13 +7,23 @@ Provides connection lifecycle management for Redis, used for:
     - Profile cache (cache:profile:{fqn}) with 1-hour TTL
 """
 
-import json
+import asyncio
 from typing import Any
 
+import orjson
 import redis.asyncio as redis
 
 _client: redis.Redis | None = None
 
+# Cached values above this size (e.g. discovery pipeline results with every
+# column profile) are decoded in the default executor, off the event loop.
+_OFFLOAD_DECODE_CHARS = 1 << 20
+
+
+def _dumps(value: dict[str, Any]) -> bytes:
+    """Serialize a cache value; non-str keys are stringified like json.dumps."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
 
 async def get_client(redis_url: str) -> redis.Redis:
     """Create or return the singleton async Redis client.
@@ -38,7 +48,10 @@ async def get_json(client: redis.Redis, key: str) -> dict[str, Any] | None:
     val = await client.get(key)
     if val is None:
         return None
-    return json.loads(val)
+    if len(val) > _OFFLOAD_DECODE_CHARS:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, orjson.loads, val)
+    return orjson.loads(val)
 
 
 async def set_json(
@@ -55,11 +68,29 @@ async def set_json(
         value: Dict to serialize.
         ttl: Optional time-to-live in seconds.
     """
-    serialized = json.dumps(value)
-    if ttl:
-        await client.setex(key, ttl, serialized)
-    else:
-        await client.set(key, serialized)
+    # SET ... EX stores the value and its TTL in a single command
+    await client.set(key, _dumps(value), ex=ttl or None)
+
+
+async def set_json_many(
+    client: redis.Redis,
+    values: dict[str, dict[str, Any]],
+    ttl: int | None = None,
+) -> None:
+    """Serialize several dicts as JSON and store them in one round-trip.
+
+    The writes are sent as a single MULTI/EXEC pipeline, so readers never
+    observe one key updated without the others.
+
+    Args:
+        client: The async Redis client.
+        values: Mapping of Redis key to dict to serialize.
+        ttl: Optional time-to-live in seconds, applied to every key.
+    """
+    async with client.pipeline(transaction=True) as pipe:
+        for key, value in values.items():
+            pipe.set(key, _dumps(value), ex=ttl or None)
+        await pipe.execute()
 
 
 async def health_check(client: redis.Redis) -> bool:
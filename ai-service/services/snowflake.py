@@ -16,6 +16,7 @@ work).  Original casing is preserved when iterating keys/items.
 
 import asyncio
 import logging
+import threading
 import time
 from typing import Any
 
@@ -101,6 +102,11 @@ class CaseInsensitiveDict(dict):
         return CaseInsensitiveDict(super().copy())
 
 _connection: SnowflakeConnection | None = None
+# Guards _connection and _connection_users. Queries run concurrently in
+# executor threads on the shared connection, so a reconnect after a transient
+# error must not close it under cursors other threads still have open.
+_connection_lock = threading.Lock()
+_connection_users: dict[SnowflakeConnection, int] = {}
 
 
 def _create_connection() -> SnowflakeConnection:
@@ -167,10 +173,44 @@ def get_connection() -> SnowflakeConnection:
             "Set SNOWFLAKE_ACCOUNT and other SNOWFLAKE_* environment variables."
         )
 
-    if _connection is None or _connection.is_closed():
-        _connection = _create_connection()
+    with _connection_lock:
+        if _connection is None or _connection.is_closed():
+            _connection = _create_connection()
+        return _connection
 
-    return _connection
+
+def _acquire_connection() -> SnowflakeConnection:
+    """Return the shared connection and count the caller as a user of it."""
+    conn = get_connection()
+    with _connection_lock:
+        _connection_users[conn] = _connection_users.get(conn, 0) + 1
+    return conn
+
+
+def _release_connection(conn: SnowflakeConnection, discard: bool = False) -> None:
+    """Stop using *conn*; with *discard*, retire it so new queries reconnect.
+
+    A retired connection is closed by its last user rather than immediately,
+    so concurrent queries on it finish (or fail) on their own terms.
+    """
+    global _connection
+
+    with _connection_lock:
+        if discard and _connection is conn:
+            _connection = None
+        remaining = _connection_users.get(conn, 1) - 1
+        if remaining > 0:
+            _connection_users[conn] = remaining
+            close_now = False
+        else:
+            _connection_users.pop(conn, None)
+            close_now = conn is not _connection
+    if close_now:
+        try:
+            if not conn.is_closed():
+                conn.close()
+        except Exception:
+            pass
 
 
 _MAX_RETRIES = 3
@@ -223,8 +263,10 @@ def _execute_sync(
     last_exc: Exception | None = None
 
     for attempt in range(_MAX_RETRIES + 1):
+        conn: SnowflakeConnection | None = None
+        discard = False
         try:
-            conn = get_connection()
+            conn = _acquire_connection()
             cursor = conn.cursor()
             try:
                 if params:
@@ -245,22 +287,20 @@ def _execute_sync(
         except Exception as exc:
             last_exc = exc
             if attempt < _MAX_RETRIES and _is_transient(exc):
-                wait = _RETRY_BACKOFF_BASE * (2 ** attempt)
-                logger.warning(
-                    "Transient Snowflake error (attempt %d/%d), retrying in %.1fs: %s",
-                    attempt + 1, _MAX_RETRIES, wait, exc,
-                )
-                time.sleep(wait)
                 # Force reconnect on next attempt
-                global _connection
-                try:
-                    if _connection and not _connection.is_closed():
-                        _connection.close()
-                except Exception:
-                    pass
-                _connection = None
+                discard = True
             else:
                 raise
+        finally:
+            if conn is not None:
+                _release_connection(conn, discard=discard)
+
+        wait = _RETRY_BACKOFF_BASE * (2 ** attempt)
+        logger.warning(
+            "Transient Snowflake error (attempt %d/%d), retrying in %.1fs: %s",
+            attempt + 1, _MAX_RETRIES, wait, last_exc,
+        )
+        time.sleep(wait)
 
     # Should not reach here, but satisfy type checker
     raise last_exc  # type: ignore[misc]
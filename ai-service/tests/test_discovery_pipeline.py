@@ -0,0 +1,192 @@
+"""Unit tests for the deterministic discovery pipeline steps."""
+
+import asyncio
+import sys
+import types
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# The pipeline imports services.neo4j lazily; register a mock module in the
+# same way as test_neo4j_document_tools so the driver package is not needed.
+_mock_neo4j = MagicMock()
+_mock_neo4j.execute_write = AsyncMock(return_value=[])
+_mock_neo4j.execute_read = AsyncMock(return_value=[])
+_mock_neo4j._driver = AsyncMock()
+sys.modules.setdefault("services.neo4j", _mock_neo4j)
+
+from services import discovery_pipeline as pipeline  # noqa: E402
+
+neo4j_service = sys.modules["services.neo4j"]
+
+
+async def test_step_erd_batches_writes_per_entity_type(monkeypatch) -> None:
+    execute_write = AsyncMock(return_value=[])
+    monkeypatch.setattr(neo4j_service, "_driver", object())
+    monkeypatch.setattr(neo4j_service, "execute_write", execute_write)
+    monkeypatch.setattr(pipeline, "_NEO4J_BATCH_SIZE", 2)
+    results = {
+        "metadata": [
+            {
+                "fqn": "DB.S.ORDERS",
+                "row_count": 10,
+                "columns": [
+                    {"name": "ORDER_ID", "data_type": "NUMBER"},
+                    {"name": "CUSTOMER_ID", "data_type": "NUMBER"},
+                    {"name": "NOTE", "data_type": "TEXT"},
+                ],
+            },
+        ],
+        "classifications": {"DB.S.ORDERS": "FACT"},
+        "profiles": [
+            {
+                "table": "DB.S.ORDERS",
+                "columns": [
+                    {"column": "ORDER_ID", "is_likely_pk": True},
+                    {"column": "CUSTOMER_ID", "is_likely_pk": False},
+                ],
+            }
+        ],
+        "relationships": [],
+    }
+
+    result = await pipeline._step_erd(asyncio.Queue(), "dp-1", results)
+
+    assert result["status"] == "ok"
+    # One table batch, two column batches (3 rows / batch of 2), no edge batch
+    assert execute_write.await_count == 3
+    table_call, *col_calls = execute_write.await_args_list
+    assert "UNWIND $rows" in table_call.args[1]
+    assert table_call.kwargs["rows"][0]["classification"] == "FACT"
+    col_rows = [row for call in col_calls for row in call.kwargs["rows"]]
+    assert [row["is_pk"] for row in col_rows] == [True, False, False]
+
+
+def test_progress_throttle_drops_updates_inside_interval(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(pipeline.time, "monotonic", lambda: now[0])
+    throttle = pipeline._ProgressThrottle()
+
+    assert throttle.ready()
+    now[0] += pipeline._PROGRESS_MIN_INTERVAL / 2
+    assert not throttle.ready()
+    now[0] += pipeline._PROGRESS_MIN_INTERVAL
+    assert throttle.ready()
+
+
+@pytest.fixture
+def snowflake_queries(monkeypatch) -> list[str]:
+    """Route the pipeline's Snowflake queries to a recorder returning no rows."""
+    queries: list[str] = []
+
+    async def execute_query(sql: str, params: list | None = None) -> list:
+        queries.append(sql)
+        return []
+
+    fake = types.ModuleType("services.snowflake")
+    fake.execute_query = execute_query
+    fake.execute_query_sync = lambda sql, params=None: []
+    monkeypatch.setitem(sys.modules, "services.snowflake", fake)
+    return queries
+
+
+@pytest.mark.parametrize(
+    ("row_count", "expected_from"),
+    [
+        (None, "LIMIT 10000) AS _dup_sample"),
+        (500, 'FROM "DB"."S"."T"'),
+        (5_000_000, "TABLESAMPLE ROW (10000 ROWS)"),
+    ],
+)
+async def test_duplicate_rate_sampling_follows_row_count(
+    snowflake_queries,
+    row_count,
+    expected_from,
+) -> None:
+    rate = await pipeline._compute_duplicate_rate("DB.S.T", row_count=row_count)
+
+    assert rate == 0.0
+    assert snowflake_queries[0].endswith(expected_from)
+
+
+async def test_step_metadata_skips_invalid_schemas(snowflake_queries) -> None:
+    tables = await pipeline._step_metadata(asyncio.Queue(), "DB", ["SALES", "bad-schema"], [])
+
+    assert tables == []
+    assert sorted(snowflake_queries) == [
+        'SHOW TABLES IN SCHEMA "DB"."SALES"',
+        'SHOW VIEWS IN SCHEMA "DB"."SALES"',
+    ]
+
+
+async def test_step_profiling_reuses_metadata(snowflake_queries) -> None:
+    metadata = [
+        {"fqn": "DB.S.EMPTY", "object_type": "TABLE", "row_count": 0, "columns": []},
+        {
+            "fqn": "DB.S.ORDERS",
+            "object_type": "TABLE",
+            "row_count": 10,
+            "columns": [{"name": "ID", "data_type": "NUMBER", "nullable": False}],
+        },
+    ]
+
+    profiles = await pipeline._step_profiling(
+        asyncio.Queue(),
+        ["DB.S.EMPTY", "DB.S.ORDERS"],
+        metadata=metadata,
+    )
+
+    assert profiles[0] == {
+        "table": "DB.S.EMPTY",
+        "row_count": 0,
+        "columns": [],
+        "sampled": False,
+    }
+    assert not any("EMPTY" in sql for sql in snowflake_queries)
+    assert not any(sql.startswith("SHOW COLUMNS") for sql in snowflake_queries)
+
+
+class _FakeRedis:
+    """Minimal string-valued async Redis stand-in (decode_responses=True)."""
+
+    def __init__(self) -> None:
+        self.store: dict[str, str] = {}
+        self.sets = 0
+
+    async def get(self, key: str) -> str | None:
+        return self.store.get(key)
+
+    async def set(self, key: str, value: bytes, ex: int | None = None) -> None:
+        self.sets += 1
+        self.store[key] = value.decode() if isinstance(value, bytes) else value
+
+
+async def test_checkpointer_coalesces_writes_and_resumes() -> None:
+    client = _FakeRedis()
+    writer = pipeline._Checkpointer(client, "k:partial", "fp", {"DB.S.T": "2026-01-01"})
+
+    writer.save({"metadata": [{"fqn": "DB.S.T"}], "quality": {}})
+    writer.save({"metadata": [{"fqn": "DB.S.T"}], "profiles": [{"table": "DB.S.T"}]})
+    await writer._task
+
+    assert client.sets == 1
+    last_altered: dict[str, str] = {}
+    resumed = await pipeline._Checkpointer(client, "k:partial", "fp", last_altered).load()
+    assert resumed == {"metadata": [{"fqn": "DB.S.T"}], "profiles": [{"table": "DB.S.T"}]}
+    assert last_altered == {"DB.S.T": "2026-01-01"}
+    assert await pipeline._Checkpointer(client, "k:partial", "other", {}).load() == {}
+
+
+def test_spooled_artifact_matches_single_buffer_encoding() -> None:
+    data = {
+        "overall_score": 87,
+        "issues": [{"message": "ORDERS.ID is 90% complete"}],
+        "profiles": [{"table": "DB.S.T", "columns": [{"column": "ID", "null_pct": 0.5}]}] * 3,
+    }
+
+    spool, size = pipeline._spool_json_artifact(data, "profiles")
+    with spool:
+        body = spool.read()
+
+    assert size == len(body)
+    assert body == pipeline._encode_json_artifact(data)
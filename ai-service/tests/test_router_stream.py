@@ -0,0 +1,258 @@
+"""Unit tests for SSE stream framing in the agent router."""
+
+import asyncio
+
+import orjson
+
+from routers import agent as agent_router
+
+
+async def _collect(session_id: str) -> list[bytes]:
+    return [frame async for frame in agent_router._event_generator(session_id)]
+
+
+async def test_event_generator_frames_queue_items_as_sse_bytes() -> None:
+    session = agent_router._StreamSession()
+    queue = session.queue
+    agent_router._active_streams["stream-1"] = session
+    await queue.put({"type": "token", "data": {"content": "Hello"}})
+    await queue.put({"type": "done", "data": {"message": "complete"}})
+
+    frames = await _collect("stream-1")
+
+    assert frames[0] == b": keepalive\n\n"
+    header, data_line = frames[1].rstrip(b"\n").split(b"\n")
+    assert header == b"event: token"
+    payload = orjson.loads(data_line.removeprefix(b"data: "))
+    assert payload["type"] == "token"
+    assert payload["data"] == {"content": "Hello"}
+    assert frames[2].startswith(b"event: done\n")
+    assert "stream-1" not in agent_router._active_streams
+    assert session.client_gone.is_set()
+
+
+async def test_event_generator_without_active_stream_emits_done() -> None:
+    frames = await _collect("missing-session")
+
+    assert len(frames) == 1
+    assert frames[0].startswith(b"event: done\ndata: ")
+
+
+async def test_token_frames_are_forwarded_verbatim_with_standard_envelope() -> None:
+    session = agent_router._StreamSession()
+    queue = session.queue
+    agent_router._active_streams["stream-2"] = session
+    frame = agent_router._format_token_frame('say "hi"\n')
+    await queue.put(frame)
+    await queue.put(None)
+
+    frames = await _collect("stream-2")
+
+    assert frames[1] is frame
+    header, data_line = frame.rstrip(b"\n").split(b"\n")
+    assert header == b"event: token"
+    payload = orjson.loads(data_line.removeprefix(b"data: "))
+    assert payload["type"] == "token"
+    assert payload["data"] == {"content": 'say "hi"\n'}
+    assert payload["timestamp"].endswith("Z")
+
+
+async def test_token_coalescer_merges_burst_and_flushes_before_other_events() -> None:
+    queue: asyncio.Queue = asyncio.Queue()
+    stream = agent_router._TokenCoalescer(queue)
+
+    await stream.put_token("Hel")
+    await stream.put_token("lo")
+    assert queue.empty()
+
+    await stream.put({"type": "message_done", "data": {"content": "Hello"}})
+
+    token_frame = queue.get_nowait()
+    payload = orjson.loads(token_frame.rstrip(b"\n").split(b"\n")[1].removeprefix(b"data: "))
+    assert payload["data"] == {"content": "Hello"}
+    assert queue.get_nowait()["type"] == "message_done"
+
+
+async def test_token_coalescer_flushes_on_idle_timer() -> None:
+    queue: asyncio.Queue = asyncio.Queue()
+    stream = agent_router._TokenCoalescer(queue)
+
+    await stream.put_token("partial")
+    frame = await asyncio.wait_for(queue.get(), timeout=1)
+
+    assert b'"content":"partial"' in frame
+
+
+async def test_finished_stream_does_not_unregister_newer_session() -> None:
+    old_session = agent_router._StreamSession()
+    agent_router._active_streams["stream-3"] = old_session
+    await old_session.queue.put(None)
+    generator = agent_router._event_generator("stream-3")
+    await generator.__anext__()  # keepalive
+
+    new_session = agent_router._StreamSession()
+    agent_router._active_streams["stream-3"] = new_session
+    frames = [frame async for frame in generator]
+
+    assert frames == []
+    assert agent_router._active_streams.pop("stream-3") is new_session
+
+
+async def test_token_coalescer_drops_events_after_client_disconnect() -> None:
+    queue: asyncio.Queue = asyncio.Queue()
+    client_gone = asyncio.Event()
+    stream = agent_router._TokenCoalescer(queue, client_gone=client_gone)
+
+    client_gone.set()
+    await stream.put_token("ignored")
+    await stream.put({"type": "done", "data": {}})
+
+    assert queue.empty()
+
+
+def test_event_frame_fast_path_matches_model_envelope() -> None:
+    item = {"type": "status", "data": {"message": "Working", "nested": {"n": [1, 2.5, None]}}}
+
+    fast = agent_router._format_event_frame(item)
+    header, data_line = fast.rstrip(b"\n").split(b"\n")
+    payload = orjson.loads(data_line.removeprefix(b"data: "))
+
+    model_frame = agent_router._format_sse_event(
+        agent_router.AgentStreamEvent(type="status", data=item["data"])
+    )
+    expected = orjson.loads(model_frame.rstrip(b"\n").split(b"\n")[1].removeprefix(b"data: "))
+    assert header == b"event: status"
+    assert payload.keys() == expected.keys()
+    assert payload["data"] == expected["data"]
+    assert payload["timestamp"].endswith("Z")
+
+
+def test_event_frame_falls_back_to_model_for_non_native_data() -> None:
+    from decimal import Decimal
+
+    frame = agent_router._format_event_frame(
+        {"type": "artifact", "data": {"score": Decimal("1.5")}}
+    )
+
+    payload = orjson.loads(frame.rstrip(b"\n").split(b"\n")[1].removeprefix(b"data: "))
+    assert payload["data"] == {"score": "1.5"}
+
+
+async def test_token_coalescer_keeps_tokens_buffered_while_queue_is_full() -> None:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    queue.put_nowait(b"backlog")
+    stream = agent_router._TokenCoalescer(queue)
+
+    await stream.put_token("a")
+    stream.flush()
+    await stream.put_token("b")
+    assert queue.get_nowait() == b"backlog"
+
+    frame = await asyncio.wait_for(queue.get(), timeout=1)
+    assert b'"content":"ab"' in frame
+
+
+async def test_releasing_session_unblocks_producer_on_full_queue() -> None:
+    session = agent_router._StreamSession()
+    session.queue = asyncio.Queue(maxsize=1)
+    stream = agent_router._TokenCoalescer(session.queue, client_gone=session.client_gone)
+    await stream.put({"type": "status", "data": {}})
+
+    blocked = asyncio.create_task(stream.put({"type": "status", "data": {"n": 2}}))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+
+    agent_router._release_stream_session(session)
+    await asyncio.wait_for(blocked, timeout=1)
+    await stream.put({"type": "done", "data": {}})
+    assert session.client_gone.is_set()
+
+
+def test_internal_leak_tail_window_catches_pattern_split_across_chunks() -> None:
+    content = "Here is the plan. I will call the "
+    chunk = "task tool now"
+
+    assert not agent_router._is_internal_reasoning_leak(content)
+    assert agent_router._appended_text_leaks(content + chunk, len(chunk))
+
+
+def test_internal_leak_tail_window_reaches_back_a_full_pattern() -> None:
+    longest = max(agent_router._INTERNAL_LEAK_PATTERNS, key=len)
+    content = "x" * 200 + longest[:-1]
+    chunk = longest[-1] + " more"
+
+    assert not agent_router._appended_text_leaks(content, len(content))
+    assert agent_router._appended_text_leaks(content + chunk, len(chunk))
+
+
+async def test_control_events_preempt_data_backlog() -> None:
+    session = agent_router._StreamSession()
+    agent_router._active_streams["stream-4"] = session
+    await session.queue.put({"type": "status", "data": {"message": "queued"}})
+    session.control.put_nowait({"type": "done", "data": {"message": "interrupted"}})
+    session.control.put_nowait(None)
+
+    frames = await _collect("stream-4")
+
+    assert len(frames) == 2
+    assert frames[1].startswith(b"event: done\n")
+    assert "stream-4" not in agent_router._active_streams
+
+
+async def test_control_event_wakes_idle_stream() -> None:
+    session = agent_router._StreamSession()
+    agent_router._active_streams["stream-5"] = session
+    collector = asyncio.create_task(_collect("stream-5"))
+    await asyncio.sleep(0)
+
+    session.control.put_nowait({"type": "approval_response", "data": {"approved": True}})
+    await session.queue.put(None)
+    frames = await asyncio.wait_for(collector, timeout=1)
+
+    assert frames[1].startswith(b"event: approval_response\n")
+
+
+async def test_stream_janitor_starts_once_and_stops_cleanly() -> None:
+    agent_router.start_stream_janitor()
+    task = agent_router._stream_janitor_task
+    agent_router.start_stream_janitor()
+    assert agent_router._stream_janitor_task is task
+
+    await agent_router.stop_stream_janitor()
+
+    assert task.cancelled()
+    assert agent_router._stream_janitor_task is None
+
+
+async def test_opening_session_releases_replaced_session() -> None:
+    old_session = agent_router._open_stream_session("stream-6")
+    old_session.queue = asyncio.Queue(maxsize=1)
+    stream = agent_router._TokenCoalescer(old_session.queue, client_gone=old_session.client_gone)
+    await stream.put({"type": "status", "data": {}})
+    blocked = asyncio.create_task(stream.put({"type": "status", "data": {"n": 2}}))
+    await asyncio.sleep(0)
+
+    new_session = agent_router._open_stream_session("stream-6")
+
+    await asyncio.wait_for(blocked, timeout=1)
+    assert old_session.client_gone.is_set()
+    assert old_session.control.get_nowait() is None
+    assert agent_router._active_streams.pop("stream-6") is new_session
+
+
+async def test_janitor_sweeps_never_attached_sessions(monkeypatch) -> None:
+    monkeypatch.setattr(agent_router, "_STREAM_JANITOR_INTERVAL_SEC", 0)
+    unattached = agent_router._StreamSession()
+    unattached.created -= agent_router._STREAM_ATTACH_GRACE_SEC + 1
+    attached = agent_router._StreamSession(attached=True)
+    attached.created = unattached.created
+    agent_router._active_streams["stream-7"] = unattached
+    agent_router._active_streams["stream-8"] = attached
+
+    janitor = asyncio.create_task(agent_router._sweep_stale_stream_sessions())
+    await asyncio.sleep(0.01)
+    janitor.cancel()
+
+    assert "stream-7" not in agent_router._active_streams
+    assert unattached.client_gone.is_set()
+    assert agent_router._active_streams.pop("stream-8") is attached
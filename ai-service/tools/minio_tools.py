@@ -8,6 +8,7 @@ Tools manage generated artifacts in MinIO buckets:
 
 import json
 import logging
+from typing import Any
 from uuid import uuid4
 
 from langchain.tools import tool
@@ -40,6 +41,53 @@ def _get_client() -> minio_service.Minio:
     return minio_service._client
 
 
+# Inserts an artifacts row with its final versioned minio_path in one
+# statement: the path is built from the same MAX(version) + 1 that the
+# auto_version_artifact trigger assigns to the row.
+_INSERT_ARTIFACT_SQL = """
+INSERT INTO artifacts (id, data_product_id, artifact_type, minio_path, filename, file_size_bytes, content_type, created_by)
+SELECT $1::uuid, $2::uuid, $3::artifact_type,
+       $4 || (COALESCE(MAX(version), 0) + 1) || $5,
+       $6, $7, $8, $9
+FROM artifacts
+WHERE data_product_id = $2::uuid AND artifact_type = $3::artifact_type
+RETURNING version, minio_path
+"""
+
+
+async def _insert_artifact_row(
+    pool: Any,
+    artifact_id: str,
+    data_product_id: str,
+    artifact_type: str,
+    filename: str,
+    file_size_bytes: int,
+    content_type: str,
+    created_by: str,
+) -> int:
+    """Insert an artifact's metadata row and return its trigger-assigned version.
+
+    The versioned ``minio_path`` is written by the INSERT itself; only if a
+    concurrent insert moved the trigger's version is it corrected afterwards.
+    """
+    rows = await pg_service.query(
+        pool, _INSERT_ARTIFACT_SQL,
+        artifact_id, data_product_id, artifact_type,
+        f"{data_product_id}/{artifact_type}/v", f"/{filename}",
+        filename, file_size_bytes, content_type, created_by,
+    )
+    if not rows:
+        return 1
+    version = rows[0]["version"]
+    final_path = f"{data_product_id}/{artifact_type}/v{version}/{filename}"
+    if rows[0]["minio_path"] != final_path:
+        await pg_service.execute(
+            pool, "UPDATE artifacts SET minio_path = $1 WHERE id = $2::uuid",
+            final_path, artifact_id,
+        )
+    return version
+
+
 async def upload_artifact_programmatic(
     data_product_id: str,
     artifact_type: str,
@@ -59,21 +107,10 @@ async def upload_artifact_programmatic(
     try:
         pool = pg_service._pool
         if pool is not None:
-            sql = """
-            INSERT INTO artifacts (id, data_product_id, artifact_type, minio_path, filename, file_size_bytes, content_type, created_by)
-            VALUES ($1::uuid, $2::uuid, $3::artifact_type, $4, $5, $6, $7, $8)
-            RETURNING version
-            """
-            placeholder_path = f"{data_product_id}/{artifact_type}/{filename}"
-            rows = await pg_service.query(
-                pool, sql,
-                artifact_id, data_product_id, artifact_type,
-                placeholder_path, filename, len(content_bytes), content_type, "agent",
+            version = await _insert_artifact_row(
+                pool, artifact_id, data_product_id, artifact_type,
+                filename, len(content_bytes), content_type, "agent",
             )
-            if rows and len(rows) > 0:
-                version = rows[0]["version"] if "version" in rows[0].keys() else 1
-            final_path = f"{data_product_id}/{artifact_type}/v{version}/{filename}"
-            await pg_service.execute(pool, "UPDATE artifacts SET minio_path = $1 WHERE id = $2::uuid", final_path, artifact_id)
             logger.info("Artifact persisted to PostgreSQL: %s/%s v%d", data_product_id, artifact_type, version)
     except Exception as e:
         logger.warning("Failed to persist artifact to PostgreSQL: %s", e)
@@ -120,32 +157,11 @@ async def upload_artifact(
     try:
         pool = pg_service._pool
         if pool is not None:
-            # Insert with RETURNING to get the auto-generated version
-            sql = """
-            INSERT INTO artifacts (id, data_product_id, artifact_type, minio_path, filename, file_size_bytes, content_type, created_by)
-            VALUES ($1::uuid, $2::uuid, $3::artifact_type, $4, $5, $6, $7, $8)
-            RETURNING version
-            """
-            # Use placeholder path first, we'll update after getting version
-            placeholder_path = f"{data_product_id}/{artifact_type}/{filename}"
-            rows = await pg_service.query(
-                pool, sql,
-                artifact_id,
-                data_product_id,
-                artifact_type,
-                placeholder_path,
-                filename,
-                len(content_bytes),
-                content_type,
-                "agent",
+            # The row (and its versioned path) comes back with the trigger's version
+            version = await _insert_artifact_row(
+                pool, artifact_id, data_product_id, artifact_type,
+                filename, len(content_bytes), content_type, "agent",
             )
-            if rows and len(rows) > 0:
-                version = rows[0]["version"] if "version" in rows[0].keys() else 1
-
-            # Now update the path with the actual version
-            final_path = f"{data_product_id}/{artifact_type}/v{version}/{filename}"
-            update_sql = "UPDATE artifacts SET minio_path = $1 WHERE id = $2::uuid"
-            await pg_service.execute(pool, update_sql, final_path, artifact_id)
 
             logger.info("Artifact persisted to PostgreSQL: %s/%s v%d", data_product_id, artifact_type, version)
     except Exception as e:
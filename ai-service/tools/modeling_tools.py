@@ -656,10 +656,12 @@ async def create_gold_tables_batch(
             if not silver_map:
                 complete_map = {k.upper(): v.upper() for k, v in gold_mapping.items()}
 
-            await redis_service.set_json(client, silver_key, complete_map, ttl=86400)
-
             gold_key = f"cache:gold_layer:{data_product_id}"
-            await redis_service.set_json(client, gold_key, gold_mapping, ttl=86400)
+            await redis_service.set_json_many(
+                client,
+                {silver_key: complete_map, gold_key: gold_mapping},
+                ttl=86400,
+            )
 
             if pg_service._pool is not None:
                 pool = pg_service._pool
@@ -979,10 +981,12 @@ async def register_gold_layer(
         if not silver_map:
             complete_map = {k.upper(): v.upper() for k, v in mapping.items()}
 
-        await redis_service.set_json(client, silver_key, complete_map, ttl=86400)
-
         gold_key = f"cache:gold_layer:{data_product_id}"
-        await redis_service.set_json(client, gold_key, mapping, ttl=86400)
+        await redis_service.set_json_many(
+            client,
+            {silver_key: complete_map, gold_key: mapping},
+            ttl=86400,
+        )
 
         if pg_service._pool is not None:
             pool = pg_service._pool